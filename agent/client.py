@@ -0,0 +1,117 @@
+import argparse
+import http.client
+import json
+import socket
+import sys
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DaemonClient:
+    """Thin JSON-RPC client for agent.daemon. Only uses the standard library so it starts instantly."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, timeout=None):
+        self.host = host
+        self.port = port
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._ids = 0
+
+    def _connect(self):
+        if self.socket_path:
+            return UnixHTTPConnection(self.socket_path, timeout=self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _post(self, method, params):
+        self._ids += 1
+        body = json.dumps({"jsonrpc": "2.0", "id": self._ids, "method": method, "params": params})
+        conn = self._connect()
+        conn.request("POST", "/rpc", body=body, headers={"Content-Type": "application/json"})
+        return conn, conn.getresponse()
+
+    def call(self, method, **params):
+        conn, resp = self._post(method, params)
+        try:
+            reply = json.loads(resp.read())
+        finally:
+            conn.close()
+        if "error" in reply:
+            raise RuntimeError(reply["error"]["message"])
+        return reply["result"]
+
+    def stream_goal(self, goal, session=None):
+        """Yields progress events as they happen; the final item is the RPC result (or error)."""
+        conn, resp = self._post("run_goal", {"goal": goal, "session": session, "stream": True})
+        try:
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            conn.close()
+
+
+def _print_event(event):
+    kind = event.get("event")
+    if kind == "plan":
+        print(f"[Plan] {len(event['plan'])} steps")
+        for i, step in enumerate(event["plan"], 1):
+            print(f"  {i}. [{step.get('type')}] {step.get('task')}")
+    elif kind == "task_start":
+        print(f">>> Task {event['index']+1}/{event['total']} [{event['type']}]: {event['task']} (Model: {event['model']})")
+    elif kind == "tool_call":
+        print(f"[*] Tool Call: {event['name']}")
+    elif kind == "task_done":
+        print(f"[✓] {str(event.get('result'))[:200]}")
+    elif kind in ("task_failed", "error"):
+        print(f"[!!] {event.get('error')}")
+    elif kind == "recovery":
+        print(f"[!] Recovering '{event['task']}' with {len(event['plan'])} local steps")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send goals to a running agent daemon.")
+    parser.add_argument("goal", nargs="?", help="Goal to run (omit with --status)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="Connect over a Unix socket")
+    parser.add_argument("--session", help="Reuse a named session")
+    parser.add_argument("--status", action="store_true", help="Print daemon status and exit")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON events")
+    args = parser.parse_args(argv)
+
+    client = DaemonClient(args.host, args.port, args.socket)
+    try:
+        if args.status or not args.goal:
+            print(json.dumps(client.call("status"), indent=2))
+            return 0
+        for message in client.stream_goal(args.goal, args.session):
+            if args.json:
+                print(json.dumps(message))
+            elif message.get("method") == "event":
+                _print_event(message["params"])
+            elif "error" in message:
+                print(f"[!!] {message['error']['message']}")
+                return 1
+            else:
+                print(f"\n[Engine] Overall Goal Accomplished. (session {message['result']['session']})")
+        return 0
+    except (ConnectionError, FileNotFoundError) as e:
+        print(f"[!] Daemon not reachable: {e}. Start it with: python -m agent.daemon")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
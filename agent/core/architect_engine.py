@@ -1,11 +1,35 @@
-import ollama
 import json
 import sys
 import os
 import re
+import time
 from ..memory.manager import MemoryManager
+from ..memory.unified import UnifiedMemory
 from ..tools.base import ToolRegistry
+from ..tools.jobs import JobManager
+from ..tools.memo import ToolMemo, LoopDetector, loop_warning
 from ..planning.planner import Planner
+from ..planning.evaluator import Evaluator
+from . import budget, llm
+from .router import ModelRouter
+from . import session_recorder
+from .prompt import PromptTemplate, static, dynamic
+
+SYSTEM_PROMPT = PromptTemplate(
+    "engine.system",
+    static("role", """You are a component of a Multi-Model Chained Architect.
+Focus ONLY on the current SUB-TASK provided. Use your tools to complete it.
+Written files and command exit codes are checked automatically; do not spend turns re-reading them.
+FORMAT: Output valid JSON tool calls."""),
+)
+CONTEXT_PROMPT = PromptTemplate("engine.context", dynamic("context", "OVERALL GOAL: {goal}\nPROGRESS: {progress}"))
+TASK_PROMPT = PromptTemplate("engine.task", dynamic("task", "YOUR CURRENT TASK: {task}"))
+RECOVERY_PROMPT = PromptTemplate(
+    "engine.recovery",
+    static("instructions", "Break the complex task below into 2-3 SMALLER steps.\n"
+                           "Output JSON list of objects with 'task' and 'type': 'SPECIALIST'."),
+    dynamic("task", "TASK: {task}"),
+)
 
 class ArchitectEngine:
     def __init__(self, primary_model=None, specialist_model=None):
@@ -18,12 +42,38 @@ class ArchitectEngine:
         self.specialist_model = specialist_model or config.get("specialist_model", "qwen2.5:0.5b")
         
         self.memory = MemoryManager()
-        self.tools = ToolRegistry(memory_manager=self.memory)
+        self.unified_memory = UnifiedMemory(episodic=self.memory)
+        self.tools = ToolRegistry(memory_manager=self.unified_memory)
+        self.echo = True  # stream model output to stdout
         self.planner = Planner(primary_model=self.primary_model, fallback_model=self.specialist_model)
+        self.evaluator = Evaluator()
         self.state_file = "data/state/active_plan.json"
         os.makedirs("data/state", exist_ok=True)
         self.system_prompt = self._load_system_prompt()
-        self.primary_online = True
+        self.budget_settings = config.get("budget", {})
+        self.router = self._make_router(config.get("router", {}))
+        self.consolidator = self._start_consolidation(config.get("consolidation"))
+
+    def _make_router(self, settings):
+        """Opt-in learned routing ("router": {"enabled": true, ...} in config.json); off keeps the static rule."""
+        settings = dict(settings)
+        if not settings.pop("enabled", False):
+            return None
+        return ModelRouter([self.specialist_model, self.primary_model], **settings)
+
+    def _start_consolidation(self, settings):
+        """Opt-in background memory consolidation ("consolidation": {"enabled": true, ...} in config.json)."""
+        if not settings or not settings.get("enabled"):
+            return None
+        from ..memory.consolidation import Consolidator
+        from .memory_manager import MEMORY_FILE
+        settings = dict(settings)
+        settings.pop("enabled")
+        interval = settings.pop("interval", 30.0)
+        graph = self.unified_memory.graph if os.path.exists(MEMORY_FILE) else None
+        consolidator = Consolidator(episodic=self.memory, graph=graph, **settings)
+        consolidator.start(interval)
+        return consolidator
 
     def _load_config(self):
         if os.path.exists(self.config_file):
@@ -32,98 +82,252 @@ class ArchitectEngine:
         return {}
 
     def _load_system_prompt(self):
-        return """You are a component of a Multi-Model Chained Architect.
-        Focus ONLY on the current SUB-TASK provided. Use your tools to complete it and verify it.
-        FORMAT: Output valid JSON tool calls.
-        """
+        return SYSTEM_PROMPT.render()
 
     def run(self, initial_prompt=None, mode="serial"):
         print(f"--- Multi-Model Architect Online ---")
         print(f"Primary: {self.primary_model} | Specialist: {self.specialist_model}")
+        session_recorder.from_env("ArchitectEngine.run", initial_prompt=initial_prompt,
+                                  primary_model=self.primary_model, specialist_model=self.specialist_model)
         
         while True:
             try:
-                goal = initial_prompt if initial_prompt else input("\nOverall Goal: ")
+                goal = initial_prompt if initial_prompt else session_recorder.read_input("\nOverall Goal: ")
                 if not goal or goal.lower() in ['exit', 'quit']: break
                 
-                plan = self.planner.decompose(goal)
-                self._save_state(goal, plan)
-                self._run_serial(goal, plan)
+                goal_budget = self._new_budget()
+                self.run_goal(goal, goal_budget=goal_budget)
                 
-                print("\n[Engine] Overall Goal Accomplished.")
+                if goal_budget.exceeded is None:
+                    print("\n[Engine] Overall Goal Accomplished.")
+                else:
+                    print(f"\n[Engine] Goal stopped early: {goal_budget.exceeded}.")
+                print(f"[*] Budget: {goal_budget.summary()}")
+                cache = llm.get_cache()
+                if cache is not None:
+                    session = cache.stats()["session"]
+                    print(f"[*] LLM cache: {session['hits']} hits / {session['misses']} misses, saved {session['saved_seconds']}s")
                 if initial_prompt: break
                 initial_prompt = None
             except KeyboardInterrupt: break
 
-    def _run_serial(self, goal, plan):
+    def _new_budget(self):
+        return budget.Budget.from_config({"budget": self.budget_settings})
+
+    def new_tools(self):
+        """A ToolRegistry with its own kernel and jobs, for a session that must not share them."""
+        return ToolRegistry(memory_manager=self.unified_memory, jobs=JobManager())
+
+    def run_goal(self, goal, on_event=None, goal_budget=None, state_file=None, tools=None):
+        """Plans and executes a single goal. Progress is reported through on_event(dict).
+
+        Everything the goal does is charged to `goal_budget` (by default one
+        built from the "budget" config); once it runs out, the results so far
+        are returned. The plan is saved to `state_file` (default
+        data/state/active_plan.json) and tools run on `tools` (default
+        self.tools); concurrent callers pass their own of both.
+        """
+        goal_budget = goal_budget or self._new_budget()
+        with budget.use(goal_budget):
+            self._emit(on_event, "goal_start", goal=goal)
+            try:
+                plan = self.planner.decompose(goal, on_event=on_event)
+            except budget.BudgetExceeded as e:
+                print(f"[!] {e} while planning.")
+                plan = []
+            planned = len(plan)
+            plan = goal_budget.fit_plan(plan)
+            if len(plan) < planned:
+                print(f"[!] Plan cut to {len(plan)} of {planned} tasks (plan_tasks budget).")
+            self._emit(on_event, "plan", plan=plan)
+            self._save_state(goal, plan, state_file or self.state_file)
+            memo = ToolMemo()
+            results = self._run_serial(goal, plan, on_event, memo, tools or self.tools)
+        self._emit(on_event, "goal_done", goal=goal, results=results, tool_cache=memo.stats(),
+                   budget=goal_budget.report())
+        return results
+
+    def _emit(self, on_event, event, **data):
+        if on_event:
+            on_event({"event": event, **data})
+
+    def _run_serial(self, goal, plan, on_event=None, memo=None, tools=None):
+        memo = memo or ToolMemo()
         results = []
+        # Per goal: one failure of the primary must not downgrade other goals sharing this engine
+        primary_online = True
         i = 0
         while i < len(plan):
             item = plan[i]
             task = item['task']
             task_type = item['type']
-            model = self.specialist_model if (task_type == "SPECIALIST" or not self.primary_online) else self.primary_model
+            model = self.specialist_model if (task_type == "SPECIALIST" or not primary_online) else self.primary_model
+            route = "default"
+            if self.router and primary_online:
+                # Recorded so a replayed session routes exactly as the original run did
+                model, route = session_recorder.value("route", lambda: self.router.route(task_type, model))
             
-            print(f"\n>>> Task {i+1}/{len(plan)} [{task_type}]: {task} (Model: {model})")
+            print(f"\n>>> Task {i+1}/{len(plan)} [{task_type}]: {task} (Model: {model}, {route})")
+            self._emit(on_event, "task_start", index=i, total=len(plan), task=task, type=task_type, model=model, route=route)
             
             history = [
                 {'role': 'system', 'content': self.system_prompt},
-                {'role': 'system', 'content': f"OVERALL GOAL: {goal}\nPROGRESS: {json.dumps([r['task'] for r in results])}"},
-                {'role': 'user', 'content': f"YOUR CURRENT TASK: {task}"}
+                {'role': 'system', 'content': CONTEXT_PROMPT.render(goal=goal, progress=json.dumps([r['task'] for r in results]))},
+                {'role': 'user', 'content': TASK_PROMPT.render(task=task)}
             ]
             
             try:
-                sub_result = self._process_task(model, history)
+                sub_result, error = self._attempt(model, task_type, list(history), on_event, memo, item, tools)
+                if error is not None and self.router and model != self.primary_model and primary_online:
+                    print(f"[!] {model} did not complete the task ({error}). Escalating to {self.primary_model}...")
+                    self._emit(on_event, "escalate", index=i, task=task, model=model, to=self.primary_model, error=str(error))
+                    model = self.primary_model
+                    sub_result, error = self._attempt(model, task_type, list(history), on_event, memo, item, tools)
+            except budget.BudgetExceeded as e:
+                # Keep what is done; the rest of the plan is reported as skipped
+                print(f"[!] {e}. Stopping after {len(results)} of {len(plan)} tasks.")
+                self._emit(on_event, "budget_exceeded", index=i, task=task, error=str(e))
+                results.append({"task": task, "result": f"ABORTED: {e}"})
+                results += [{"task": t['task'], "result": "SKIPPED: budget exhausted"} for t in plan[i+1:]]
+                break
+
+            if not isinstance(error, Exception):
                 results.append({"task": task, "result": sub_result})
+                self._emit(on_event, "task_done", index=i, task=task, result=sub_result)
                 i += 1 
-            except Exception as e:
-                if model == self.primary_model:
-                    print(f"[!] Primary model {model} failed. PIVOTING TO LOCAL RECOVERY...")
-                    self.primary_online = False
-                    recovery_tasks = self._recover_decompose(task)
-                    plan = plan[:i] + recovery_tasks + plan[i+1:]
-                else:
-                    print(f"[!!] Local failure: {e}")
-                    results.append({"task": task, "result": f"FAILED: {e}"})
-                    i += 1
-
-    def _recover_decompose(self, complex_task):
-        prompt = f"""Break this complex task into 2-3 SMALLER steps.
-        TASK: {complex_task}
-        Output JSON list of objects with 'task' and 'type': 'SPECIALIST'."""
+            elif model == self.primary_model:
+                print(f"[!] Primary model {model} failed. PIVOTING TO LOCAL RECOVERY...")
+                primary_online = False
+                recovery_tasks = self._recover_decompose(task, on_event)
+                if budget.current() is not None:
+                    # Recovery may not grow the plan past the plan_tasks budget
+                    recovery_tasks = budget.current().fit_plan(recovery_tasks, replacing=1) or [item]
+                self._emit(on_event, "recovery", index=i, task=task, error=str(error), plan=recovery_tasks)
+                plan = plan[:i] + recovery_tasks + plan[i+1:]
+            else:
+                print(f"[!!] Local failure: {error}")
+                results.append({"task": task, "result": f"FAILED: {error}"})
+                self._emit(on_event, "task_failed", index=i, task=task, error=str(error))
+                i += 1
+        return results
+
+    def _recover_decompose(self, complex_task, on_event=None):
+        prompt = RECOVERY_PROMPT.render(task=complex_task)
         try:
-            response = ollama.chat(model=self.specialist_model, messages=[{'role': 'user', 'content': prompt}])
+            response = llm.chat(self.specialist_model, [{'role': 'user', 'content': prompt}],
+                                options=llm.cacheable_options(), on_event=on_event, stop_when=llm.stop_after_plan())
             content = response['message']['content']
             if "[" in content and "]" in content:
                 return json.loads(content[content.find("["):content.rfind("]")+1])
         except: pass
         return [{"task": complex_task, "type": "SPECIALIST"}]
 
-    def _process_task(self, model, history):
-        max_turns = 5
+    def _attempt(self, model, task_type, history, on_event=None, memo=None, item=None, tools=None):
+        """Runs a sub-task on one model and reports the outcome to the router.
+
+        Returns (result, error): error is the exception raised, the ABORTED or
+        UNVERIFIED message if the task was cut short or failed its checks, or
+        None on success.
+        """
+        usage = {"tool_calls": 0, "parse_failures": 0, "tokens_per_sec": []}
+        started = time.perf_counter()
+        try:
+            result = self._process_task(model, history, on_event, memo, usage, item, tools)
+            error = result if result.startswith(("ABORTED", "UNVERIFIED")) else None
+        except budget.BudgetExceeded:
+            raise  # not the model's failure; nothing to tell the router
+        except Exception as e:
+            result, error = None, e
+        if self.router:
+            rates = usage["tokens_per_sec"]
+            # Only checked outcomes teach the router; a run that merely did not crash proves nothing
+            success = False if error is not None else (True if result.startswith("VERIFIED") else None)
+            self.router.record(task_type, model, success, seconds=round(time.perf_counter() - started, 3),
+                               tokens_per_sec=sum(rates) / len(rates) if rates else None,
+                               tool_calls=usage["tool_calls"], parse_failures=usage["parse_failures"])
+        return result, error
+
+    def _process_task(self, model, history, on_event=None, memo=None, usage=None, item=None, tools=None):
+        tools = tools or self.tools
+        max_turns = budget.turns(5)
         last_out = ""
+        memo = memo or ToolMemo()
+        loops = LoopDetector()
+        warned = False
+        calls = []
+        verdict = None
         for turn in range(max_turns):
-            response = ollama.chat(model=model, messages=history, tools=self.tools.get_definitions())
+            print(f"[{model}]: ", end='', flush=True)
+            # Cut right after a tool call, before an invented "Result:"; a final answer is never cut
+            response = llm.chat(model, history, tools=tools.get_definitions(), on_event=on_event,
+                                stop_when=llm.stop_after_tool_call(), echo=self.echo)
             msg = response['message']
             history.append(msg)
             content = msg.get('content', '')
-            if content: print(f"[{model}]: {content[:150]}...")
             tool_calls = msg.get('tool_calls') or self._fallback_parse(content)
+            if usage is not None:
+                if response['stats'].get('tokens_per_sec'):
+                    usage["tokens_per_sec"].append(response['stats']['tokens_per_sec'])
+                usage["tool_calls"] += len(tool_calls or [])
+                if not tool_calls and '"name"' in content:
+                    usage["parse_failures"] += 1  # looked like a tool call but did not parse
             if tool_calls:
                 for tool in tool_calls:
                     fn_name = tool['function']['name']
                     args = tool['function']['arguments']
                     print(f"[*] Tool Call: {fn_name}")
-                    res = self.tools.execute(fn_name, args)
+                    self._emit(on_event, "tool_call", name=fn_name, arguments=args)
+                    res, cached = memo.call(fn_name, args, lambda: tools.execute(fn_name, args))
+                    if cached: print(f"[*] {fn_name} served from session cache")
+                    loops.record(fn_name, args)
+                    calls.append((fn_name, args, res))
                     history.append({'role': 'tool', 'content': json.dumps(res)})
+                repeating = loops.check()
+                if repeating:
+                    self._emit(on_event, "loop_detected", tools=repeating, aborted=warned)
+                    if warned:
+                        print(f"[!] Tool loop detected again ({', '.join(repeating)}). Aborting sub-task.")
+                        return f"ABORTED: repeated tool calls ({', '.join(repeating)})"
+                    print(f"[!] Tool loop detected ({', '.join(repeating)}). Re-prompting.")
+                    history.append({'role': 'user', 'content': loop_warning(repeating)})
+                    loops.reset()
+                    warned = True
             else:
                 last_out = content
+                if item:
+                    # The model says it is done: check postconditions instead of spending a turn on it verifying itself.
+                    # Intermediate tool turns are not judged; a failing command is often a step towards the fix.
+                    verdict = self._verify(item, calls, on_event)
+                    if verdict["passed"]:
+                        return f"VERIFIED: {self.evaluator.describe(verdict['checks'])}"
+                    if verdict["conclusive"] and turn + 1 < max_turns:
+                        history.append({'role': 'user', 'content': "Verification failed:\n" + "\n".join(f"- {f}" for f in verdict["failures"]) + "\nFix these problems."})
+                        continue
                 break
+        else:
+            if item and calls:
+                # Out of turns while still calling tools: judge what was done
+                verdict = self._verify(item, calls, on_event)
+                if verdict["passed"]:
+                    return f"VERIFIED: {self.evaluator.describe(verdict['checks'])}"
+        if verdict and verdict["conclusive"]:
+            return f"UNVERIFIED: {'; '.join(verdict['failures'])}"
         return last_out
 
-    def _save_state(self, goal, plan):
+    def _verify(self, item, calls, on_event=None):
+        verdict = self.evaluator.evaluate(item['task'], calls, item.get('checks'))
+        if verdict["passed"]:
+            print(f"[✓] Verified: {self.evaluator.describe(verdict['checks'])}")
+            self._emit(on_event, "verified", task=item['task'], checks=verdict["checks"])
+        elif verdict["conclusive"]:
+            print(f"[!] Verification failed: {'; '.join(verdict['failures'])}")
+            self._emit(on_event, "verification_failed", task=item['task'], failures=verdict["failures"])
+        return verdict
+
+    def _save_state(self, goal, plan, state_file):
         state = {"goal": goal, "plan": plan, "completed": 0, "results": []}
-        with open(self.state_file, 'w') as f: json.dump(state, f, indent=2)
+        os.makedirs(os.path.dirname(state_file) or ".", exist_ok=True)
+        with open(state_file, 'w') as f: json.dump(state, f, indent=2)
 
     def _fallback_parse(self, content):
         if not content: return None
@@ -0,0 +1,183 @@
+"""Per-goal budgets: wall time, LLM tokens, tool calls, plan size and turns.
+
+A Budget is made active for one goal with `with budget.use(b):`. llm.chat,
+the tool dispatchers and the plan-expansion points charge whichever budget is
+active, so limits are enforced in one place instead of by a counter in every
+loop. The active budget lives in a contextvar, so goals running concurrently
+in the daemon keep separate budgets (SpecialistPool copies it into its
+worker threads).
+
+Running out raises BudgetExceeded at the next charge point, including in the
+middle of a streamed completion. The loops catch it, stop, and keep the
+results they already have; report()/summary() give the consumption.
+
+Limits come from the "budget" section of data/state/config.json, overridden
+by ARCH_BUDGET_SECONDS, _TOKENS, _TOOL_CALLS, _PLAN_TASKS and _TURNS. A
+missing or 0 limit is unlimited; `turns` (model turns per task or prompt)
+falls back to the caller's own default.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+
+CONFIG_FILE = "data/state/config.json"
+LIMITS = ("seconds", "tokens", "tool_calls", "plan_tasks", "turns")
+ENV_PREFIX = "ARCH_BUDGET_"
+
+_active = contextvars.ContextVar("budget", default=None)
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, resource, used, limit):
+        super().__init__(f"{resource} budget exhausted ({used} of {limit})")
+        self.resource = resource
+        self.used = used
+        self.limit = limit
+
+
+class Budget:
+    def __init__(self, seconds=None, tokens=None, tool_calls=None, plan_tasks=None, turns=None):
+        self.limits = {"seconds": seconds, "tokens": tokens, "tool_calls": tool_calls,
+                       "plan_tasks": plan_tasks, "turns": turns}
+        self.limits = {k: v for k, v in self.limits.items() if v}
+        self.used = {"prompt_tokens": 0, "eval_tokens": 0, "llm_calls": 0, "cached_llm_calls": 0,
+                     "tool_calls": 0, "plan_tasks": 0, "plan_tasks_refused": 0}
+        self.started = time.monotonic()
+        self.exceeded = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config=None, **defaults):
+        """Limits from config["budget"] (config.json when not given) and ARCH_BUDGET_*; `defaults` fill the gaps."""
+        if config is None:
+            config = {}
+            if os.path.exists(CONFIG_FILE):
+                try:
+                    with open(CONFIG_FILE, 'r') as f:
+                        config = json.load(f)
+                except (OSError, json.JSONDecodeError):
+                    pass
+        settings = {k: v for k, v in defaults.items() if v is not None}
+        settings.update({k: v for k, v in (config.get("budget") or {}).items() if k in LIMITS})
+        for name in LIMITS:
+            value = os.environ.get(ENV_PREFIX + name.upper())
+            if value:
+                settings[name] = float(value) if name == "seconds" else int(value)
+        return cls(**settings)
+
+    @property
+    def tokens(self):
+        return self.used["prompt_tokens"] + self.used["eval_tokens"]
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def turns(self, default):
+        return self.limits.get("turns", default)
+
+    def exhausted(self, pending_tokens=0, tools=False):
+        """The first limit that has been reached, as (resource, used, limit), or None.
+
+        Spent tool calls only count when `tools` is set: the model may still
+        answer with what it has, it just cannot call another tool.
+        """
+        usage = [("seconds", self.elapsed()), ("tokens", self.tokens + pending_tokens)]
+        if tools:
+            usage.append(("tool_calls", self.used["tool_calls"]))
+        for resource, used in usage:
+            limit = self.limits.get(resource)
+            if limit is not None and used >= limit:
+                return resource, round(used, 1), limit
+        return None
+
+    def check(self, pending_tokens=0, tools=False):
+        if self.exceeded is not None:
+            raise self.exceeded
+        hit = self.exhausted(pending_tokens, tools)
+        if hit:
+            self.exceeded = BudgetExceeded(*hit)
+            raise self.exceeded
+
+    def charge_llm(self, stats, cached=False):
+        with self._lock:
+            if cached:
+                self.used["cached_llm_calls"] += 1
+                return
+            self.used["llm_calls"] += 1
+            self.used["prompt_tokens"] += stats.get("prompt_eval_count") or 0
+            self.used["eval_tokens"] += stats.get("eval_count") or 0
+
+    def charge_tool(self, name):
+        """Called before a tool runs; raises instead of starting a call the budget cannot pay for."""
+        self.check(tools=True)
+        with self._lock:
+            self.used["tool_calls"] += 1
+
+    def fit_plan(self, plan, replacing=0):
+        """The part of `plan` that fits the plan_tasks limit, `replacing` tasks being dropped for it."""
+        limit = self.limits.get("plan_tasks")
+        with self._lock:
+            room = len(plan) if limit is None else max(0, limit - (self.used["plan_tasks"] - replacing))
+            kept = plan[:room]
+            self.used["plan_tasks"] += len(kept) - (replacing if kept else 0)
+            self.used["plan_tasks_refused"] += len(plan) - len(kept)
+        return kept
+
+    def report(self):
+        report = {"seconds": round(self.elapsed(), 2), "tokens": self.tokens, **self.used,
+                  "limits": dict(self.limits)}
+        if self.exceeded is not None:
+            report["exceeded"] = self.exceeded.resource
+        return report
+
+    def summary(self):
+        def part(used, resource, unit):
+            limit = self.limits.get(resource)
+            return f"{used}{'/' + str(limit) if limit is not None else ''} {unit}"
+        parts = [part(round(self.elapsed(), 1), "seconds", "s"), part(self.tokens, "tokens", "tokens"),
+                 part(self.used["tool_calls"], "tool_calls", "tool calls")]
+        if self.used["plan_tasks"]:
+            parts.append(part(self.used["plan_tasks"], "plan_tasks", "plan tasks"))
+        text = ", ".join(parts)
+        if self.exceeded is not None:
+            text += f" (stopped: {self.exceeded.resource} budget exhausted)"
+        return text
+
+
+def current():
+    return _active.get()
+
+
+@contextlib.contextmanager
+def use(budget):
+    token = _active.set(budget)
+    try:
+        yield budget
+    finally:
+        _active.reset(token)
+
+
+def turns(default):
+    budget = _active.get()
+    return budget.turns(default) if budget is not None else default
+
+
+def check(pending_tokens=0):
+    budget = _active.get()
+    if budget is not None:
+        budget.check(pending_tokens)
+
+
+def charge_llm(stats, cached=False):
+    budget = _active.get()
+    if budget is not None:
+        budget.charge_llm(stats, cached)
+
+
+def charge_tool(name):
+    budget = _active.get()
+    if budget is not None:
+        budget.charge_tool(name)
@@ -0,0 +1,101 @@
+import contextlib
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Advisory inter-process lock on <path>.lock, re-entrant within a process.
+
+    Threads of one process serialize on an RLock first, so only one of them
+    holds the OS lock at a time.
+    """
+
+    def __init__(self, path):
+        self.path = f"{path}.lock"
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self.depth = 0
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        if self.depth == 0:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                else:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            except BaseException:
+                os.close(fd)
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self.depth += 1
+        return self
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def file_signature(path):
+    """(mtime_ns, size, inode) or None; changes whenever the file is rewritten or replaced."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def atomic_write(path, data):
+    """Writes to a temp file in the same directory and renames it over `path`, so readers never see a partial file."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    mode = "wb" if isinstance(data, (bytes, bytearray)) else "w"
+    with open(tmp, mode) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def atomic_write_json(path, obj, indent=2):
+    atomic_write(path, json.dumps(obj, indent=indent))
+
+
+def next_id(counter_path, floor=0):
+    """Allocates the next id from a counter file. Call with the store's FileLock held.
+
+    `floor` (e.g. the current max id) keeps the counter ahead of ids written
+    before the counter existed. Ids are never reused, even after deletions.
+    """
+    current = 0
+    with contextlib.suppress(FileNotFoundError, ValueError):
+        with open(counter_path, 'r') as f:
+            current = int(f.read().strip() or 0)
+    value = max(current, floor) + 1
+    atomic_write(counter_path, str(value))
+    return value
@@ -0,0 +1,369 @@
+"""Compact binary snapshot of the memory graph.
+
+Layout (little-endian): an 8-byte header (magic, version, compression) followed
+by the body, optionally gzip/zstd compressed. The body holds a string table
+(offsets + one UTF-8 blob, every id/label/relation/type stored once) and one
+array column per node and edge field. ISO timestamps are stored as int64
+microseconds. Uncompressed snapshots are mmapped and records are only turned
+into dicts when they are asked for.
+"""
+import argparse
+import array
+import datetime
+import gzip
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b"AGS1"
+VERSION = 1
+HEADER = struct.Struct("<4sBB2x")
+COUNTS = struct.Struct("<IIIQ")  # strings, nodes, edges, blob bytes
+COMPRESSION = {None: 0, "gzip": 1, "zstd": 2}
+
+INLINE = 0xFFFFFFFF  # timestamp lives in the int64 column
+ABSENT = 0xFFFFFFFE  # field missing from the record
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_US = datetime.timedelta(microseconds=1)
+
+NODE_COLUMNS = (("id", "I"), ("type", "I"), ("label", "I"), ("properties", "I"),
+                ("created_us", "q"), ("created_raw", "I"), ("extra", "I"))
+EDGE_COLUMNS = (("source", "I"), ("target", "I"), ("relation", "I"), ("weight", "d"),
+                ("created_us", "q"), ("created_raw", "I"), ("last_used_us", "q"), ("last_used_raw", "I"),
+                ("extra", "I"))
+NODE_FIELDS = {"id": str, "type": str, "label": str, "properties": dict, "created_at": str}
+EDGE_FIELDS = {"source": str, "target": str, "relation": str, "weight": (int, float),
+               "created_at": str, "last_used": str}
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstd snapshots need the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+def _compress(body, compression, level=None):
+    if compression is None:
+        return body
+    if compression == "gzip":
+        return gzip.compress(body, compresslevel=level or 6)
+    if compression == "zstd":
+        return _zstd().ZstdCompressor(level=level or 3).compress(body)
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def _decompress(payload, code):
+    if code == 1:
+        return gzip.decompress(payload)
+    if code == 2:
+        return _zstd().ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown compression code: {code}")
+
+
+class _StringTable:
+    def __init__(self):
+        self.index = {"": 0}
+        self.values = [""]
+
+    def intern(self, value):
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def pack(self):
+        offsets = array.array("I", [0])
+        blob = bytearray()
+        for value in self.values:
+            blob += value.encode("utf-8")
+            offsets.append(len(blob))
+        return offsets, bytes(blob)
+
+
+def _encode_time(value, strings):
+    """(microseconds, raw): naive ISO strings that round-trip go inline, anything else into the string table."""
+    if value is None:
+        return 0, ABSENT
+    try:
+        dt = datetime.datetime.fromisoformat(value)
+        if dt.tzinfo is None and dt.isoformat() == value:
+            return (dt - EPOCH) // ONE_US, INLINE
+    except ValueError:
+        pass
+    return 0, strings.intern(value)
+
+
+def _split(record, fields):
+    """Known fields of the expected type go to columns, everything else to the JSON 'extra' string."""
+    known, extra = {}, {}
+    for key, value in record.items():
+        if key in fields and isinstance(value, fields[key]) and not isinstance(value, bool):
+            known[key] = value
+        else:
+            extra[key] = value
+    return known, extra
+
+
+def encode(graph, compression=None, level=None):
+    strings = _StringTable()
+
+    def ref(value):
+        return ABSENT if value is None else strings.intern(value)
+
+    def extra_ref(extra):
+        return strings.intern(json.dumps(extra, separators=(",", ":"))) if extra else ABSENT
+
+    nodes = graph.get("nodes", [])
+    edges = graph.get("edges", [])
+    ncols = {name: array.array(code) for name, code in NODE_COLUMNS}
+    for node in nodes:
+        known, extra = _split(node, NODE_FIELDS)
+        ncols["id"].append(ref(known.get("id")))
+        ncols["type"].append(ref(known.get("type")))
+        ncols["label"].append(ref(known.get("label")))
+        props = known.get("properties")
+        ncols["properties"].append(ABSENT if props is None else strings.intern(json.dumps(props, separators=(",", ":"))))
+        us, raw = _encode_time(known.get("created_at"), strings)
+        ncols["created_us"].append(us)
+        ncols["created_raw"].append(raw)
+        ncols["extra"].append(extra_ref(extra))
+
+    ecols = {name: array.array(code) for name, code in EDGE_COLUMNS}
+    for edge in edges:
+        known, extra = _split(edge, EDGE_FIELDS)
+        ecols["source"].append(ref(known.get("source")))
+        ecols["target"].append(ref(known.get("target")))
+        ecols["relation"].append(ref(known.get("relation")))
+        if "weight" in known:
+            ecols["weight"].append(float(known["weight"]))
+        else:
+            ecols["weight"].append(float("nan"))
+        for field in ("created", "last_used"):
+            us, raw = _encode_time(known.get("created_at" if field == "created" else field), strings)
+            ecols[f"{field}_us"].append(us)
+            ecols[f"{field}_raw"].append(raw)
+        ecols["extra"].append(extra_ref(extra))
+
+    offsets, blob = strings.pack()
+    body = bytearray(COUNTS.pack(len(strings.values), len(nodes), len(edges), len(blob)))
+    for column in [offsets] + [ncols[n] for n, _ in NODE_COLUMNS] + [ecols[n] for n, _ in EDGE_COLUMNS]:
+        body += b"\0" * (-len(body) % 8)  # keep every column 8-byte aligned for memoryview.cast
+        body += column.tobytes()
+    body += blob
+    return HEADER.pack(MAGIC, VERSION, COMPRESSION[compression]) + _compress(bytes(body), compression, level)
+
+
+def write_snapshot(path, graph, compression=None, level=None):
+    """Atomically writes `graph` ({"nodes": [...], "edges": [...]}) to path. Returns the size in bytes."""
+    data = encode(graph, compression, level)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+class GraphSnapshot:
+    """Read-only view over a snapshot file; decodes strings and records on demand."""
+
+    def __init__(self, path):
+        self.path = path
+        self._mmap = None
+        with open(path, "rb") as f:
+            magic, version, code = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} graph snapshot")
+            if code == 0:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                body = memoryview(self._mmap)[HEADER.size:]
+            else:
+                body = memoryview(_decompress(f.read(), code))
+
+        n_strings, self.node_count, self.edge_count, blob_len = COUNTS.unpack(body[:COUNTS.size])
+        pos = COUNTS.size
+        views = []
+
+        def column(code, n):
+            nonlocal pos
+            pos += -pos % 8
+            size = array.array(code).itemsize * n
+            view = body[pos:pos + size].cast(code)
+            views.append(view)
+            pos += size
+            return view
+
+        self._offsets = column("I", n_strings + 1)
+        self.nodes_cols = {name: column(code, self.node_count) for name, code in NODE_COLUMNS}
+        self.edges_cols = {name: column(code, self.edge_count) for name, code in EDGE_COLUMNS}
+        self._blob = body[pos:pos + blob_len]
+        self._views = views + [self._blob, body]
+        self._strings = {}
+        self._by_label = None
+        self._by_id = None
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def string(self, i):
+        value = self._strings.get(i)
+        if value is None:
+            value = self._strings[i] = str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+        return value
+
+    def _time(self, us, raw):
+        if raw == INLINE:
+            return (EPOCH + us * ONE_US).isoformat()
+        return self.string(raw)
+
+    def node(self, i):
+        cols = self.nodes_cols
+        node = {}
+        for field in ("id", "type", "label"):
+            if cols[field][i] != ABSENT:
+                node[field] = self.string(cols[field][i])
+        if cols["properties"][i] != ABSENT:
+            node["properties"] = json.loads(self.string(cols["properties"][i]))
+        if cols["created_raw"][i] != ABSENT:
+            node["created_at"] = self._time(cols["created_us"][i], cols["created_raw"][i])
+        if cols["extra"][i] != ABSENT:
+            node.update(json.loads(self.string(cols["extra"][i])))
+        return node
+
+    def edge(self, i):
+        cols = self.edges_cols
+        edge = {}
+        for field in ("source", "target", "relation"):
+            if cols[field][i] != ABSENT:
+                edge[field] = self.string(cols[field][i])
+        weight = cols["weight"][i]
+        if weight == weight:  # NaN marks a missing weight
+            edge["weight"] = weight
+        for field, key in (("created", "created_at"), ("last_used", "last_used")):
+            if cols[f"{field}_raw"][i] != ABSENT:
+                edge[key] = self._time(cols[f"{field}_us"][i], cols[f"{field}_raw"][i])
+        if cols["extra"][i] != ABSENT:
+            edge.update(json.loads(self.string(cols["extra"][i])))
+        return edge
+
+    def nodes(self):
+        return (self.node(i) for i in range(self.node_count))
+
+    def edges(self):
+        return (self.edge(i) for i in range(self.edge_count))
+
+    def edge_tuples(self):
+        """(source, target, relation, weight) for every edge without building dicts."""
+        cols = self.edges_cols
+        s = self.string
+        return ((s(a), s(b), s(r), w) for a, b, r, w in zip(cols["source"], cols["target"], cols["relation"], cols["weight"]))
+
+    def node_labels(self):
+        """(index, label) pairs, strings only."""
+        return ((i, self.string(ref)) for i, ref in enumerate(self.nodes_cols["label"]) if ref != ABSENT)
+
+    def find_label(self, label):
+        """Index of the first node with this label (case-insensitive), or None."""
+        if self._by_label is None:
+            self._by_label = {}
+            for i, value in self.node_labels():
+                self._by_label.setdefault(value.lower(), i)
+        return self._by_label.get(label.lower())
+
+    def find_ids(self, ids):
+        if self._by_id is None:
+            self._by_id = {}
+            for i, ref in enumerate(self.nodes_cols["id"]):
+                if ref != ABSENT:
+                    self._by_id.setdefault(self.string(ref), i)
+        return {node_id: self._by_id[node_id] for node_id in ids if node_id in self._by_id}
+
+    def _all_strings(self):
+        blob = bytes(self._blob)
+        offsets = self._offsets.tolist()
+        return [str(blob[offsets[i]:offsets[i + 1]], "utf-8") for i in range(len(offsets) - 1)]
+
+    def to_graph(self):
+        """Materializes every record; decodes the columns in bulk rather than record by record."""
+        strings = self._all_strings()
+        self._strings = dict(enumerate(strings))
+        strings.extend([None, None])  # ABSENT/INLINE never index the table; keeps lookups branch-free below
+        absent = len(strings) - 2
+
+        def refs(column):
+            return [absent if v >= ABSENT else v for v in column.tolist()]
+
+        def times(us_col, raw_col):
+            return [self._time(us, raw) if raw != ABSENT else None for us, raw in zip(us_col.tolist(), raw_col.tolist())]
+
+        cols = self.nodes_cols
+        nodes = []
+        for node_id, node_type, label, props, created, extra in zip(
+                refs(cols["id"]), refs(cols["type"]), refs(cols["label"]), refs(cols["properties"]),
+                times(cols["created_us"], cols["created_raw"]), refs(cols["extra"])):
+            node = {}
+            for key, ref in (("id", node_id), ("type", node_type), ("label", label)):
+                if ref != absent:
+                    node[key] = strings[ref]
+            if props != absent:
+                node["properties"] = json.loads(strings[props])
+            if created is not None:
+                node["created_at"] = created
+            if extra != absent:
+                node.update(json.loads(strings[extra]))
+            nodes.append(node)
+
+        cols = self.edges_cols
+        edges = []
+        for source, target, relation, weight, created, last_used, extra in zip(
+                refs(cols["source"]), refs(cols["target"]), refs(cols["relation"]), cols["weight"].tolist(),
+                times(cols["created_us"], cols["created_raw"]), times(cols["last_used_us"], cols["last_used_raw"]),
+                refs(cols["extra"])):
+            edge = {}
+            for key, ref in (("source", source), ("target", target), ("relation", relation)):
+                if ref != absent:
+                    edge[key] = strings[ref]
+            if weight == weight:
+                edge["weight"] = weight
+            if created is not None:
+                edge["created_at"] = created
+            if last_used is not None:
+                edge["last_used"] = last_used
+            if extra != absent:
+                edge.update(json.loads(strings[extra]))
+            edges.append(edge)
+        return {"nodes": nodes, "edges": edges}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert the memory graph between JSON and the binary snapshot format.")
+    parser.add_argument("source", help="memory_network.json or a .snap file")
+    parser.add_argument("dest", nargs="?", help="Output path (default: source with .snap/.json swapped)")
+    parser.add_argument("--compression", choices=["gzip", "zstd"])
+    args = parser.parse_args(argv)
+
+    base, ext = os.path.splitext(args.source)
+    if ext == ".snap":
+        snapshot = GraphSnapshot(args.source)
+        dest = args.dest or base + ".json"
+        with open(dest, "w") as f:
+            json.dump(snapshot.to_graph(), f, indent=2)
+        snapshot.close()
+    else:
+        with open(args.source, "r") as f:
+            graph = json.load(f)
+        dest = args.dest or base + ".snap"
+        write_snapshot(dest, graph, args.compression)
+    print(f"[✓] {args.source} ({os.path.getsize(args.source)} bytes) -> {dest} ({os.path.getsize(dest)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+import json
+import time
+
+from .startup import lazy_import
+from . import budget
+from . import llm_cache
+from . import session_recorder
+
+# Reproducible sampling, so the response can be served from the completion cache
+DETERMINISTIC = {'temperature': 0}
+
+_cache = None
+_cache_loaded = False
+
+
+def set_cache(cache):
+    """Installs a llm_cache.CompletionCache (or None to disable caching) for this process."""
+    global _cache, _cache_loaded
+    _cache, _cache_loaded = cache, True
+
+
+def get_cache():
+    global _cache, _cache_loaded
+    if not _cache_loaded:
+        _cache, _cache_loaded = llm_cache.from_env(), True
+    return _cache
+
+
+def cacheable_options():
+    """DETERMINISTIC when a completion cache is installed, else None (the model's own sampling)."""
+    return DETERMINISTIC if get_cache() is not None else None
+
+
+class JSONBlockScanner:
+    """Incrementally finds balanced top-level JSON blocks in streamed text.
+
+    Only characters in `openers` start a block at depth 0; brackets inside
+    strings are ignored. feed() returns (start, end, value) for every block that
+    closed in this chunk and parses as JSON.
+    """
+
+    PAIRS = {'{': '}', '[': ']'}
+
+    def __init__(self, openers="{["):
+        self.openers = openers
+        self.text = ""
+        self._stack = []
+        self._start = -1
+        self._in_str = False
+        self._escaped = False
+
+    def feed(self, chunk):
+        found = []
+        offset = len(self.text)
+        self.text += chunk
+        for i, char in enumerate(chunk, offset):
+            if not self._stack:
+                if char in self.openers:
+                    self._stack.append(self.PAIRS[char])
+                    self._start = i
+                continue
+            if self._in_str:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_str = False
+            elif char == '"':
+                self._in_str = True
+            elif char in self.PAIRS:
+                self._stack.append(self.PAIRS[char])
+            elif char in '}]':
+                if char != self._stack.pop():
+                    # Mismatched bracket: not JSON, start looking again
+                    self._stack = []
+                    continue
+                if not self._stack:
+                    try:
+                        found.append((self._start, i + 1, json.loads(self.text[self._start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+        return found
+
+
+def is_tool_call(value):
+    if isinstance(value, list):
+        return bool(value) and all(is_tool_call(v) for v in value)
+    if not isinstance(value, dict):
+        return False
+    if 'name' in value and 'arguments' in value:
+        return True
+    return isinstance(value.get('function'), dict) and 'name' in value['function']
+
+
+def is_plan(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(v, dict) and 'task' in v for v in value)
+
+
+def stop_after_json(openers, accept):
+    """Builds a stop_when callback that ends generation after the first accepted JSON block."""
+    scanner = JSONBlockScanner(openers)
+
+    def check(chunk):
+        for start, end, value in scanner.feed(chunk):
+            if accept(value):
+                return end
+        return None
+    return check
+
+
+def stop_after_plan():
+    return stop_after_json("[", is_plan)
+
+
+def stop_after_tool_call():
+    return stop_after_json("{[", is_tool_call)
+
+
+def _plain_tool_call(call):
+    fn = call['function']
+    return {'function': {'name': fn['name'], 'arguments': dict(fn.get('arguments') or {})}}
+
+
+def _replay(recorded, model, emit, echo, **extra):
+    started = time.perf_counter()
+    message = recorded['message']
+    emit({"event": "llm_start", "model": model})
+    if message.get('content'):
+        if echo:
+            print(message['content'], flush=True)
+        emit({"event": "llm_delta", "model": model, "text": message['content']})
+    stats = dict(recorded['stats'], ttft=0.0, duration=round(time.perf_counter() - started, 3),
+                 saved_seconds=recorded['stats'].get('duration'), **extra)
+    emit({"event": "llm_done", **stats})
+    return {'message': message, 'stats': stats}
+
+
+def chat(model, messages, tools=None, options=None, on_event=None, stop_when=None, echo=False):
+    """Streams an Ollama chat completion and returns {'message': ..., 'stats': ...}.
+
+    stop_when(chunk) may return the offset at which the answer is complete; the
+    stream is then closed so Ollama stops decoding, and content is cut there.
+    Native tool calls end the stream as soon as they arrive. Progress is
+    reported through on_event as llm_start / llm_first_token / llm_delta /
+    llm_done events.
+
+    With a completion cache installed (see set_cache / ARCH_LLM_CACHE),
+    deterministic requests (temperature 0 or a fixed seed) are answered from
+    disk when the same request was completed before.
+
+    Tokens are charged to the active goal budget (see budget.use). A request
+    is refused once the budget is spent, and a stream that exhausts it is
+    closed and raises BudgetExceeded.
+    """
+    emit = on_event or (lambda event: None)
+    goal_budget = budget.current()
+    if goal_budget is not None:
+        goal_budget.check()
+    session = session_recorder.active()
+    if session is not None and session.replaying:
+        response = _replay(session.next_llm(model, messages, tools, options), model, emit, echo, replayed=True)
+        budget.charge_llm(response['stats'])
+        return response
+    cache = get_cache()
+    key = None
+    if cache is not None and llm_cache.is_deterministic(options):
+        key = llm_cache.cache_key(model, messages, tools, options, stop_when is not None)
+        cached = cache.get(key)
+        if cached is not None:
+            response = _replay(cached, model, emit, echo, cached=True)
+            budget.charge_llm(response['stats'], cached=True)
+            if session is not None:
+                session.llm(model, messages, tools, options, response, 0.0)
+            return response
+
+    ollama = lazy_import("ollama")
+    kwargs = {'model': model, 'messages': messages, 'stream': True}
+    if tools:
+        kwargs['tools'] = tools
+    if options:
+        kwargs['options'] = options
+
+    emit({"event": "llm_start", "model": model})
+    started = time.perf_counter()
+    ttft = None
+    content = ""
+    tool_calls = []
+    chunks = 0
+    final = {}
+    stopped_early = False
+    aborted = False
+    over_budget = None
+
+    stream = ollama.chat(**kwargs)
+    try:
+        for chunk in stream:
+            msg = chunk.get('message') or {}
+            text = msg.get('content') or ''
+            if (text or msg.get('tool_calls')) and ttft is None:
+                ttft = time.perf_counter() - started
+                emit({"event": "llm_first_token", "model": model, "ttft": round(ttft, 3)})
+            if text:
+                chunks += 1
+                cut = stop_when(text) if stop_when else None
+                if cut is not None:
+                    # A cut before this chunk is a cancellation, not a finished answer
+                    aborted = cut <= len(content)
+                    text = text[:max(cut - len(content), 0)]
+                    stopped_early = True
+                content += text
+                if echo:
+                    print(text, end='', flush=True)
+                emit({"event": "llm_delta", "model": model, "text": text})
+            if msg.get('tool_calls'):
+                tool_calls.extend(_plain_tool_call(c) for c in msg['tool_calls'])
+                stopped_early = stopped_early or not chunk.get('done')
+            if chunk.get('done'):
+                final = chunk
+                break
+            if stopped_early:
+                break
+            if goal_budget is not None:
+                over_budget = goal_budget.exhausted(pending_tokens=chunks)
+                if over_budget:
+                    aborted = stopped_early = True
+                    break
+    finally:
+        # Closing the generator drops the HTTP response, which makes Ollama cancel the generation
+        if hasattr(stream, 'close'):
+            stream.close()
+    if echo and content:
+        print()
+
+    duration = time.perf_counter() - started
+    eval_count = final.get('eval_count') or chunks
+    eval_duration = (final.get('eval_duration') or 0) / 1e9 or max(duration - (ttft or 0), 1e-6)
+    stats = {
+        "model": model,
+        "ttft": round(ttft, 3) if ttft is not None else None,
+        "duration": round(duration, 3),
+        "prompt_eval_count": final.get('prompt_eval_count') or 0,
+        "eval_count": eval_count,
+        "tokens_per_sec": round(eval_count / eval_duration, 1),
+        "stopped_early": stopped_early,
+    }
+    emit({"event": "llm_done", **stats})
+
+    message = {'role': 'assistant', 'content': content}
+    if tool_calls:
+        message['tool_calls'] = tool_calls
+    if key is not None and not aborted:
+        cache.put(key, model, {'message': message, 'stats': stats}, duration)
+    if session is not None:
+        session.llm(model, messages, tools, options, {'message': message, 'stats': stats}, duration)
+    if goal_budget is not None:
+        goal_budget.charge_llm(stats)
+        if over_budget:
+            goal_budget.check()  # raises, now that the partial answer has been charged
+    return {'message': message, 'stats': stats}
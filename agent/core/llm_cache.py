@@ -0,0 +1,154 @@
+"""Disk-backed cache of chat completions for deterministic requests.
+
+Opt-in: set ARCH_LLM_CACHE=1 (or to a database path), or call llm.set_cache().
+Only requests whose sampling is reproducible are cached, i.e. options with
+temperature 0 or a fixed seed. Entries are evicted least-recently-used once
+the database holds more than `max_bytes` of responses.
+
+Usage: python -m agent.core.llm_cache [--stats] [--clear] [--path data/state/llm_cache.db]
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    from .sqlite_store import connect
+except ImportError:
+    from sqlite_store import connect
+
+CACHE_FILE = "data/state/llm_cache.db"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS completions_last_used ON completions(last_used);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value REAL NOT NULL);
+"""
+
+
+def is_deterministic(options):
+    options = options or {}
+    return options.get('temperature') == 0 or options.get('seed') is not None
+
+
+def cache_key(model, messages, tools=None, options=None, streaming_stop=False):
+    """Canonical hash of a request; dict key order and whitespace don't matter."""
+    request = {"model": model, "messages": messages, "tools": tools or None,
+               "options": options or None, "stop_when": streaming_stop}
+    blob = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    def __init__(self, path=CACHE_FILE, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = connect(path)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        # This process only; the database keeps the running totals across runs
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key):
+        """Returns the cached {'message', 'stats'} or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT response, seconds FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                self._bump(misses=1)
+                return None
+            self.conn.execute("UPDATE completions SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            self.saved_seconds += row["seconds"]
+            self._bump(hits=1, saved_seconds=row["seconds"])
+        return json.loads(row["response"])
+
+    def put(self, key, model, response, seconds):
+        blob = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, response, size, seconds, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (key, model, blob, len(blob), seconds, now, now))
+            self._evict()
+
+    def _bump(self, **deltas):
+        for name, delta in deltas.items():
+            self.conn.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                              "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, delta))
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        doomed = []
+        for row in self.conn.execute("SELECT key, size FROM completions ORDER BY last_used"):
+            if total - freed <= self.max_bytes:
+                break
+            doomed.append((row["key"],))
+            freed += row["size"]
+        self.conn.executemany("DELETE FROM completions WHERE key = ?", doomed)
+
+    def stats(self):
+        with self._lock:
+            totals = {r["name"]: r["value"] for r in self.conn.execute("SELECT name, value FROM counters")}
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        hits, misses = totals.get("hits", 0), totals.get("misses", 0)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": size,
+            "session": {"hits": self.hits, "misses": self.misses,
+                        "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                        "saved_seconds": round(self.saved_seconds, 2)},
+            "total": {"hits": int(hits), "misses": int(misses),
+                      "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+                      "saved_seconds": round(totals.get("saved_seconds", 0), 2)},
+        }
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM completions")
+            self.conn.execute("DELETE FROM counters")
+
+    def close(self):
+        self.conn.close()
+
+
+def from_env():
+    """The cache selected by ARCH_LLM_CACHE, or None when caching is off."""
+    value = os.environ.get("ARCH_LLM_CACHE", "").strip()
+    if value.lower() in ("", "0", "false", "off", "no"):
+        return None
+    return CompletionCache(CACHE_FILE if value.lower() in ("1", "true", "on", "yes") else value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", default=CACHE_FILE)
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+    cache = CompletionCache(args.path)
+    if args.clear:
+        cache.clear()
+        print(f"[✓] Cleared {args.path}")
+    print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
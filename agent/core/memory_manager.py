@@ -1,16 +1,158 @@
 import json
 import os
 import datetime
+import contextlib
+import functools
+import heapq
+import threading
+import time
+
+try:
+    from .filelock import FileLock, atomic_write_json, file_signature
+except ImportError:
+    from filelock import FileLock, atomic_write_json, file_signature
+
+TOUCH_FLUSH_SECONDS = 30.0
+TOUCH_FLUSH_SIZE = 500
 
 MEMORY_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../personality/memory_network.json'))
 
+def default_backend():
+    """Storage engine for both memory managers: 'json' (default), 'sqlite' or 'snapshot' (graph only, binary)."""
+    return os.environ.get("ARCH_MEMORY_BACKEND", "json").lower()
+
+def _locked(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._exclusive():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class MemoryManager:
-    def __init__(self):
-        self.file_path = MEMORY_FILE
-        self.graph = self._load_graph()
+    def __init__(self, file_path=None, backend=None):
+        self.file_path = file_path or MEMORY_FILE
+        self.backend = backend or default_backend()
+        self.store = None
+        self._batch_depth = 0
+        self._dirty = False
+        self._adj = None
+        self._lock = threading.RLock()
+        self._graph = None
+        self._snapshot = None
+        self._pending_touch = {}
+        self._touch_flushed = time.monotonic()
+        self._file_lock = FileLock(self.file_path)
+        self._signature = None
+        if self.backend == "sqlite":
+            self.store = self._open_store()
+        elif self.backend == "snapshot":
+            self._open_snapshot()
+        else:
+            self._graph = self._load_graph()
+
+    @property
+    def graph(self):
+        """The graph as dicts; a snapshot is only materialized once something needs to modify it."""
+        with self._lock:
+            if self._graph is None and self._snapshot is not None:
+                self._materialize()
+            return self._graph
+
+    def _materialize(self):
+        with self._lock:
+            if self._snapshot is None:
+                return
+            self._graph = self._snapshot.to_graph()
+            self._snapshot.close()
+            self._snapshot = None
+            self._apply_touches()
+
+    @graph.setter
+    def graph(self, value):
+        self._graph = value
+
+    def _snapshot_path(self):
+        return os.path.splitext(self.file_path)[0] + ".snap"
+
+    def _open_snapshot(self):
+        try:
+            from .graph_snapshot import GraphSnapshot
+        except ImportError:
+            from graph_snapshot import GraphSnapshot
+        path = self._snapshot_path()
+        if os.path.exists(path):
+            self._signature = file_signature(path)
+            self._snapshot = GraphSnapshot(path)
+        else:
+            self._graph = self._load_graph()  # first save writes the snapshot
+            self._signature = None
+
+    def _open_store(self):
+        try:
+            from .sqlite_store import SQLiteGraphStore
+        except ImportError:
+            from sqlite_store import SQLiteGraphStore
+        return SQLiteGraphStore(os.path.splitext(self.file_path)[0] + ".db")
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Serializes a mutation across threads and processes, reloading other processes' writes first.
+
+        sqlite serializes writers itself; the json/snapshot files are guarded by <file>.lock.
+        """
+        with self._lock:
+            if self.store:
+                yield
+                return
+            with self._file_lock:
+                if self._file_lock.depth == 1:
+                    self._refresh()
+                yield
+
+    def _refresh(self):
+        """Picks up changes another process made since we last read or wrote the graph."""
+        with self._lock:
+            if self.store:
+                version = self.store.data_version()
+                if version != self._signature:
+                    self._signature = version
+                    self._adj = None
+                return
+            if self._batch_depth:
+                return
+            path = self._snapshot_path() if self.backend == "snapshot" else self.file_path
+            if file_signature(path) == self._signature:
+                return
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
+            self._graph = None
+            self._adj = None
+            self._pending_touch = {}
+            if self.backend == "snapshot":
+                self._open_snapshot()
+            else:
+                self._graph = self._load_graph()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Groups several writes: one transaction (sqlite) or one locked file rewrite (json)."""
+        if self.store:
+            with self.store.batch():
+                yield self
+            return
+        with self._exclusive():
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._dirty:
+                    self._save_graph()
 
     def _load_graph(self):
-        if not os.path.exists(self.file_path):
+        self._signature = file_signature(self.file_path)
+        if self._signature is None:
             return {"nodes": [], "edges": []}
         try:
             with open(self.file_path, 'r') as f:
@@ -19,20 +161,44 @@ class MemoryManager:
             return {"nodes": [], "edges": []}
 
     def _save_graph(self):
-        with open(self.file_path, 'w') as f:
-            json.dump(self.graph, f, indent=2)
+        if self._batch_depth:
+            self._dirty = True
+            return
+        self._dirty = False
+        self._flush_touches()
+        if self.backend == "snapshot":
+            try:
+                from .graph_snapshot import write_snapshot
+            except ImportError:
+                from graph_snapshot import write_snapshot
+            write_snapshot(self._snapshot_path(), self.graph, compression=os.environ.get("ARCH_SNAPSHOT_COMPRESSION"))
+            self._signature = file_signature(self._snapshot_path())
+            return
+        atomic_write_json(self.file_path, self.graph)
+        self._signature = file_signature(self.file_path)
 
     def find_node(self, label):
         """Find a node by label (case-insensitive)."""
+        self._refresh()
+        if self.store: return self.store.find_node(label)
+        with self._lock:
+            # Held while reading: a concurrent _refresh/_materialize closes the snapshot
+            if self._graph is None and self._snapshot is not None:
+                i = self._snapshot.find_label(label)
+                return None if i is None else self._snapshot.node(i)
         label_lower = label.lower()
         for node in self.graph.get("nodes", []):
             if node.get("label", "").lower() == label_lower:
                 return node
         return None
 
+    @_locked
     def add_node(self, node_id, node_type, label, properties=None):
         """Adds a new node if it doesn't exist."""
-        existing = self.find_node(label)
+        if self.store: return self.store.add_node(node_id, node_type, label, properties)
+        self._materialize()  # the returned node must be the stored one
+        # Same rule as SQLiteGraphStore.add_node: the label, else the id, names an existing node
+        existing = self.find_node(label) or self._nodes_by_id([node_id]).get(node_id)
         if existing:
             # Update properties if needed
             if properties:
@@ -51,12 +217,18 @@ class MemoryManager:
         self._save_graph()
         return new_node
 
+    @_locked
     def add_edge(self, source_id, target_id, relation, weight=1.0):
         """Adds a relationship edge."""
+        if self.store:
+            edge = self.store.add_edge(source_id, target_id, relation, weight)
+            self._link(edge)
+            return edge
         # Check if edge exists
         for edge in self.graph.get("edges", []):
             if edge["source"] == source_id and edge["target"] == target_id and edge["relation"] == relation:
                 edge["weight"] = weight # Update weight
+                self._link(edge)
                 self._save_graph()
                 return edge
 
@@ -68,22 +240,253 @@ class MemoryManager:
             "created_at": datetime.datetime.now().isoformat()
         }
         self.graph.setdefault("edges", []).append(new_edge)
+        self._link(new_edge)
         self._save_graph()
         return new_edge
 
     def get_related(self, node_id):
         """Returns all nodes connected to the given node_id."""
-        related = []
-        for edge in self.graph.get("edges", []):
-            if edge["source"] == node_id:
-                related.append({"relation": edge["relation"], "target": edge["target"], "weight": edge["weight"]})
-            elif edge["target"] == node_id:
-                related.append({"relation": f"inverse_{edge['relation']}", "target": edge["source"], "weight": edge["weight"]})
-        return related
+        self._refresh()
+        if self.store: return self.store.get_related(node_id)
+        return [{"relation": relation if direction == "out" else f"inverse_{relation}", "target": other, "weight": weight}
+                for (other, relation, direction), weight in self._adjacency().get(node_id, {}).items()]
+
+    def _adjacency(self):
+        """Adjacency map {node_id: {(neighbour, relation, direction): weight}}, built once and kept in sync."""
+        with self._lock:
+            if self._adj is None:
+                self._adj = {}
+                if self._graph is None and self._snapshot is not None:
+                    for source, target, relation, weight in self._snapshot.edge_tuples():
+                        self._adj.setdefault(source, {})[(target, relation, "out")] = weight
+                        self._adj.setdefault(target, {})[(source, relation, "in")] = weight
+                    return self._adj
+                edges = self.store.edges() if self.store else self.graph.get("edges", [])
+                for edge in edges:
+                    self._link(edge)
+            return self._adj
+
+    def _link(self, edge):
+        if self._adj is None:
+            return
+        self._adj.setdefault(edge["source"], {})[(edge["target"], edge["relation"], "out")] = edge["weight"]
+        self._adj.setdefault(edge["target"], {})[(edge["source"], edge["relation"], "in")] = edge["weight"]
+
+    def _nodes_by_id(self, ids):
+        if self.store: return self.store.get_nodes(ids)
+        with self._lock:
+            if self._graph is None and self._snapshot is not None:
+                return {node_id: self._snapshot.node(i) for node_id, i in self._snapshot.find_ids(ids).items()}
+        wanted = set(ids)
+        return {n["id"]: n for n in self.graph.get("nodes", []) if n["id"] in wanted}
+
+    def _neighbourhood(self, seed_id, depth, max_nodes):
+        """Nodes within `depth` hops of the seed, with their hop distance (plain BFS)."""
+        adj = self._adjacency()
+        hops = {seed_id: 0}
+        frontier = [seed_id]
+        for hop in range(1, depth + 1):
+            nxt = []
+            for node_id in frontier:
+                for (other, _, _) in adj.get(node_id, ()):
+                    if other not in hops:
+                        hops[other] = hop
+                        nxt.append(other)
+                        if len(hops) >= max_nodes:
+                            return hops
+            frontier = nxt
+        return hops
+
+    def _rank_bfs(self, seed_id, depth, max_nodes, decay=0.5):
+        """Best-path score: product of edge weights times decay per hop, expanded best-first."""
+        adj = self._adjacency()
+        scores = {seed_id: 1.0}
+        hops = {seed_id: 0}
+        heap = [(-1.0, 0, seed_id)]
+        while heap and len(scores) < max_nodes:
+            neg, hop, node_id = heapq.heappop(heap)
+            if -neg < scores.get(node_id, 0) or hop >= depth:
+                continue
+            for (other, _, _), weight in adj.get(node_id, {}).items():
+                score = -neg * weight * decay
+                if score > scores.get(other, 0):
+                    scores[other] = score
+                    hops[other] = hop + 1
+                    heapq.heappush(heap, (-score, hop + 1, other))
+        return scores, hops
+
+    def _rank_pagerank(self, seed_id, depth, max_nodes, alpha=0.15, epsilon=1e-3):
+        """Approximate personalized PageRank (forward push) within the seed's depth-bounded neighbourhood."""
+        adj = self._adjacency()
+        hops = self._neighbourhood(seed_id, depth, max_nodes)
+        links = {}
+
+        def out_links(node_id):
+            if node_id not in links:
+                pairs = [(other, w) for (other, _, _), w in adj.get(node_id, {}).items() if other in hops and w > 0]
+                total = sum(w for _, w in pairs)
+                links[node_id] = [(other, w / total) for other, w in pairs]
+            return links[node_id]
+
+        rank = {}
+        residual = {seed_id: 1.0}
+        queue = [seed_id]
+        queued = {seed_id}
+        while queue:
+            node_id = queue.pop()
+            queued.discard(node_id)
+            r = residual.pop(node_id, 0.0)
+            targets = out_links(node_id)
+            if not targets:
+                rank[node_id] = rank.get(node_id, 0.0) + r
+                continue
+            rank[node_id] = rank.get(node_id, 0.0) + alpha * r
+            for other, p in targets:
+                residual[other] = residual.get(other, 0.0) + (1 - alpha) * r * p
+                if other not in queued and residual[other] >= epsilon * max(len(out_links(other)), 1):
+                    queued.add(other)
+                    queue.append(other)
+        return rank, hops
+
+    def traverse(self, concept, depth=2, limit=20, method="bfs", max_nodes=5000):
+        """Ranks the subgraph around a concept in one call.
+
+        method='bfs' scores nodes by their best weighted path from the seed;
+        method='pagerank' runs personalized PageRank over the depth-bounded
+        neighbourhood. Returns the seed, the top `limit` nodes with labels,
+        scores and hop counts, and the edges between returned nodes.
+        """
+        seed = self.find_node(concept)
+        if not seed:
+            return None
+        depth = max(1, min(int(depth), 5))
+        if method == "pagerank":
+            scores, hops = self._rank_pagerank(seed["id"], depth, max_nodes)
+        else:
+            scores, hops = self._rank_bfs(seed["id"], depth, max_nodes)
+        ranked = sorted((n for n in scores if n != seed["id"]), key=lambda n: -scores[n])[:limit]
+        nodes = self._nodes_by_id(ranked)
+
+        keep = set(ranked) | {seed["id"]}
+        adj = self._adjacency()
+        edges = [{"source": n, "target": other, "relation": rel, "weight": w}
+                 for n in keep for (other, rel, direction), w in adj.get(n, {}).items()
+                 if direction == "out" and other in keep]
+        self.touch_edges((e["source"], e["target"], e["relation"]) for e in edges)
+        return {
+            "seed": seed,
+            "nodes": [{"id": n, "label": nodes.get(n, {}).get("label", n), "type": nodes.get(n, {}).get("type"),
+                       "score": round(scores[n], 6), "hops": hops.get(n)} for n in ranked],
+            "edges": edges,
+        }
+
+    def edges(self):
+        self._refresh()
+        self._flush_touches()
+        if self.store: return self.store.edges()
+        with self._lock:
+            if self._graph is None and self._snapshot is not None:
+                edges = list(self._snapshot.edges())
+                for edge in edges:
+                    when = self._pending_touch.get((edge["source"], edge["target"], edge["relation"]))
+                    if when:
+                        edge["last_used"] = when
+                return edges
+        return list(self.graph.get("edges", []))
+
+    def touch_edges(self, keys):
+        """Marks edges as recently used so consolidation decays them more slowly.
+
+        Touches are buffered so a recall is not a write: sqlite gets them in one
+        transaction every TOUCH_FLUSH_SIZE edges or TOUCH_FLUSH_SECONDS, json and
+        snapshot graphs with their next save.
+        """
+        keys = set(keys)
+        if not keys:
+            return
+        now = datetime.datetime.now().isoformat()
+        with self._lock:
+            self._pending_touch.update(dict.fromkeys(keys, now))
+            if self.store and (len(self._pending_touch) >= TOUCH_FLUSH_SIZE
+                               or time.monotonic() - self._touch_flushed >= TOUCH_FLUSH_SECONDS):
+                self._flush_touches()
+
+    def _flush_touches(self):
+        with self._lock:
+            if self.store:
+                if self._pending_touch:
+                    self.store.touch_edges(self._pending_touch)
+                self._pending_touch = {}
+                self._touch_flushed = time.monotonic()
+            elif self._graph is not None:
+                self._apply_touches()
+
+    def _apply_touches(self):
+        if not self._pending_touch:
+            return
+        for edge in self._graph.get("edges", []):
+            when = self._pending_touch.get((edge["source"], edge["target"], edge["relation"]))
+            if when:
+                edge["last_used"] = when
+        self._pending_touch = {}
+
+    def set_edge_weights(self, weights):
+        """Bulk weight update: {(source, target, relation): weight}."""
+        with self._exclusive():
+            if self.store:
+                self.store.set_weights(weights)
+            else:
+                for edge in self.graph.get("edges", []):
+                    key = (edge["source"], edge["target"], edge["relation"])
+                    if key in weights:
+                        edge["weight"] = weights[key]
+                self._save_graph()
+            if self._adj is not None:
+                for (source, target, relation), weight in weights.items():
+                    self._link({"source": source, "target": target, "relation": relation, "weight": weight})
+
+    def remove_edges(self, keys):
+        """Deletes edges by (source, target, relation) and drops the nodes this leaves without any edge."""
+        keys = set(keys)
+        endpoints = {k[0] for k in keys} | {k[1] for k in keys}
+        with self._exclusive():
+            if self.store:
+                with self.store.batch():
+                    self.store.remove_edges(keys)
+                    self.store.remove_orphan_nodes(endpoints)
+            else:
+                edges = [e for e in self.graph.get("edges", []) if (e["source"], e["target"], e["relation"]) not in keys]
+                orphans = endpoints - ({e["source"] for e in edges} | {e["target"] for e in edges})
+                self.graph["edges"] = edges
+                self.graph["nodes"] = [n for n in self.graph.get("nodes", []) if n["id"] not in orphans]
+                self._save_graph()
+            if self._adj is not None:
+                for source, target, relation in keys:
+                    self._adj.get(source, {}).pop((target, relation, "out"), None)
+                    self._adj.get(target, {}).pop((source, relation, "in"), None)
+
+    def search(self, text, limit=10):
+        """Full-text search over node labels (FTS5 on sqlite, substring match on json)."""
+        self._refresh()
+        if self.store: return self.store.search(text, limit)
+        words = text.lower().split()
+        with self._lock:
+            if self._graph is None and self._snapshot is not None:
+                hits = [i for i, label in self._snapshot.node_labels() if any(w in label.lower() for w in words)][:limit]
+                return [self._snapshot.node(i) for i in hits]
+        return [n for n in self.graph.get("nodes", []) if any(w in n.get("label", "").lower() for w in words)][:limit]
+
+    def counts(self):
+        self._refresh()
+        if self.store: return self.store.counts()
+        with self._lock:
+            if self._graph is None and self._snapshot is not None:
+                return {"nodes": self._snapshot.node_count, "edges": self._snapshot.edge_count}
+        return {"nodes": len(self.graph.get("nodes", [])), "edges": len(self.graph.get("edges", []))}
 
 if __name__ == "__main__":
     # Test
     mm = MemoryManager()
-    print(f"Loaded {len(mm.graph.get('nodes', []))} nodes.")
+    print(f"Loaded {mm.counts()['nodes']} nodes ({mm.backend}).")
     # Example usage:
     # mm.add_node("test_concept", "concept", "Self-Improvement", {"status": "active"})
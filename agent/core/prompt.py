@@ -0,0 +1,114 @@
+"""Prompt templates, compiled once at import time.
+
+A template is an ordered list of sections. Static sections are fixed text.
+They are stored once per content hash and reused as the same string object,
+so every render starts with a byte-identical prefix that Ollama can reuse
+from its KV cache. Dynamic sections are parsed into literal/field pieces
+once and only substituted at render time. Put dynamic sections last: only
+the static sections before the first dynamic one form the shared prefix.
+"""
+import hashlib
+import json
+import os
+import re
+import string
+
+_STATIC = {}  # content hash -> text, shared by every template
+_FILES = {}   # path -> (signature, value)
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def count_tokens(text):
+    """Cheap token estimate (words and punctuation marks); close enough to compare prompt sizes."""
+    return len(_TOKEN.findall(text))
+
+
+def _intern(text):
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return digest, _STATIC.setdefault(digest, text)
+
+
+class Section:
+    def __init__(self, name, text, dynamic=False):
+        self.name = name
+        self.dynamic = dynamic
+        if dynamic:
+            self.pieces = [(literal, field) for literal, field, _, _ in string.Formatter().parse(text)]
+            self.fields = [field for _, field in self.pieces if field]
+            self.hash, self.text = None, text
+            self.tokens = None
+        else:
+            self.hash, self.text = _intern(text)
+            self.tokens = count_tokens(self.text)
+
+    def render(self, values):
+        if not self.dynamic:
+            return self.text
+        out = []
+        for literal, field in self.pieces:
+            out.append(literal)
+            if field:
+                out.append(str(values[field]))
+        return "".join(out)
+
+
+def static(name, text):
+    return Section(name, text)
+
+
+def dynamic(name, text):
+    """A section with {field} placeholders; use {{ and }} for literal braces."""
+    return Section(name, text, dynamic=True)
+
+
+class PromptTemplate:
+    def __init__(self, name, *sections, separator="\n\n"):
+        self.name = name
+        self.sections = sections
+        self.separator = separator
+        prefix = []
+        for section in sections:
+            if section.dynamic:
+                break
+            prefix.append(section.text)
+        # The shared prefix ends with a separator when more sections follow
+        joined = separator.join(prefix)
+        if prefix and len(prefix) < len(sections):
+            joined += separator
+        self.prefix_hash, self.prefix = _intern(joined)
+        self._tail = sections[len(prefix):]
+        self.fields = [f for s in sections if s.dynamic for f in s.fields]
+
+    def render(self, **values):
+        if not self._tail:
+            return self.prefix
+        return self.prefix + self.separator.join(s.render(values) for s in self._tail)
+
+    def stats(self, **values):
+        """Token counts per section; dynamic sections are counted for the given values."""
+        rows = []
+        for s in self.sections:
+            text = s.render(values) if s.dynamic else s.text
+            rows.append({"section": s.name, "static": not s.dynamic,
+                         "tokens": s.tokens if not s.dynamic else count_tokens(text)})
+        return {"template": self.name, "sections": rows,
+                "prefix_tokens": count_tokens(self.prefix), "total_tokens": sum(r["tokens"] for r in rows)}
+
+
+def load_json(path, default=None):
+    """json.load with a cache keyed on the file's mtime and size, so repeated renders don't re-read it."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return default
+    signature = (st.st_mtime_ns, st.st_size)
+    cached = _FILES.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    try:
+        with open(path, 'r') as f:
+            value = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return default
+    _FILES[path] = (signature, value)
+    return value
@@ -0,0 +1,143 @@
+import json
+import os
+import random
+import threading
+
+try:
+    from .filelock import FileLock, atomic_write_json
+except ImportError:
+    from filelock import FileLock, atomic_write_json
+
+STATS_FILE = "data/state/router_stats.json"
+
+
+class ModelRouter:
+    """Sends each sub-task to the cheapest model that has been succeeding at that task type.
+
+    Per (task type, model) it keeps run/success counts, tool-call parse
+    success and moving averages of latency and tokens/sec, persisted in
+    data/state/router_stats.json. Only judged runs count: a success is a task
+    whose checks verified, a failure one that errored or failed its checks;
+    runs without checks only update latency. A cheaper model is picked once
+    it has at least `min_samples` judged runs and its success rate, scaled by
+    its tool-call parse success and by its speed relative to the default
+    model (see speed_factor), is `min_success` or more. Until then it is
+    tried with probability `explore`, and the caller escalates to the primary
+    if the attempt fails.
+    """
+
+    def __init__(self, models, stats_file=STATS_FILE, min_success=0.8, min_samples=3, explore=0.2, alpha=0.3,
+                 max_slowdown=3.0):
+        self.models = list(dict.fromkeys(models))  # cheapest first
+        self.stats_file = stats_file
+        self.min_success = min_success
+        self.min_samples = min_samples
+        self.explore = explore
+        self.alpha = alpha
+        self.max_slowdown = max_slowdown
+        self._lock = threading.Lock()
+        self.stats = self._load()
+
+    def _load(self):
+        if self.stats_file and os.path.exists(self.stats_file):
+            try:
+                with open(self.stats_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                pass
+        return {}
+
+    def _entry(self, task_type, model):
+        return self.stats.setdefault(task_type, {}).setdefault(model, {
+            "runs": 0, "successes": 0, "unchecked": 0, "tool_calls": 0, "parse_failures": 0,
+            "latency": None, "tokens_per_sec": None})
+
+    def success_rate(self, task_type, model):
+        entry = self.stats.get(task_type, {}).get(model)
+        if not entry or not entry["runs"]:
+            return None
+        return entry["successes"] / entry["runs"]
+
+    def parse_rate(self, task_type, model):
+        """Share of tool-call attempts that parsed, or 1.0 if the model has made none."""
+        entry = self.stats.get(task_type, {}).get(model) or {}
+        attempts = entry.get("tool_calls", 0) + entry.get("parse_failures", 0)
+        return entry["tool_calls"] / attempts if attempts else 1.0
+
+    def speed_factor(self, task_type, model, reference):
+        """1.0, or less once `model` has been over max_slowdown times slower than `reference` at this task type.
+
+        Compares the average seconds per sub-task when both models have one,
+        else tokens/sec. A cheap model that takes far longer is no saving.
+        """
+        models = self.stats.get(task_type, {})
+        ours, theirs = models.get(model) or {}, models.get(reference) or {}
+        if ours.get("latency") and theirs.get("latency"):
+            slowdown = ours["latency"] / theirs["latency"]
+        elif ours.get("tokens_per_sec") and theirs.get("tokens_per_sec"):
+            slowdown = theirs["tokens_per_sec"] / ours["tokens_per_sec"]
+        else:
+            return 1.0
+        return min(1.0, self.max_slowdown / slowdown)
+
+    def score(self, task_type, model, reference=None):
+        """Success rate discounted by parse failures and, against `reference`, by slowness; route() compares it to min_success."""
+        rate = self.success_rate(task_type, model)
+        if rate is None:
+            return None
+        speed = self.speed_factor(task_type, model, reference) if reference and reference != model else 1.0
+        return rate * self.parse_rate(task_type, model) * speed
+
+    def latency(self, model):
+        """Average seconds per sub-task across task types, or None if the model has not run yet."""
+        values = [s[model]["latency"] for s in self.stats.values() if s.get(model, {}).get("latency") is not None]
+        return sum(values) / len(values) if values else None
+
+    def ranked(self):
+        """Models in cost order; route() weighs in latency through score()."""
+        return list(self.models)
+
+    def route(self, task_type, default):
+        """Returns (model, reason). `default` is what the static rule would pick; it bounds the search."""
+        for model in self.ranked():
+            if model == default:
+                return model, "default"
+            entry = self.stats.get(task_type, {}).get(model)
+            runs = entry["runs"] if entry else 0
+            if runs >= self.min_samples and self.score(task_type, model, default) >= self.min_success:
+                return model, "learned"
+            if runs < self.min_samples and random.random() < self.explore:
+                return model, "explore"
+        return default, "default"
+
+    def record(self, task_type, model, success, seconds=None, tokens_per_sec=None, tool_calls=0, parse_failures=0):
+        """`success` is True (verified), False (failed) or None (nothing to verify against)."""
+        with self._lock:
+            if not self.stats_file:
+                self._apply(task_type, model, success, seconds, tokens_per_sec, tool_calls, parse_failures)
+                return
+            # Other agent processes record into the same file: reload, apply, write, all under its lock
+            os.makedirs(os.path.dirname(self.stats_file) or ".", exist_ok=True)
+            with FileLock(self.stats_file):
+                self.stats = self._load()
+                self._apply(task_type, model, success, seconds, tokens_per_sec, tool_calls, parse_failures)
+                atomic_write_json(self.stats_file, self.stats)
+
+    def _apply(self, task_type, model, success, seconds, tokens_per_sec, tool_calls, parse_failures):
+        entry = self._entry(task_type, model)
+        if success is None:
+            entry["unchecked"] = entry.get("unchecked", 0) + 1
+        else:
+            entry["runs"] += 1
+            entry["successes"] += 1 if success else 0
+        entry["tool_calls"] += tool_calls
+        entry["parse_failures"] += parse_failures
+        for key, value in (("latency", seconds), ("tokens_per_sec", tokens_per_sec)):
+            if value is not None:
+                entry[key] = value if entry[key] is None else round((1 - self.alpha) * entry[key] + self.alpha * value, 3)
+
+    def summary(self):
+        return {task_type: {model: dict(entry, success_rate=round(entry["successes"] / entry["runs"], 2) if entry["runs"] else None,
+                                        parse_rate=round(self.parse_rate(task_type, model), 2))
+                            for model, entry in models.items()}
+                for task_type, models in self.stats.items()}
@@ -0,0 +1,360 @@
+"""Records a session's LLM responses, tool calls and timings, and replays them without a model.
+
+A session file is JSON lines (gzip-compressed when it ends in .gz): a header,
+then one event per LLM completion, tool call and REPL input, then a footer.
+Requests are stored as a hash, not in full, to keep files small; responses
+are stored in full.
+
+Replaying feeds the recorded responses back in order, with zero or recorded
+latency, and either returns the recorded tool results (stub) or runs the
+tools for real (execute). What remains is framework and tool time, which can
+be compared across commits. LLM calls made inside a tool (ask_specialist)
+are recorded under that tool's event: a stubbed tool skips them, an
+executed one is served them.
+
+Recording and replay are off unless enabled:
+    python run_agent.py "goal" --record data/sessions/run.jsonl.gz
+    python run_agent.py "goal" --replay data/sessions/run.jsonl.gz
+or with ARCH_RECORD / ARCH_REPLAY (plus ARCH_REPLAY_LATENCY=zero|real and
+ARCH_REPLAY_TOOLS=stub|execute) for ArchitectEngine.run.
+
+Usage: python -m agent.core.session_recorder summary|replay <session file> [--latency zero|real] [--tools stub|execute]
+"""
+import argparse
+import atexit
+import collections
+import contextvars
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+RECORD_FLAG = "--record"
+REPLAY_FLAG = "--replay"
+
+_active = None
+# Id of the tool call whose code is running; contextvars reach SpecialistPool's workers too
+_enclosing_tool = contextvars.ContextVar("enclosing_tool", default=None)
+
+
+def active():
+    """The session being recorded or replayed in this process, if any."""
+    return _active
+
+
+def install(session):
+    global _active
+    _active = session
+    atexit.register(session.close)
+    return session
+
+
+def _without_ids(value):
+    # Tool-call ids are random per run, so they are left out of the request hash
+    if isinstance(value, dict):
+        return {k: _without_ids(v) for k, v in value.items() if k not in ("id", "tool_call_id")}
+    if isinstance(value, list):
+        return [_without_ids(v) for v in value]
+    return value
+
+
+def request_hash(model, messages, tools=None, options=None):
+    blob = json.dumps({"model": model, "messages": _without_ids(messages), "tools": tools or None, "options": options or None},
+                      sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def load(path):
+    with _open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class SessionRecorder:
+    replaying = False
+
+    def __init__(self, path, entry=None, **info):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._file = _open(path, "w")
+        self._lock = threading.Lock()
+        self._closed = False
+        self._tool_ids = itertools.count(1)
+        self.started = time.perf_counter()
+        self._write({"type": "header", "entry": entry, "created": time.time(), "cwd": os.getcwd(), **info})
+
+    def _write(self, event):
+        with self._lock:
+            if self._closed:
+                return
+            self._file.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+            self._file.flush()
+
+    def _at(self):
+        return round(time.perf_counter() - self.started, 4)
+
+    def llm(self, model, messages, tools, options, response, seconds):
+        event = {"type": "llm", "at": self._at(), "model": model, "request": request_hash(model, messages, tools, options),
+                 "messages": len(messages), "seconds": round(seconds, 4), "response": response}
+        tool_id = _enclosing_tool.get()
+        if tool_id is not None:
+            event["tool"] = tool_id
+        self._write(event)
+
+    def run_tool(self, name, args, call):
+        tool_id = next(self._tool_ids)
+        start = time.perf_counter()
+        token = _enclosing_tool.set(tool_id)
+        try:
+            result = call()
+        finally:
+            _enclosing_tool.reset(token)
+        self._write({"type": "tool", "id": tool_id, "at": self._at(), "name": name, "args": args,
+                     "seconds": round(time.perf_counter() - start, 4), "result": result})
+        return result
+
+    def read_input(self, prompt):
+        value = input(prompt)
+        self._write({"type": "input", "at": self._at(), "value": value})
+        return value
+
+    def value(self, kind, compute):
+        result = compute()
+        self._write({"type": kind, "at": self._at(), "value": result})
+        return result
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._file.write(json.dumps({"type": "end", "seconds": self._at()}) + "\n")
+            self._closed = True
+            self._file.close()
+        print(f"[✓] Session recorded to {self.path}")
+
+
+class SessionReplayer:
+    """Serves a recorded session back. latency: "zero" or "real"; tools: "stub" or "execute"."""
+
+    replaying = True
+
+    def __init__(self, path, latency="zero", tools="stub", report=True):
+        self.path = path
+        self.latency = latency
+        self.tools = tools
+        self.events = load(path)
+        self.header = self.events[0] if self.events and self.events[0].get("type") == "header" else {}
+        self._queues = collections.defaultdict(collections.deque)
+        self._nested = collections.defaultdict(collections.deque)  # tool id -> the LLM calls it made
+        for event in self.events:
+            if event.get("type") == "llm" and event.get("tool") is not None:
+                self._nested[event["tool"]].append(event)
+            else:
+                self._queues[event.get("type")].append(event)
+        self._lock = threading.Lock()
+        self._report = report
+        self._closed = False
+        self.started = time.perf_counter()
+        self.counts = collections.Counter()
+        self.skipped_llm = 0      # made inside a recorded tool call but not asked for (the tool was stubbed)
+        self.llm_seconds = 0.0    # recorded model time that was skipped or slept
+        self.tool_seconds = 0.0   # tool time spent in this run
+        self.divergences = []
+
+    def _next(self, kind):
+        with self._lock:
+            if not self._queues[kind]:
+                return None
+            self.counts[kind] += 1
+            return self._queues[kind].popleft()
+
+    def next_llm(self, model, messages, tools=None, options=None):
+        request = request_hash(model, messages, tools, options)
+        tool_id = _enclosing_tool.get()
+        with self._lock:
+            queue = self._nested.get(tool_id) if tool_id is not None else None
+            if not queue:
+                queue = self._queues["llm"]
+            if not queue:
+                raise RuntimeError(f"Replay exhausted: {self.path} has no more recorded LLM responses")
+            # Concurrent calls (a specialist batch) may arrive in another order than recorded
+            event = next((e for e in queue if e["request"] == request), queue[0])
+            queue.remove(event)
+            self.counts["llm"] += 1
+        if event["request"] != request:
+            # The prompt changed since recording; keep going in order but report it
+            self.divergences.append({"call": self.counts["llm"], "model": model, "recorded_model": event["model"]})
+        self.llm_seconds += event["seconds"]
+        if self.latency == "real":
+            time.sleep(event["seconds"])
+        return event["response"]
+
+    def run_tool(self, name, args, call):
+        event = self._next("tool")
+        matched = event is not None and event["name"] == name
+        if event is not None and not matched:
+            self.divergences.append({"tool": name, "recorded_tool": event["name"]})
+        start = time.perf_counter()
+        if self.tools == "execute" or not matched:
+            # The tool's own LLM calls are served from what it made when recorded
+            token = _enclosing_tool.set(event.get("id") if matched else None)
+            try:
+                result = call()
+            finally:
+                _enclosing_tool.reset(token)
+        else:
+            result = event["result"]
+            if self.latency == "real":
+                time.sleep(event["seconds"])
+        if event is not None and event.get("id") is not None:
+            with self._lock:
+                self.skipped_llm += len(self._nested.pop(event["id"], ()))
+        self.tool_seconds += time.perf_counter() - start
+        return result
+
+    def read_input(self, prompt):
+        event = self._next("input")
+        if event is None:
+            raise EOFError
+        print(f"{prompt}{event['value']}")
+        return event["value"]
+
+    def value(self, kind, compute):
+        event = self._next(kind)
+        return compute() if event is None else event["value"]
+
+    def report(self):
+        wall = time.perf_counter() - self.started
+        slept = self.llm_seconds if self.latency == "real" else 0.0
+        recorded = next((e["seconds"] for e in reversed(self.events) if e.get("type") == "end"), None)
+        return {
+            "session": self.path,
+            "llm_calls": self.counts["llm"],
+            "tool_calls": self.counts["tool"],
+            "unused_llm_responses": len(self._queues["llm"]),
+            "skipped_llm_responses": self.skipped_llm,
+            "divergences": len(self.divergences),
+            "recorded_seconds": recorded,
+            "recorded_llm_seconds": round(self.llm_seconds, 3),
+            "wall_seconds": round(wall, 3),
+            "tool_seconds": round(self.tool_seconds, 3),
+            "framework_seconds": round(wall - slept - self.tool_seconds, 3),
+        }
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._report:
+            print(f"\n--- Replay Report ---\n{json.dumps(self.report(), indent=2)}", file=sys.stderr)
+
+
+def run_tool(name, args, call):
+    """Runs call() for a tool, recording or replaying it when a session is active."""
+    session = _active
+    if session is None:
+        return call()
+    return session.run_tool(name, args, call)
+
+
+def read_input(prompt):
+    session = _active
+    if session is None:
+        return input(prompt)
+    return session.read_input(prompt)
+
+
+def value(kind, compute):
+    """compute() for a non-deterministic decision (e.g. a routing choice); replays return the recorded value."""
+    session = _active
+    if session is None:
+        return compute()
+    return session.value(kind, compute)
+
+
+def from_env(entry=None, **info):
+    """Starts recording/replay from ARCH_RECORD / ARCH_REPLAY unless a session is already active."""
+    if _active is not None:
+        return _active
+    if os.environ.get("ARCH_REPLAY"):
+        return install(SessionReplayer(os.environ["ARCH_REPLAY"], os.environ.get("ARCH_REPLAY_LATENCY", "zero"),
+                                       os.environ.get("ARCH_REPLAY_TOOLS", "stub")))
+    if os.environ.get("ARCH_RECORD"):
+        return install(SessionRecorder(os.environ["ARCH_RECORD"], entry, **info))
+    return None
+
+
+def enable_from_argv(argv):
+    """Strips --record/--replay <path> from argv (in place) into ARCH_RECORD / ARCH_REPLAY for from_env()."""
+    for flag, variable in ((RECORD_FLAG, "ARCH_RECORD"), (REPLAY_FLAG, "ARCH_REPLAY")):
+        if flag in argv:
+            i = argv.index(flag)
+            if i + 1 >= len(argv):
+                raise SystemExit(f"{flag} needs a session file path")
+            os.environ[variable] = argv[i + 1]
+            del argv[i:i + 2]
+
+
+def summary(events):
+    counts = collections.Counter(e.get("type") for e in events)
+    llm = [e for e in events if e.get("type") == "llm"]
+    tools = [e for e in events if e.get("type") == "tool"]
+    per_tool = collections.defaultdict(float)
+    for e in tools:
+        per_tool[e["name"]] += e["seconds"]
+    end = next((e["seconds"] for e in reversed(events) if e.get("type") == "end"), None)
+    llm_seconds = sum(e["seconds"] for e in llm)
+    tool_seconds = sum(e["seconds"] for e in tools)
+    return {
+        "entry": events[0].get("entry") if events else None,
+        "llm_calls": counts["llm"],
+        "tool_calls": counts["tool"],
+        "inputs": counts["input"],
+        "seconds": end,
+        "llm_seconds": round(llm_seconds, 3),
+        "tool_seconds": round(tool_seconds, 3),
+        "framework_seconds": round(end - llm_seconds - tool_seconds, 3) if end is not None else None,
+        "per_tool_seconds": {k: round(v, 3) for k, v in sorted(per_tool.items(), key=lambda kv: -kv[1])},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["summary", "replay"])
+    parser.add_argument("path")
+    parser.add_argument("--latency", choices=["zero", "real"], default="zero")
+    parser.add_argument("--tools", choices=["stub", "execute"], default="stub")
+    args = parser.parse_args()
+    if args.command == "summary":
+        print(json.dumps(summary(load(args.path)), indent=2))
+        return
+
+    # Under -m this file runs as __main__; the hooks in llm.chat read the imported module
+    from . import session_recorder
+    replayer = session_recorder.install(session_recorder.SessionReplayer(args.path, args.latency, args.tools))
+    header = replayer.header
+    if header.get("entry") == "ArchitectEngine.run":
+        from .architect_engine import ArchitectEngine
+        engine = ArchitectEngine(header.get("primary_model"), header.get("specialist_model"))
+        if engine.router:
+            engine.router.stats_file = None  # routes come from the recording; don't touch the live stats
+        engine.run(header.get("initial_prompt"))
+    elif header.get("entry") == "run_agent.run_agent_loop":
+        sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+        import run_agent
+        run_agent.run_agent_loop(header.get("initial_prompt"), header.get("primary_model"), header.get("specialist_model"))
+    else:
+        raise SystemExit(f"[!] Don't know how to replay entry point {header.get('entry')!r}")
+
+
+if __name__ == "__main__":
+    main()
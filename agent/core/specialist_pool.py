@@ -0,0 +1,122 @@
+import ast
+import concurrent.futures
+import contextvars
+import os
+import re
+import threading
+import time
+
+from . import llm
+
+SPECIALIST_SYSTEM = 'You are a technical specialist. Provide precise, expert code or technical solutions.'
+PYTHON_BLOCK = re.compile(r"```(?:python3?|py)[ \t]*\n(.*?)```", re.DOTALL | re.IGNORECASE)
+
+
+def default_parallel():
+    """Concurrent requests per model; mirrors the server's OLLAMA_NUM_PARALLEL when it is set."""
+    try:
+        return max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL", "2")))
+    except ValueError:
+        return 2
+
+
+def lint_answer(text):
+    """python_linter over the ```python blocks of an answer.
+
+    Returns None when they all parse (or there are none: prose, JS or HTML
+    answers are not checked), else the first syntax error message.
+    """
+    for code in PYTHON_BLOCK.findall(text):
+        try:
+            ast.parse(code)
+        except SyntaxError as e:
+            return f"line {e.lineno}: {e.msg}"
+    return None
+
+
+class SpecialistPool:
+    """Runs specialist prompts concurrently, with at most `parallel` requests in flight per model.
+
+    Requests beyond a model's slots wait in the pool instead of piling up in
+    Ollama's queue, so a batch finishes in roughly ceil(n / parallel) calls.
+    """
+
+    def __init__(self, models, parallel=None, system_prompt=SPECIALIST_SYSTEM, max_workers=8):
+        self.models = [models] if isinstance(models, str) else list(models)
+        self.parallel = parallel or default_parallel()
+        self.system_prompt = system_prompt
+        self._slots = {}
+        self._slots_lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="specialist")
+
+    def _slot(self, model):
+        with self._slots_lock:
+            if model not in self._slots:
+                self._slots[model] = threading.BoundedSemaphore(self.parallel)
+            return self._slots[model]
+
+    def _run(self, prompt, model, options=None, on_event=None, cancel=None, echo=False):
+        messages = [{'role': 'user', 'content': prompt}]
+        if self.system_prompt:
+            messages.insert(0, {'role': 'system', 'content': self.system_prompt})
+        started = time.perf_counter()
+        with self._slot(model):
+            if cancel is not None and cancel.is_set():
+                return {"model": model, "cancelled": True}
+            # A cancelled sample closes its stream at the next chunk so Ollama frees the slot
+            stop_when = (lambda chunk: 0 if cancel.is_set() else None) if cancel is not None else None
+            try:
+                response = llm.chat(model, messages, options=options, on_event=on_event, stop_when=stop_when, echo=echo)
+            except Exception as e:
+                return {"model": model, "error": str(e), "seconds": round(time.perf_counter() - started, 2)}
+        return {"model": model, "content": response['message']['content'],
+                "seconds": round(time.perf_counter() - started, 2),
+                "cancelled": bool(cancel is not None and cancel.is_set())}
+
+    def submit(self, prompt, model=None, options=None, on_event=None, cancel=None, echo=False):
+        # Run in a copy of the caller's context so its goal budget is charged for the request
+        context = contextvars.copy_context()
+        return self._pool.submit(context.run, self._run, prompt, model or self.models[0], options, on_event, cancel, echo)
+
+    def ask(self, prompt, model=None, on_event=None, echo=False):
+        return self.submit(prompt, model, on_event=on_event, echo=echo).result()
+
+    def map(self, prompts, model=None, on_event=None):
+        """Runs a batch of prompts; yields (index, result) as each one finishes."""
+        futures = {self.submit(p, model, on_event=on_event): i for i, p in enumerate(prompts)}
+        for future in concurrent.futures.as_completed(futures):
+            yield futures[future], future.result()
+
+    def best_of(self, prompt, samples=3, models=None, check=lint_answer, on_event=None):
+        """Samples the prompt `samples` times across `models` and returns the first answer that passes `check`.
+
+        The other samples are cancelled once one passes. If none passes, the
+        last failure is returned with its 'check_error'.
+        """
+        models = list(models or self.models)
+        cancel = threading.Event()
+        futures = []
+        for i in range(samples):
+            # Different seeds so samples of the same model do not come back identical
+            options = {'seed': i + 1, 'temperature': 0.7} if samples > 1 else None
+            futures.append(self.submit(prompt, models[i % len(models)], options, on_event, cancel))
+
+        last = None
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            if result.get("cancelled"):
+                continue
+            if "error" in result:
+                last = last or result
+                continue
+            error = check(result["content"]) if check else None
+            if error is None:
+                cancel.set()
+                result["attempts"] = samples
+                return result
+            result["check_error"] = error
+            last = result
+        return last
+
+    def close(self):
+        self._pool.shutdown(wait=False)
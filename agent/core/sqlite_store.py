@@ -0,0 +1,361 @@
+import contextlib
+import datetime
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+def connect(path):
+    """Opens a WAL-mode connection shared across threads (callers serialise access with a lock)."""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def has_fts5(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def fts_query(text):
+    """Turns free text into an FTS5 OR-query of prefix terms, quoting each token."""
+    words = re.findall(r"\w+", text.lower())
+    return " OR ".join(f'"{w}"*' for w in words)
+
+
+class SQLiteStore:
+    SCHEMA = ""
+    FTS_SCHEMA = ""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = connect(path)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self.conn.executescript(self.SCHEMA)
+        self.fts = has_fts5(self.conn)
+        if self.fts:
+            self.conn.executescript(self.FTS_SCHEMA)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Groups writes into one transaction. Nested batches join the outer one."""
+        with self._lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.execute("COMMIT")
+
+    def data_version(self):
+        """Changes whenever another connection (e.g. another agent process) commits."""
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class SQLiteGraphStore(SQLiteStore):
+    """SQLite storage for core.memory_manager.MemoryManager (nodes + weighted edges)."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        columns = {r["name"] for r in self.conn.execute("PRAGMA table_info(edges)")}
+        if "last_used" not in columns:
+            self.conn.execute("ALTER TABLE edges ADD COLUMN last_used TEXT")
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS nodes (
+        id TEXT PRIMARY KEY,
+        type TEXT,
+        label TEXT NOT NULL COLLATE NOCASE,
+        properties TEXT NOT NULL DEFAULT '{}',
+        created_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_nodes_label ON nodes(label);
+    CREATE TABLE IF NOT EXISTS edges (
+        source TEXT NOT NULL,
+        target TEXT NOT NULL,
+        relation TEXT NOT NULL,
+        weight REAL NOT NULL DEFAULT 1.0,
+        created_at TEXT,
+        last_used TEXT,
+        PRIMARY KEY (source, target, relation)
+    );
+    CREATE INDEX IF NOT EXISTS idx_edges_target ON edges(target);
+    """
+
+    FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS nodes_fts USING fts5(label, properties, content='nodes', content_rowid='rowid');
+    CREATE TRIGGER IF NOT EXISTS nodes_ai AFTER INSERT ON nodes BEGIN
+        INSERT INTO nodes_fts(rowid, label, properties) VALUES (new.rowid, new.label, new.properties);
+    END;
+    CREATE TRIGGER IF NOT EXISTS nodes_ad AFTER DELETE ON nodes BEGIN
+        INSERT INTO nodes_fts(nodes_fts, rowid, label, properties) VALUES ('delete', old.rowid, old.label, old.properties);
+    END;
+    CREATE TRIGGER IF NOT EXISTS nodes_au AFTER UPDATE ON nodes BEGIN
+        INSERT INTO nodes_fts(nodes_fts, rowid, label, properties) VALUES ('delete', old.rowid, old.label, old.properties);
+        INSERT INTO nodes_fts(rowid, label, properties) VALUES (new.rowid, new.label, new.properties);
+    END;
+    """
+
+    def _node(self, row):
+        if row is None:
+            return None
+        return {"id": row["id"], "type": row["type"], "label": row["label"],
+                "properties": json.loads(row["properties"] or "{}"), "created_at": row["created_at"]}
+
+    def find_node(self, label):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM nodes WHERE label = ? LIMIT 1", (label,)).fetchone()
+        return self._node(row)
+
+    def get_node(self, node_id):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM nodes WHERE id = ?", (node_id,)).fetchone()
+        return self._node(row)
+
+    def add_node(self, node_id, node_type, label, properties=None):
+        with self.batch():
+            # Label first, then id: the id is the primary key, so a clash names the same node (as in MemoryManager)
+            existing = self.find_node(label) or self.get_node(node_id)
+            if existing:
+                if properties:
+                    existing["properties"].update(properties)
+                    self.conn.execute("UPDATE nodes SET properties = ? WHERE id = ?",
+                                      (json.dumps(existing["properties"]), existing["id"]))
+                return existing
+            node = {"id": node_id, "type": node_type, "label": label, "properties": properties or {},
+                    "created_at": datetime.datetime.now().isoformat()}
+            self.conn.execute("INSERT INTO nodes (id, type, label, properties, created_at) VALUES (?, ?, ?, ?, ?)",
+                              (node_id, node_type, label, json.dumps(node["properties"]), node["created_at"]))
+            return node
+
+    def add_edge(self, source_id, target_id, relation, weight=1.0):
+        created_at = datetime.datetime.now().isoformat()
+        with self.batch():
+            self.conn.execute(
+                "INSERT INTO edges (source, target, relation, weight, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(source, target, relation) DO UPDATE SET weight = excluded.weight",
+                (source_id, target_id, relation, weight, created_at))
+            row = self.conn.execute("SELECT * FROM edges WHERE source = ? AND target = ? AND relation = ?",
+                                    (source_id, target_id, relation)).fetchone()
+        return dict(row)
+
+    def get_nodes(self, ids):
+        ids = list(ids)
+        found = {}
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self.conn.execute(f"SELECT * FROM nodes WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                found.update((r["id"], self._node(r)) for r in rows)
+        return found
+
+    def get_related(self, node_id):
+        with self._lock:
+            out_rows = self.conn.execute("SELECT relation, target, weight FROM edges WHERE source = ?", (node_id,)).fetchall()
+            in_rows = self.conn.execute("SELECT relation, source, weight FROM edges WHERE target = ?", (node_id,)).fetchall()
+        related = [{"relation": r["relation"], "target": r["target"], "weight": r["weight"]} for r in out_rows]
+        related += [{"relation": f"inverse_{r['relation']}", "target": r["source"], "weight": r["weight"]} for r in in_rows]
+        return related
+
+    def search(self, text, limit=10):
+        """Full-text search over node labels and properties."""
+        query = fts_query(text)
+        if not query:
+            return []
+        with self._lock:
+            if self.fts:
+                rows = self.conn.execute(
+                    "SELECT nodes.*, bm25(nodes_fts) AS score FROM nodes_fts JOIN nodes ON nodes.rowid = nodes_fts.rowid "
+                    "WHERE nodes_fts MATCH ? ORDER BY score LIMIT ?", (query, limit)).fetchall()
+            else:
+                words = re.findall(r"\w+", text.lower())
+                clause = " OR ".join("label LIKE ?" for _ in words)
+                rows = self.conn.execute(f"SELECT * FROM nodes WHERE {clause} LIMIT ?",
+                                         [f"%{w}%" for w in words] + [limit]).fetchall()
+        return [self._node(r) for r in rows]
+
+    def nodes(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM nodes").fetchall()
+        return [self._node(r) for r in rows]
+
+    def edges(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM edges").fetchall()
+        return [dict(r) for r in rows]
+
+    def counts(self):
+        with self._lock:
+            nodes = self.conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+            edges = self.conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+        return {"nodes": nodes, "edges": edges}
+
+    def set_weights(self, weights):
+        """Bulk weight update: {(source, target, relation): weight}."""
+        with self.batch():
+            self.conn.executemany("UPDATE edges SET weight = ? WHERE source = ? AND target = ? AND relation = ?",
+                                  [(w, s, t, r) for (s, t, r), w in weights.items()])
+
+    def remove_edges(self, keys):
+        with self.batch():
+            self.conn.executemany("DELETE FROM edges WHERE source = ? AND target = ? AND relation = ?", list(keys))
+
+    def touch_edges(self, touches):
+        """Bulk last_used update: {(source, target, relation): when}."""
+        with self.batch():
+            self.conn.executemany("UPDATE edges SET last_used = ? WHERE source = ? AND target = ? AND relation = ?",
+                                  [(when, s, t, r) for (s, t, r), when in touches.items()])
+
+    def remove_orphan_nodes(self, ids):
+        """Deletes the given nodes if no edge references them any more."""
+        with self.batch():
+            self.conn.executemany("DELETE FROM nodes WHERE id = ? AND NOT EXISTS (SELECT 1 FROM edges WHERE source = ?) "
+                                  "AND NOT EXISTS (SELECT 1 FROM edges WHERE target = ?)", [(i, i, i) for i in ids])
+
+    def import_graph(self, graph):
+        """Bulk-loads a JSON graph dict ({"nodes": [...], "edges": [...]}) in one transaction."""
+        with self.batch():
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO nodes (id, type, label, properties, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(n["id"], n.get("type"), n.get("label", n["id"]), json.dumps(n.get("properties") or {}), n.get("created_at"))
+                 for n in graph.get("nodes", [])])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO edges (source, target, relation, weight, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                [(e["source"], e["target"], e["relation"], e.get("weight", 1.0), e.get("created_at"), e.get("last_used"))
+                 for e in graph.get("edges", [])])
+        return self.counts()
+
+
+class SQLiteMemoryStore(SQLiteStore):
+    """SQLite storage for the episodic memory.manager.MemoryManager."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS memories (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT,
+        content TEXT NOT NULL,
+        tags TEXT NOT NULL DEFAULT '[]'
+    );
+    """
+
+    FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(content, tags, content='memories', content_rowid='id');
+    CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+        INSERT INTO memories_fts(rowid, content, tags) VALUES (new.id, new.content, new.tags);
+    END;
+    CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+        INSERT INTO memories_fts(memories_fts, rowid, content, tags) VALUES ('delete', old.id, old.content, old.tags);
+    END;
+    CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE ON memories BEGIN
+        INSERT INTO memories_fts(memories_fts, rowid, content, tags) VALUES ('delete', old.id, old.content, old.tags);
+        INSERT INTO memories_fts(rowid, content, tags) VALUES (new.id, new.content, new.tags);
+    END;
+    """
+
+    def _entry(self, row):
+        return {"id": row["id"], "timestamp": row["timestamp"], "content": row["content"],
+                "tags": json.loads(row["tags"] or "[]")}
+
+    def save(self, content, tags=None):
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self.batch():
+            cur = self.conn.execute("INSERT INTO memories (timestamp, content, tags) VALUES (?, ?, ?)",
+                                    (timestamp, content, json.dumps(tags or [])))
+        return cur.lastrowid
+
+    def _matching(self, query, order, limit):
+        words = re.findall(r"\w+", query.lower())
+        if not words:
+            return []
+        with self._lock:
+            if self.fts:
+                return self.conn.execute(
+                    "SELECT memories.*, bm25(memories_fts) AS score FROM memories_fts "
+                    "JOIN memories ON memories.id = memories_fts.rowid "
+                    f"WHERE memories_fts MATCH ? ORDER BY {order} LIMIT ?", (fts_query(query), limit)).fetchall()
+            clause = " OR ".join("LOWER(content) LIKE ?" for _ in words)
+            return self.conn.execute(f"SELECT memories.*, 0 AS score FROM memories WHERE {clause} ORDER BY id DESC LIMIT ?",
+                                     [f"%{w}%" for w in words] + [limit]).fetchall()
+
+    def recent_matching(self, query, limit=3):
+        """Most recent matching entries, oldest first (the JSON backend's retrieve_relevant order)."""
+        rows = self._matching(query, "memories.id DESC", limit)
+        return [self._entry(r) for r in reversed(rows)]
+
+    def search(self, query, limit=10):
+        """Best matching entries by BM25 rank."""
+        return [dict(self._entry(r), score=-r["score"]) for r in self._matching(query, "score", limit)]
+
+    def all(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM memories ORDER BY id").fetchall()
+        return [self._entry(r) for r in rows]
+
+    def after(self, cursor, limit):
+        """The next `limit` entries with ids above `cursor`, in id order."""
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM memories WHERE id > ? ORDER BY id LIMIT ?", (cursor, limit)).fetchall()
+        return [self._entry(r) for r in rows]
+
+    def get(self, ids):
+        ids = list(ids)
+        if not ids:
+            return []
+        with self._lock:
+            rows = self.conn.execute(f"SELECT * FROM memories WHERE id IN ({','.join('?' * len(ids))})", ids).fetchall()
+        return [self._entry(r) for r in rows]
+
+    def update(self, entry):
+        with self.batch():
+            self.conn.execute("UPDATE memories SET timestamp = ?, content = ?, tags = ? WHERE id = ?",
+                              (entry["timestamp"], entry["content"], json.dumps(entry.get("tags") or []), entry["id"]))
+
+    def delete(self, ids):
+        with self.batch():
+            self.conn.executemany("DELETE FROM memories WHERE id = ?", [(i,) for i in ids])
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+
+    def import_entries(self, entries):
+        """Bulk-loads JSON index entries in one transaction, preserving ids where they are unique.
+
+        Safe to re-run: an entry whose id (or, failing that, timestamp and
+        content) is already stored is skipped.
+        """
+        with self.batch():
+            for e in entries:
+                row = (e.get("timestamp"), e.get("content", ""), json.dumps(e.get("tags") or []))
+                if e.get("id") is not None:
+                    cur = self.conn.execute("INSERT OR IGNORE INTO memories (id, timestamp, content, tags) VALUES (?, ?, ?, ?)",
+                                            (e["id"],) + row)
+                    if cur.rowcount:
+                        continue
+                # The id is taken (indexes written by concurrent processes reuse ids) or missing:
+                # only a memory that is not stored yet gets a new id
+                exists = self.conn.execute("SELECT 1 FROM memories WHERE timestamp IS ? AND content = ? LIMIT 1",
+                                           row[:2]).fetchone()
+                if not exists:
+                    self.conn.execute("INSERT INTO memories (timestamp, content, tags) VALUES (?, ?, ?)", row)
+        return self.count()
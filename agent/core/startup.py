@@ -0,0 +1,59 @@
+import atexit
+import contextlib
+import importlib
+import sys
+import time
+
+PROFILE_FLAG = "--profile-startup"
+
+
+class StartupProfiler:
+    """Records how long each import/initialisation step takes. Disabled unless --profile-startup is passed."""
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.timings = []
+
+    def enable_from_argv(self, argv):
+        """Strips the profiling flag from argv (in place) and enables the profiler if it was present."""
+        if PROFILE_FLAG in argv:
+            argv.remove(PROFILE_FLAG)
+            self.enable()
+        return self.enabled
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            atexit.register(self.report)
+
+    @contextlib.contextmanager
+    def section(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append((name, time.perf_counter() - start, start - self.started))
+
+    def report(self, out=None):
+        out = out or sys.stderr
+        total = time.perf_counter() - self.started
+        print("\n--- Startup Profile ---", file=out)
+        for name, duration, offset in self.timings:
+            print(f"{duration * 1000:9.1f} ms  (at +{offset * 1000:7.1f} ms)  {name}", file=out)
+        print(f"{sum(d for _, d, _ in self.timings) * 1000:9.1f} ms  profiled total / {total * 1000:.1f} ms wall", file=out)
+
+
+profiler = StartupProfiler()
+
+
+def lazy_import(module_name, label=None):
+    """Imports a module on first use, timing the import when profiling is enabled."""
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    with profiler.section(label or f"import {module_name}"):
+        return importlib.import_module(module_name)
@@ -0,0 +1,291 @@
+import argparse
+import itertools
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .core.architect_engine import ArchitectEngine
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_SESSION_EVENTS = 2000
+PLAN_DIR = "data/state/sessions"  # one plan file per goal, so concurrent sessions don't overwrite each other
+
+
+class Session:
+    """One client's goals and events, with its own tools: run_python variables and background jobs stay in the session."""
+
+    def __init__(self, session_id, tools=None):
+        self.id = session_id
+        self.created_at = time.time()
+        self.events = []
+        self.dropped = 0
+        self.goals = []
+        self.running = 0
+        self.tools = tools
+        self._cond = threading.Condition()
+
+    def add_event(self, event):
+        with self._cond:
+            event = dict(event, seq=self.dropped + len(self.events), ts=time.time())
+            self.events.append(event)
+            if len(self.events) > MAX_SESSION_EVENTS:
+                # Sequence numbers stay stable; only the oldest payloads are dropped
+                self.events.pop(0)
+                self.dropped += 1
+            self._cond.notify_all()
+        return event
+
+    def events_since(self, since=0, wait=0):
+        with self._cond:
+            if wait and self.dropped + len(self.events) <= since and self.running:
+                self._cond.wait(timeout=wait)
+            return self.events[max(since - self.dropped, 0):]
+
+    def summary(self):
+        return {"id": self.id, "created_at": self.created_at, "goals": self.goals,
+                "running": self.running, "events": self.dropped + len(self.events)}
+
+
+class AgentService:
+    """Keeps one warm ArchitectEngine and serves goals for many concurrent sessions.
+
+    The models, memory and router are shared; each session gets its own
+    ToolRegistry (kernel and jobs) and plan file. Progress belongs in the
+    session's events: the daemon's own console log is shared, so token
+    echo is turned off.
+    """
+
+    def __init__(self, primary_model=None, specialist_model=None, engine=None):
+        self.engine = engine or ArchitectEngine(primary_model=primary_model, specialist_model=specialist_model)
+        self.engine.echo = False
+        self.started_at = time.time()
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def warm_models(self, keep_alive="30m"):
+        """Loads the configured models into Ollama so the first goal doesn't pay for it."""
+        import ollama
+        for model in {self.engine.primary_model, self.engine.specialist_model}:
+            try:
+                ollama.chat(model=model, messages=[], keep_alive=keep_alive)
+                print(f"[Daemon] Warmed {model}")
+            except Exception as e:
+                print(f"[Daemon] Could not warm {model}: {e}")
+
+    def session(self, session_id=None):
+        with self._lock:
+            if session_id is None:
+                session_id = f"s{next(self._ids)}"
+            if session_id not in self.sessions:
+                self.sessions[session_id] = Session(session_id, self.engine.new_tools())
+            return self.sessions[session_id]
+
+    def run_goal(self, goal, session_id=None, on_event=None):
+        session = self.session(session_id)
+
+        def emit(event):
+            # Token deltas are only forwarded live; storing them would flood the session log
+            if event.get("event") != "llm_delta":
+                event = session.add_event(event)
+            if on_event:
+                on_event(event)
+
+        with session._cond:
+            session.goals.append(goal)
+            session.running += 1
+            state_file = os.path.join(PLAN_DIR, f"{session.id}-{len(session.goals)}.json")
+        try:
+            results = self.engine.run_goal(goal, on_event=emit, state_file=state_file, tools=session.tools)
+            return {"session": session.id, "results": results}
+        except Exception as e:
+            emit({"event": "error", "error": str(e)})
+            raise
+        finally:
+            with session._cond:
+                session.running -= 1
+                session._cond.notify_all()
+
+    def submit_goal(self, goal, session_id=None):
+        session = self.session(session_id)
+        thread = threading.Thread(target=self._run_quietly, args=(goal, session.id), daemon=True)
+        thread.start()
+        return {"session": session.id}
+
+    def _run_quietly(self, goal, session_id):
+        try:
+            self.run_goal(goal, session_id)
+        except Exception as e:
+            print(f"[Daemon] Goal failed in session {session_id}: {e}")
+
+    def status(self):
+        return {
+            "uptime": round(time.time() - self.started_at, 1),
+            "primary_model": self.engine.primary_model,
+            "specialist_model": self.engine.specialist_model,
+            "sessions": len(self.sessions),
+            "running": sum(s.running for s in self.sessions.values()),
+        }
+
+    def list_sessions(self):
+        return [s.summary() for s in self.sessions.values()]
+
+    def events(self, session, since=0, wait=0):
+        if session not in self.sessions:
+            raise KeyError(f"Unknown session: {session}")
+        return self.sessions[session].events_since(since, min(float(wait), 60))
+
+    def close(self):
+        for session in list(self.sessions.values()):
+            if session.tools is not None:
+                session.tools.close()
+
+
+class RPCHandler(BaseHTTPRequestHandler):
+    """JSON-RPC 2.0 over HTTP POST /rpc. Streaming calls answer with NDJSON lines."""
+
+    server_version = "ArchitectDaemon/1.0"
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) tuple
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok", **self.server.service.status()})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/rpc":
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            return self._send_json(400, self._error(None, -32700, f"Parse error: {e}"))
+
+        req_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or {}
+        service = self.server.service
+
+        if method == "run_goal" and params.get("stream", False):
+            return self._stream_goal(req_id, params)
+
+        handlers = {
+            "ping": lambda: "pong",
+            "status": service.status,
+            "run_goal": lambda: service.run_goal(params["goal"], params.get("session")),
+            "submit_goal": lambda: service.submit_goal(params["goal"], params.get("session")),
+            "sessions": service.list_sessions,
+            "events": lambda: service.events(params["session"], params.get("since", 0), params.get("wait", 0)),
+        }
+        if method not in handlers:
+            return self._send_json(200, self._error(req_id, -32601, f"Method not found: {method}"))
+        try:
+            result = handlers[method]()
+            self._send_json(200, {"jsonrpc": "2.0", "id": req_id, "result": result})
+        except KeyError as e:
+            self._send_json(200, self._error(req_id, -32602, f"Invalid params: {e}"))
+        except Exception as e:
+            self._send_json(200, self._error(req_id, -32000, str(e)))
+
+    def _stream_goal(self, req_id, params):
+        if "goal" not in params:
+            return self._send_json(200, self._error(req_id, -32602, "Invalid params: 'goal'"))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        connected = [True]
+
+        def write_line(payload):
+            if not connected[0]:
+                return
+            try:
+                self.wfile.write((json.dumps(payload, default=str) + "\n").encode())
+                self.wfile.flush()
+            except OSError:
+                # Client went away; the goal keeps running and its events stay in the session
+                connected[0] = False
+
+        try:
+            result = self.server.service.run_goal(params["goal"], params.get("session"),
+                                                  on_event=lambda e: write_line({"jsonrpc": "2.0", "method": "event", "params": e}))
+            write_line({"jsonrpc": "2.0", "id": req_id, "result": result})
+        except Exception as e:
+            write_line(self._error(req_id, -32000, str(e)))
+
+    def _error(self, req_id, code, message):
+        return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class UnixRPCServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False):
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixRPCServer(socket_path, RPCHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RPCHandler)
+        server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None, verbose=False):
+    server = make_server(service, host, port, socket_path, verbose)
+    where = socket_path or f"http://{host}:{server.server_address[1]}"
+    print(f"[Daemon] Listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Architect engine as a long-lived daemon.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="Serve on a Unix socket instead of TCP")
+    parser.add_argument("--primary", help="Primary model override")
+    parser.add_argument("--specialist", help="Specialist model override")
+    parser.add_argument("--warm", action="store_true", help="Preload models into Ollama at startup")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    service = AgentService(args.primary, args.specialist)
+    if args.warm:
+        threading.Thread(target=service.warm_models, daemon=True).start()
+    try:
+        serve(service, args.host, args.port, args.socket, args.verbose)
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,10 @@
-import ollama
 import subprocess
 import os
 import sys
 import json
 import re
 import datetime
+import importlib.util
 
 # Ensure we can import from local modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -12,42 +12,75 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 try:
-    from core.memory_manager import MemoryManager
+    from core.startup import profiler, lazy_import
 except ImportError:
-    # Fallback if running from a different directory
     sys.path.append(os.path.join(current_dir, 'core'))
-    from memory_manager import MemoryManager
+    from startup import profiler, lazy_import
+profiler.enable_from_argv(sys.argv)
+
+with profiler.section("import memory_manager"):
+    try:
+        from core.memory_manager import MemoryManager
+    except ImportError:
+        # Fallback if running from a different directory
+        sys.path.append(os.path.join(current_dir, 'core'))
+        from memory_manager import MemoryManager
+
+with profiler.section("import memory facade"):
+    # agent/memory uses package-relative imports, so it is loaded through the repo root
+    repo_root = os.path.dirname(current_dir)
+    if repo_root not in sys.path:
+        sys.path.append(repo_root)
+    from agent.memory.unified import UnifiedMemory
 
-# Optional: Web Search
 try:
-    from tools.web import web_search
-    HAS_WEB = True
+    from core.prompt import PromptTemplate, static, load_json
 except ImportError:
-    HAS_WEB = False
-    def web_search(query): return "Web search module not available."
+    sys.path.append(os.path.join(current_dir, 'core'))
+    from prompt import PromptTemplate, static, load_json
+
+with profiler.section("import specialist pool"):
+    from core.specialist_pool import SpecialistPool
+    from core import budget
+
+# Optional: Web Search (ddgs itself is only imported on the first search)
+with profiler.section("import tools.web"):
+    try:
+        from tools.web import web_search
+        HAS_WEB = importlib.util.find_spec("ddgs") is not None
+    except ImportError:
+        HAS_WEB = False
+        def web_search(query): return "Web search module not available."
 
 # --- Configuration ---
 DEFAULT_MODEL = "qwen2.5:7b"
 SPECIALIST_MODEL = "qwen2.5-coder:7b"
+MAX_TURNS = 10  # model turns per user message, unless the budget config sets "turns"
 PERSONALITY_DIR = os.path.abspath(os.path.join(current_dir, '../../personality'))
 IDENTITY_FILE = os.path.join(PERSONALITY_DIR, 'identity.json')
 
 # --- Initialization ---
-memory = MemoryManager()
+_memory = None
+
+def get_memory():
+    """Loads the memory graph on first use instead of at import time."""
+    global _memory
+    if _memory is None:
+        with profiler.section("load memory graph"):
+            _memory = UnifiedMemory(graph=MemoryManager())
+    return _memory
 
 def load_identity():
     """Loads the core identity to seed the system prompt."""
-    if os.path.exists(IDENTITY_FILE):
-        try:
-            with open(IDENTITY_FILE, 'r') as f:
-                data = json.load(f)
-                return f"You are Lyra. Core Traits: {', '.join(data.get('coreTraits', []))}. Principles: {'; '.join(data.get('principles', []))}."
-        except:
-            pass
+    data = load_json(IDENTITY_FILE)
+    if isinstance(data, dict):
+        return f"You are Lyra. Core Traits: {', '.join(data.get('coreTraits', []))}. Principles: {'; '.join(data.get('principles', []))}."
     return "You are Lyra, an advanced AI architect."
 
-SYSTEM_PROMPT = load_identity() + """
-You have access to a persistent memory graph. Use 'update_memory' to store important facts and 'recall_memory' to retrieve them. 
+with profiler.section("load identity"):
+    IDENTITY_PROMPT = load_identity()
+
+MEMORY_PROMPT = """You have access to a persistent memory graph. Use 'update_memory' to store important facts and 'recall_memory' to retrieve them. 
 You can also search the web and delegate coding tasks to a specialist.
 
 IMPORTANT: When using 'update_memory', you must provide ALL three arguments:
@@ -58,6 +91,9 @@ Example: update_memory("Mayank", "likes", "Rust") -> Correct
 Example: update_memory("Mayank", "is a Game Developer", "") -> INCORRECT. Use ("Mayank", "is_a", "Game Developer")
 """
 
+SYSTEM_TEMPLATE = PromptTemplate("main.system", static("identity", IDENTITY_PROMPT), static("memory", MEMORY_PROMPT), separator="\n")
+SYSTEM_PROMPT = SYSTEM_TEMPLATE.render()
+
 # --- Tools ---
 def run_shell_command(command):
     print(f"[*] Executing Terminal: {command}")
@@ -99,37 +135,47 @@ def update_memory(subject, relation, target):
         
     print(f"[*] Updating Memory: {subject} {relation} {target}")
     try:
-        s_node = memory.add_node(subject.lower().replace(" ", "_"), "entity", subject)
-        t_node = memory.add_node(target.lower().replace(" ", "_"), "entity", target)
-        memory.add_edge(s_node['id'], t_node['id'], relation)
-        return {"status": "success", "message": f"Learned: {subject} {relation} {target}"}
+        return get_memory().save(subject=subject, relation=relation, target=target)
     except Exception as e:
         return {"error": str(e)}
 
-def recall_memory(concept):
-    """Finds related concepts in the memory graph."""
-    print(f"[*] Recalling: {concept}")
+def recall_memory(concept, depth=2, limit=15):
+    """Ranked facts from the memory graph (multi-hop) and matching episodic notes, in one call."""
+    print(f"[*] Recalling: {concept} (depth {depth})")
     try:
-        node = memory.find_node(concept)
-        if not node:
-            return {"found": False, "message": "Concept not found in memory."}
-        
-        related = memory.get_related(node['id'])
-        return {"found": True, "node": node, "related": related}
+        result = get_memory().recall(concept, depth=depth, limit=limit)
+        if not result["found"]:
+            result["message"] = "Concept not found in memory."
+        return result
     except Exception as e:
         return {"error": str(e)}
 
-def ask_specialist(prompt):
-    """Delegates a task to a specialized coding model."""
+_specialist = None
+
+def ask_specialist(prompt=None, prompts=None, samples=1):
+    """Delegates one task, a batch of independent tasks (run concurrently) or a best-of-N task to the specialist."""
+    global _specialist
+    if _specialist is None:
+        _specialist = SpecialistPool(SPECIALIST_MODEL, system_prompt=None)
+    if prompts:
+        print(f"[*] Delegating {len(prompts)} tasks to Specialist ({SPECIALIST_MODEL}), {_specialist.parallel} at a time...")
+        answers = [None] * len(prompts)
+        for i, result in _specialist.map(prompts):
+            print(f"[✓] Specialist task {i + 1}/{len(prompts)} done ({result.get('seconds')}s)")
+            answers[i] = result.get('content') or f"Error calling specialist: {result.get('error')}"
+        return answers
+    if not prompt:
+        return {"error": "Provide 'prompt' or 'prompts'."}
     print(f"[*] Delegating to Specialist ({SPECIALIST_MODEL})...")
-    try:
-        response = ollama.chat(
-            model=SPECIALIST_MODEL,
-            messages=[{'role': 'user', 'content': prompt}]
-        )
-        return response['message']['content']
-    except Exception as e:
-        return f"Error calling specialist: {str(e)}"
+    if samples and samples > 1:
+        result = _specialist.best_of(prompt, samples)
+        if result.get('check_error'):
+            print(f"[!] No sample passed python_linter ({result['check_error']})")
+    else:
+        result = _specialist.ask(prompt)
+    if 'error' in result:
+        return f"Error calling specialist: {result['error']}"
+    return result['content']
 
 # Tool definitions
 tools = [
@@ -196,11 +242,12 @@ tools = [
         'type': 'function',
         'function': {
             'name': 'recall_memory',
-            'description': 'Query long-term memory for a concept.',
+            'description': 'Query long-term memory for a concept. Returns related facts up to `depth` hops away and matching past notes, ranked by relevance.',
             'parameters': {
                 'type': 'object',
                 'properties': {
                     'concept': {'type': 'string', 'description': 'The concept to search for'},
+                    'depth': {'type': 'integer', 'description': 'How many hops to follow (1-3, default 2)'},
                 },
                 'required': ['concept'],
             },
@@ -210,13 +257,14 @@ tools = [
         'type': 'function',
         'function': {
             'name': 'ask_specialist',
-            'description': 'Delegate a complex coding task to a specialist model.',
+            'description': 'Delegate a complex coding task to a specialist model. Pass several independent tasks as `prompts` to run them in parallel.',
             'parameters': {
                 'type': 'object',
                 'properties': {
                     'prompt': {'type': 'string', 'description': 'The task description'},
+                    'prompts': {'type': 'array', 'items': {'type': 'string'}, 'description': 'Several independent tasks, answered concurrently'},
+                    'samples': {'type': 'integer', 'description': 'Generate this many candidates and keep the first whose Python passes the linter'},
                 },
-                'required': ['prompt'],
             },
         },
     }
@@ -275,21 +323,32 @@ def agent_loop(model_name=DEFAULT_MODEL, initial_prompt=None):
         user_input = input("User: ")
         messages.append({'role': 'user', 'content': user_input})
     
+    ollama = lazy_import("ollama")
+    request_budget, turn = budget.Budget.from_config(), 0
     while True:
-        try:
-            response = ollama.chat(
-                model=model_name,
-                messages=messages,
-                tools=tools,
-            )
-        except Exception as e:
-            print(f"Error calling Ollama: {e}")
-            break
-
-        msg = response['message']
-        messages.append(msg)
-        tool_calls = msg.get('tool_calls')
-        content = msg.get('content', '')
+        turn += 1
+        max_turns = request_budget.turns(MAX_TURNS)
+        over = request_budget.exhausted() or (turn > max_turns and ("turns", turn - 1, max_turns))
+        if over:
+            # Out of budget for this message: hand back to the user with what was done so far
+            print(f"[!] {budget.BudgetExceeded(*over)}. Stopping this request.")
+            msg, tool_calls, content = None, None, ""
+        else:
+            try:
+                response = ollama.chat(
+                    model=model_name,
+                    messages=messages,
+                    tools=tools,
+                )
+            except Exception as e:
+                print(f"Error calling Ollama: {e}")
+                break
+            request_budget.charge_llm(response)
+
+            msg = response['message']
+            messages.append(msg)
+            tool_calls = msg.get('tool_calls')
+            content = msg.get('content', '')
 
         # Enhanced Fallback: Parse multiple JSON blocks from content
         if not tool_calls:
@@ -306,7 +365,9 @@ def agent_loop(model_name=DEFAULT_MODEL, initial_prompt=None):
                 tool_calls = parsed_calls
 
         if not tool_calls:
-            print(f"Lyra: {content}")
+            if msg is not None:
+                print(f"Lyra: {content}")
+            print(f"[*] Budget: {request_budget.summary()}")
             if initial_prompt: # One-shot mode if auto
                 break
             
@@ -314,6 +375,7 @@ def agent_loop(model_name=DEFAULT_MODEL, initial_prompt=None):
             if user_input.lower() in ['exit', 'quit']:
                 break
             messages.append({'role': 'user', 'content': user_input})
+            request_budget, turn = budget.Budget.from_config(), 0
             continue
 
         # Process tool calls
@@ -321,7 +383,15 @@ def agent_loop(model_name=DEFAULT_MODEL, initial_prompt=None):
             fname = tool['function']['name']
             args = tool['function']['arguments']
             
-            if fname == 'run_shell_command':
+            try:
+                request_budget.charge_tool(fname)
+                refused = None
+            except budget.BudgetExceeded as e:
+                refused = e
+
+            if refused:
+                res = {"error": f"Not run: {refused}"}
+            elif fname == 'run_shell_command':
                 res = run_shell_command(args['command'])
             elif fname == 'read_file':
                 res = read_file(args['path'])
@@ -330,9 +400,10 @@ def agent_loop(model_name=DEFAULT_MODEL, initial_prompt=None):
             elif fname == 'update_memory':
                 res = update_memory(args.get('subject'), args.get('relation'), args.get('target'))
             elif fname == 'recall_memory':
-                res = recall_memory(args['concept'])
+                res = recall_memory(args['concept'], args.get('depth', 2))
             elif fname == 'ask_specialist':
-                res = ask_specialist(args['prompt'])
+                with budget.use(request_budget):
+                    res = ask_specialist(args.get('prompt'), args.get('prompts'), args.get('samples', 1))
             elif fname == 'web_search' and HAS_WEB:
                 res = web_search(args['query'])
             else:
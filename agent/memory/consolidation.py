@@ -0,0 +1,319 @@
+import argparse
+import datetime
+import json
+import os
+import re
+import threading
+import time
+import zlib
+
+from ..core.filelock import atomic_write_json
+
+MERSENNE_PRIME = (1 << 61) - 1
+NUM_PERM = 32
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+
+# Fixed coefficients so signatures are stable across processes
+_rng_state = 0x2545F4914F6CDD1D
+_PERMS = []
+for _ in range(NUM_PERM):
+    _rng_state = (_rng_state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+    a = (_rng_state >> 3) % MERSENNE_PRIME or 1
+    _rng_state = (_rng_state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+    b = (_rng_state >> 3) % MERSENNE_PRIME
+    _PERMS.append((a, b))
+
+
+def shingles(text, k=3):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(text):
+    hashes = [zlib.crc32(s.encode()) for s in shingles(text)] or [0]
+    return tuple(min((a * h + b) % MERSENNE_PRIME for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def _parse_time(value, default):
+    if not value:
+        return default
+    try:
+        return datetime.datetime.fromisoformat(str(value).replace(" ", "T")).timestamp()
+    except ValueError:
+        return default
+
+
+class Consolidator:
+    """Incremental dedup, decay and eviction for the episodic log and the memory graph.
+
+    Every step() does a bounded slice of work and skips the round entirely if a
+    store is busy, so it can run on a background thread next to tool calls.
+    Evicted records are appended to an archive file next to the store.
+    """
+
+    def __init__(self, episodic=None, graph=None, max_memories=5000, max_edges=50000, half_life_days=30.0,
+                 min_weight=0.05, dup_threshold=0.8, chunk=200, decay_interval=3600,
+                 state_file="data/state/consolidation.json"):
+        self.episodic = episodic
+        self.graph = graph
+        self.max_memories = max_memories
+        self.max_edges = max_edges
+        self.half_life = half_life_days * 86400
+        self.min_weight = min_weight
+        self.dup_threshold = dup_threshold
+        self.chunk = chunk
+        self.decay_interval = decay_interval
+        self.state_file = state_file
+        self.state = self._load_state()
+
+        self._signatures = {}
+        self._buckets = {}
+        self._cursor = 0
+        self._decay_pass = None
+        self._thread = None
+        self._stop = threading.Event()
+        self.totals = {"merged": 0, "archived_memories": 0, "decayed_edges": 0, "archived_edges": 0}
+
+    def _load_state(self):
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError):
+                pass
+        return {}
+
+    def _save_state(self):
+        if not self.state_file:
+            return
+        os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+        atomic_write_json(self.state_file, self.state)
+
+    def _archive(self, path, records, kind):
+        if not records:
+            return
+        now = datetime.datetime.now().isoformat()
+        with open(path, 'a') as f:
+            for record in records:
+                f.write(json.dumps({"kind": kind, "archived_at": now, "record": record}) + "\n")
+
+    # --- Episodic log ---
+
+    def _bands(self, sig):
+        return [(i, sig[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+    def _forget(self, memory_id):
+        sig = self._signatures.pop(memory_id, None)
+        if sig:
+            for band in self._bands(sig):
+                ids = self._buckets.get(band)
+                if ids:
+                    ids.discard(memory_id)
+
+    def _merge_usage(self, from_id, into_id):
+        usage = self.episodic.usage
+        hits = usage.pop(from_id, None)
+        if hits:
+            into = usage.setdefault(into_id, [0, hits[1]])
+            into[0] += hits[0]
+            into[1] = max(into[1], hits[1])
+
+    def dedup_step(self):
+        """MinHash/LSH near-duplicate merge over the next `chunk` unseen entries."""
+        batch = self.episodic.entries_after(self._cursor, self.chunk)
+        if not batch:
+            return 0
+        signatures = [minhash(entry['content']) for entry in batch]
+        # Only the entries that share an LSH bucket with this batch are loaded
+        candidates = {other for sig in signatures for band in self._bands(sig) for other in self._buckets.get(band, ())}
+        by_id = {e['id']: e for e in self.episodic.get(candidates)}
+        for memory_id in candidates - by_id.keys():
+            self._forget(memory_id)  # removed since it was indexed
+        by_id.update((e['id'], e) for e in batch)
+        updated, removed = {}, []
+        for entry, sig in zip(batch, signatures):
+            match = None
+            for band in self._bands(sig):
+                for other in self._buckets.get(band, ()):
+                    if other in by_id and similarity(sig, self._signatures[other]) >= self.dup_threshold:
+                        match = other
+                        break
+                if match:
+                    break
+            if match is not None:
+                # Keep the newer entry; the older one's tags and recall hits carry over and it is archived
+                older = updated.pop(match, None) or by_id[match]
+                entry = dict(entry, timestamp=max(older.get('timestamp') or "", entry.get('timestamp') or ""),
+                             tags=sorted(set(older.get('tags') or []) | set(entry.get('tags') or [])))
+                updated[entry['id']] = entry
+                removed.append(older)
+                self._merge_usage(match, entry['id'])
+                self._forget(match)
+            self._signatures[entry['id']] = sig
+            for band in self._bands(sig):
+                self._buckets.setdefault(band, set()).add(entry['id'])
+        self._cursor = batch[-1]['id']
+        if updated:
+            self.episodic.update(list(updated.values()))
+        if removed:
+            self._archive(os.path.join(self.episodic.data_dir, "archive.jsonl"), removed, "duplicate")
+            self.episodic.remove(e['id'] for e in removed)
+            self.totals["merged"] += len(removed)
+        return len(batch)
+
+    def evict_memories(self):
+        """Archives the coldest entries (fewest recall hits, oldest) beyond max_memories."""
+        entries = self.episodic.entries()
+        excess = len(entries) - self.max_memories
+        if excess <= 0:
+            return 0
+        usage = self.episodic.usage
+
+        def warmth(entry):
+            hits, last_hit = usage.get(entry['id'], (0, 0))
+            return (hits, max(last_hit, _parse_time(entry.get('timestamp'), 0)))
+        cold = sorted(entries, key=warmth)[:excess]
+        self._archive(os.path.join(self.episodic.data_dir, "archive.jsonl"), cold, "memory")
+        self.episodic.remove(e['id'] for e in cold)
+        for entry in cold:
+            self._forget(entry['id'])
+        self.totals["archived_memories"] += len(cold)
+        return len(cold)
+
+    # --- Memory graph ---
+
+    def decay_step(self):
+        """Decays the next slice of edges by idle time since the previous pass; returns True when a pass ends."""
+        now = time.time()
+        if self._decay_pass is None:
+            last = self.state.get("last_decay")
+            if last and now - last < self.decay_interval:
+                return False
+            self._decay_pass = {"at": now, "previous": last, "offset": 0, "edges": self.graph.edges()}
+        run = self._decay_pass
+        edges = run["edges"][run["offset"]:run["offset"] + self.chunk * 10]
+        weights = {}
+        for edge in edges:
+            idle_from = max(run["previous"] or 0,
+                            _parse_time(edge.get("last_used"), 0),
+                            _parse_time(edge.get("created_at"), run["at"]))
+            idle = run["at"] - idle_from
+            if idle > 0 and self.half_life > 0:
+                weights[(edge["source"], edge["target"], edge["relation"])] = edge["weight"] * 0.5 ** (idle / self.half_life)
+        if weights:
+            self.graph.set_edge_weights(weights)
+            self.totals["decayed_edges"] += len(weights)
+        run["offset"] += len(edges)
+        if run["offset"] < len(run["edges"]):
+            return False
+        self.state["last_decay"] = run["at"]
+        self._save_state()
+        self._decay_pass = None
+        return True
+
+    def evict_edges(self):
+        """Archives edges under min_weight, then the weakest edges beyond max_edges."""
+        edges = self.graph.edges()
+        weak = [e for e in edges if e["weight"] < self.min_weight]
+        strong = sorted((e for e in edges if e["weight"] >= self.min_weight), key=lambda e: e["weight"])
+        excess = len(strong) - self.max_edges
+        if excess > 0:
+            weak += strong[:excess]
+        if not weak:
+            return 0
+        self._archive(os.path.splitext(self.graph.file_path)[0] + ".archive.jsonl", weak, "edge")
+        self.graph.remove_edges((e["source"], e["target"], e["relation"]) for e in weak)
+        self.totals["archived_edges"] += len(weak)
+        return len(weak)
+
+    # --- Scheduling ---
+
+    def _try(self, store, fn):
+        lock = getattr(store, "_lock", None)
+        if lock is None:
+            return fn()
+        if not lock.acquire(blocking=False):
+            return None  # a tool call is using the store; try again next round
+        try:
+            return fn()
+        finally:
+            lock.release()
+
+    def step(self):
+        """One bounded unit of work. Returns True if there may be more to do right away."""
+        busy = False
+        if self.episodic is not None:
+            processed = self._try(self.episodic, self.dedup_step)
+            if processed is None or processed:
+                busy = True
+            elif processed == 0:
+                self._try(self.episodic, self.evict_memories)
+        if self.graph is not None:
+            finished = self._try(self.graph, self.decay_step)
+            if finished:
+                self._try(self.graph, self.evict_edges)
+            elif self._decay_pass is not None:
+                busy = True
+        return busy
+
+    def run_once(self, max_steps=100000):
+        """Runs steps until the stores are consolidated (used by the CLI)."""
+        for _ in range(max_steps):
+            if not self.step():
+                break
+        return self.totals
+
+    def start(self, interval=30.0):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    more = self.step()
+                except Exception as e:
+                    print(f"[Consolidator] Step failed: {e}")
+                    more = False
+                self._stop.wait(0.05 if more else interval)
+        self._thread = threading.Thread(target=loop, name="memory-consolidation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    from ..core.memory_manager import MemoryManager as GraphMemory, MEMORY_FILE
+    from .manager import MemoryManager as EpisodicMemory
+
+    parser = argparse.ArgumentParser(description="Run a full memory consolidation pass (dedup, decay, eviction).")
+    parser.add_argument("--graph", default=MEMORY_FILE)
+    parser.add_argument("--data-dir", default="data/memories")
+    parser.add_argument("--max-memories", type=int, default=5000)
+    parser.add_argument("--max-edges", type=int, default=50000)
+    parser.add_argument("--half-life-days", type=float, default=30.0)
+    parser.add_argument("--min-weight", type=float, default=0.05)
+    parser.add_argument("--threshold", type=float, default=0.8, help="MinHash similarity for merging")
+    args = parser.parse_args(argv)
+
+    consolidator = Consolidator(
+        episodic=EpisodicMemory(args.data_dir),
+        graph=GraphMemory(args.graph) if os.path.exists(args.graph) else None,
+        max_memories=args.max_memories, max_edges=args.max_edges, half_life_days=args.half_life_days,
+        min_weight=args.min_weight, dup_threshold=args.threshold, decay_interval=0)
+    totals = consolidator.run_once()
+    print(f"[✓] Merged {totals['merged']} duplicate memories, archived {totals['archived_memories']}.")
+    print(f"[✓] Decayed {totals['decayed_edges']} edges, archived {totals['archived_edges']}.")
+
+
+if __name__ == "__main__":
+    main()
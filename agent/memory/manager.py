@@ -1,42 +1,156 @@
+import contextlib
 import json
 import os
+import re
 import time
+import threading
+
+from ..core.memory_manager import default_backend
+from ..core.filelock import FileLock, atomic_write_json, file_signature, next_id
 
 class MemoryManager:
-    def __init__(self, data_dir="data/memories"):
+    def __init__(self, data_dir="data/memories", backend=None):
         self.data_dir = data_dir
         os.makedirs(self.data_dir, exist_ok=True)
         self.index_file = os.path.join(self.data_dir, "index.json")
-        self.memories = self._load_index()
+        self.backend = backend or default_backend()
+        self.store = None
+        self._file_lock = FileLock(self.index_file)
+        self._signature = None
+        if self.backend == "sqlite":
+            from ..core.sqlite_store import SQLiteMemoryStore
+            self.store = SQLiteMemoryStore(os.path.join(self.data_dir, "index.db"))
+            self.memories = None
+        else:
+            self.memories = self._load_index()
+        self._lock = threading.RLock()
+        # id -> [hits, last_hit_time]; consolidation uses it to decide what is cold
+        self.usage = {}
 
     def _load_index(self):
-        if os.path.exists(self.index_file):
+        self._signature = file_signature(self.index_file)
+        if self._signature is not None:
             with open(self.index_file, 'r') as f:
                 return json.load(f)
         return []
 
     def _save_index(self):
-        with open(self.index_file, 'w') as f:
-            json.dump(self.memories, f, indent=2)
+        atomic_write_json(self.index_file, self.memories)
+        self._signature = file_signature(self.index_file)
+
+    def _refresh(self):
+        """Reloads index.json if another process rewrote it."""
+        if file_signature(self.index_file) != self._signature:
+            self.memories = self._load_index()
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Holds the thread lock and <index>.lock, with the latest index loaded."""
+        with self._lock, self._file_lock:
+            self._refresh()
+            yield
 
     def save(self, content, tags=None):
+        if self.store:
+            return f"Memory saved with ID {self.store.save(content, tags)}"
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        memory_id = len(self.memories) + 1
-        entry = {
-            "id": memory_id,
-            "timestamp": timestamp,
-            "content": content,
-            "tags": tags or []
-        }
-        self.memories.append(entry)
-        self._save_index()
+        with self._exclusive():
+            # The counter file keeps ids unique across processes and never reuses deleted ones
+            memory_id = next_id(os.path.join(self.data_dir, "index.seq"), max((m["id"] for m in self.memories), default=0))
+            entry = {
+                "id": memory_id,
+                "timestamp": timestamp,
+                "content": content,
+                "tags": tags or []
+            }
+            self.memories.append(entry)
+            self._save_index()
         return f"Memory saved with ID {memory_id}"
 
     def retrieve_relevant(self, query):
-        # Simple keyword matching for now
-        results = []
-        words = query.lower().split()
-        for mem in self.memories:
-            if any(w in mem['content'].lower() for w in words):
-                results.append(mem['content'])
-        return "\n".join(results[-3:]) # Return top 3 recent relevant
+        if self.store:
+            matches = self.store.recent_matching(query, 3)
+        else:
+            with self._lock:
+                self._refresh()
+            # Simple keyword matching for now
+            words = query.lower().split()
+            matches = [mem for mem in self.memories if any(w in mem['content'].lower() for w in words)][-3:]
+        self._record_hits(m['id'] for m in matches)
+        return "\n".join(m['content'] for m in matches) # Return top 3 recent relevant
+
+    def search(self, query, limit=10):
+        """Ranked matches with a 'score' (BM25 on sqlite, share of query words matched on json)."""
+        if self.store:
+            matches = self.store.search(query, limit)
+        else:
+            words = set(re.findall(r"\w+", query.lower()))
+            if not words:
+                return []
+            with self._lock:
+                self._refresh()
+                memories = list(self.memories)
+            scored = []
+            for mem in memories:
+                content = mem['content'].lower()
+                hits = sum(1 for w in words if w in content)
+                if hits:
+                    scored.append(dict(mem, score=hits / len(words)))
+            # Newest first among equal scores
+            matches = sorted(scored, key=lambda m: (m['score'], m['id']), reverse=True)[:limit]
+        self._record_hits(m['id'] for m in matches)
+        return matches
+
+    def _record_hits(self, ids):
+        now = time.time()
+        for memory_id in ids:
+            hits = self.usage.setdefault(memory_id, [0, now])
+            hits[0] += 1
+            hits[1] = now
+
+    def entries(self):
+        if self.store:
+            return self.store.all()
+        with self._lock:
+            self._refresh()
+            return list(self.memories)
+
+    def entries_after(self, cursor, limit):
+        """The next `limit` entries with ids above `cursor`, in id order."""
+        if self.store:
+            return self.store.after(cursor, limit)
+        with self._lock:
+            self._refresh()
+            return sorted((m for m in self.memories if m['id'] > cursor), key=lambda m: m['id'])[:limit]
+
+    def get(self, ids):
+        """The stored entries among `ids`; ids that were removed are left out."""
+        if self.store:
+            return self.store.get(ids)
+        ids = set(ids)
+        with self._lock:
+            self._refresh()
+            return [m for m in self.memories if m['id'] in ids]
+
+    def update(self, entries):
+        """Replaces stored entries that have the same ids."""
+        if self.store:
+            with self.store.batch():
+                for entry in entries:
+                    self.store.update(entry)
+            return
+        by_id = {e['id']: e for e in entries}
+        with self._exclusive():
+            self.memories = [by_id.get(m['id'], m) for m in self.memories]
+            self._save_index()
+
+    def remove(self, ids):
+        ids = set(ids)
+        if self.store:
+            self.store.delete(ids)
+        else:
+            with self._exclusive():
+                self.memories = [m for m in self.memories if m['id'] not in ids]
+                self._save_index()
+        for memory_id in ids:
+            self.usage.pop(memory_id, None)
@@ -0,0 +1,53 @@
+import argparse
+import json
+import os
+
+from ..core.memory_manager import MEMORY_FILE
+from ..core.sqlite_store import SQLiteGraphStore, SQLiteMemoryStore
+
+
+def migrate_graph(json_path=MEMORY_FILE, db_path=None):
+    """Copies the JSON memory graph into <name>.db next to it. Safe to re-run."""
+    db_path = db_path or os.path.splitext(json_path)[0] + ".db"
+    with open(json_path, 'r') as f:
+        graph = json.load(f)
+    store = SQLiteGraphStore(db_path)
+    counts = store.import_graph(graph)
+    store.close()
+    return db_path, counts
+
+
+def migrate_index(json_path="data/memories/index.json", db_path=None):
+    """Copies the episodic JSON index into index.db next to it. Safe to re-run."""
+    db_path = db_path or os.path.join(os.path.dirname(json_path), "index.db")
+    with open(json_path, 'r') as f:
+        entries = json.load(f)
+    store = SQLiteMemoryStore(db_path)
+    count = store.import_entries(entries)
+    store.close()
+    return db_path, count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate JSON memory stores to the SQLite backend.")
+    parser.add_argument("--graph", default=MEMORY_FILE, help="Memory graph JSON file")
+    parser.add_argument("--index", action="append", help="Episodic index.json (repeatable)")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.graph):
+        db_path, counts = migrate_graph(args.graph)
+        print(f"[✓] Graph: {counts['nodes']} nodes, {counts['edges']} edges -> {db_path}")
+    else:
+        print(f"[!] No graph at {args.graph}, skipped.")
+
+    for index in args.index or ["data/memories/index.json"]:
+        if os.path.exists(index):
+            db_path, count = migrate_index(index)
+            print(f"[✓] Index: {count} memories -> {db_path}")
+        else:
+            print(f"[!] No index at {index}, skipped.")
+    print("Set ARCH_MEMORY_BACKEND=sqlite to use the migrated stores.")
+
+
+if __name__ == "__main__":
+    main()
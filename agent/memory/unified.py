@@ -0,0 +1,138 @@
+import concurrent.futures
+import threading
+import time
+
+DEFAULT_BUDGET = 0.5  # seconds a recall may wait for the slower store
+
+
+class UnifiedMemory:
+    """Single recall/save entry point over the fact graph and the episodic log.
+
+    recall() queries both stores in parallel and merges whatever answered
+    within the latency budget into one ranked list. save() routes
+    subject/relation/target triples to the graph and free text to the
+    episodic log. A store that was not passed in is opened on a background
+    thread at construction; recall() waits for that before its budget starts.
+    """
+
+    def __init__(self, graph=None, episodic=None, budget=DEFAULT_BUDGET):
+        self._graph = graph
+        self._episodic = episodic
+        self.budget = budget
+        self._open_lock = threading.Lock()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-recall")
+        self._warm = threading.Thread(target=self.warm_up, name="memory-warm-up", daemon=True)
+        self._warm.start()
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self._open_lock:
+                if self._graph is None:
+                    from ..core.memory_manager import MemoryManager
+                    self._graph = MemoryManager()
+        return self._graph
+
+    @property
+    def episodic(self):
+        if self._episodic is None:
+            with self._open_lock:
+                if self._episodic is None:
+                    from .manager import MemoryManager
+                    self._episodic = MemoryManager()
+        return self._episodic
+
+    def warm_up(self):
+        """Opens both stores and builds the graph's adjacency map, the slow part of a first recall."""
+        try:
+            self.graph.get_related("")
+            self.episodic
+        except Exception as e:
+            print(f"[!] Memory warm-up failed: {e}")
+
+    # --- Reads ---
+
+    def _graph_hits(self, query, depth, limit):
+        graph = self.graph
+        seed = graph.find_node(query)
+        if not seed:
+            matches = graph.search(query, 1)
+            if not matches:
+                return []
+            seed = matches[0]
+        # The seed itself is a hit, so a node without edges is still recalled
+        node = {"source": "graph", "text": seed["label"], "score": 1.0}
+        properties = seed.get("properties") or {}
+        if properties:
+            node["text"] += " (" + ", ".join(f"{k}: {v}" for k, v in properties.items()) + ")"
+        result = graph.traverse(seed["label"], depth=depth, limit=limit)
+        if not result:
+            return [node]
+        scores = {n["id"]: n["score"] for n in result["nodes"]}
+        scores[result["seed"]["id"]] = 1.0
+        labels = {n["id"]: n["label"] for n in result["nodes"]}
+        labels[result["seed"]["id"]] = result["seed"]["label"]
+        hits = [{"source": "graph",
+                 "text": f"{labels[e['source']]} {e['relation']} {labels[e['target']]}",
+                 "score": min(scores[e["source"]], scores[e["target"]]) * e["weight"]}
+                for e in result["edges"]]
+        return [node] + sorted(hits, key=lambda h: -h["score"])[:limit - 1]
+
+    def _episodic_hits(self, query, limit):
+        return [{"source": "episodic", "text": m["content"], "score": m["score"],
+                 "id": m["id"], "timestamp": m.get("timestamp")}
+                for m in self.episodic.search(query, limit)]
+
+    def recall(self, query, depth=2, limit=10, budget=None):
+        """Ranked facts and memories for a query; stores that miss the budget are listed in 'timed_out'."""
+        self._warm.join()  # opening a store is not part of the budget
+        start = time.perf_counter()
+        futures = {
+            self._pool.submit(self._graph_hits, query, depth, limit): "graph",
+            self._pool.submit(self._episodic_hits, query, limit): "episodic",
+        }
+        done, pending = concurrent.futures.wait(futures, timeout=self.budget if budget is None else budget)
+
+        results, errors = [], {}
+        for future in done:
+            try:
+                hits = future.result()
+            except Exception as e:
+                errors[futures[future]] = str(e)
+                continue
+            # Scores are not comparable across stores; scale each to its own best hit
+            top = max((h["score"] for h in hits), default=0) or 1
+            for hit in hits:
+                hit["score"] = round(hit["score"] / top, 4)
+            results.extend(hits)
+        results.sort(key=lambda h: -h["score"])
+
+        response = {
+            "found": bool(results),
+            "results": results[:limit],
+            "timed_out": sorted(futures[f] for f in pending),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+        if errors:
+            response["errors"] = errors
+        return response
+
+    # --- Writes ---
+
+    def save(self, content=None, subject=None, relation=None, target=None, tags=None):
+        """Stores a subject/relation/target fact in the graph, or free text in the episodic log."""
+        if subject and relation and target:
+            graph = self.graph
+            with graph.batch():
+                s_node = graph.add_node(subject.lower().replace(" ", "_"), "entity", subject)
+                t_node = graph.add_node(target.lower().replace(" ", "_"), "entity", target)
+                graph.add_edge(s_node["id"], t_node["id"], relation)
+            return {"status": "success", "store": "graph", "message": f"Learned: {subject} {relation} {target}"}
+        if subject or relation or target:
+            return {"error": "A fact needs subject, relation and target (e.g. 'Mayank', 'likes', 'Rust')."}
+        if not content:
+            return {"error": "Nothing to save: pass content, or subject/relation/target."}
+        return {"status": "success", "store": "episodic", "message": self.episodic.save(content, tags)}
+
+    def close(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,173 @@
+import ast
+import os
+import re
+
+WRITE_VERBS = re.compile(r"\b(create|write|save|generate|make|add|produce)\b", re.I)
+RUN_VERBS = re.compile(r"\b(run|execute|install|build|compile)\b", re.I)
+# Tasks whose deliverable is the model's answer, not a side effect
+ANSWER_VERBS = re.compile(r"\b(summari[sz]e|explain|describe|analy[sz]e|report|tell|answer|review|compare|what|why|how)\b", re.I)
+PATH = re.compile(r"""(?:['"`]([^'"`\s]+\.\w{1,8})['"`])|((?:~|\.{1,2})?/?[\w.-]+(?:/[\w.-]+)*\.[A-Za-z]\w{0,7})\b""")
+CONTENT = re.compile(r"""\b(?:with (?:the )?(?:content|text)|containing|that (?:says|prints))\s+(['"])(.+?)\1""", re.I)
+
+
+def _resolve(path):
+    return os.path.abspath(os.path.expanduser(path))
+
+
+def mentioned_paths(task):
+    paths = []
+    for quoted, bare in PATH.findall(task):
+        path = quoted or bare
+        ext = os.path.splitext(path)[1]
+        # Skip things like "v3.1" or "e.g." that only look like files
+        if not re.search(r"[A-Za-z]", ext) or (bare and "/" not in bare and len(ext) < 3):
+            continue
+        if path not in paths:
+            paths.append(path)
+    return paths
+
+
+class Evaluator:
+    """Derives cheap deterministic postconditions for a sub-task and checks them.
+
+    Checks come from the task text (files it asks to create, content they must
+    hold, commands it asks to run), from the tool calls that were made (written
+    files must hold what was written, written or edited .py files must parse,
+    commands must exit 0) and from an optional "checks" list on the plan item.
+    Checks from the tool calls alone mostly restate what was just done, so a
+    verdict is only conclusive when the task text or the plan item supplied
+    at least one check (marked "task": True).
+    """
+
+    def derive(self, task, calls, explicit=None):
+        """calls: [(tool name, args, result), ...] made so far in the sub-task."""
+        checks = [dict(c) for c in explicit or []]
+        written, failed_writes, edited = {}, {}, {}
+        last_command = None
+        running_jobs = {}  # job_id -> command, until a poll sees it finish
+        for name, args, result in calls:
+            failed = isinstance(result, dict) and result.get("error")
+            if name == "write_file" and args.get("path"):
+                key = _resolve(args["path"])
+                if failed:
+                    failed_writes[key] = (f"write_file({args['path']})", result["error"])
+                else:
+                    written[key] = (args["path"], args.get("content", ""))
+                    failed_writes.pop(key, None)
+            elif name in ("edit_file", "apply_patch"):
+                if failed:
+                    label = args.get("path") or "patch"
+                    failed_writes[_resolve(label)] = (f"{name}({label})", result["error"])
+                    continue
+                results = result.get("files", [result]) if isinstance(result, dict) else []
+                for path in [r["path"] for r in results if r.get("path") and not r.get("deleted")]:
+                    key = _resolve(path)
+                    # The edit changed what write_file put there; only the syntax can still be checked
+                    written.pop(key, None)
+                    edited[key] = path
+                    failed_writes.pop(key, None)
+                failed_writes.pop(_resolve(args.get("path") or "patch"), None)
+            elif name == "run_shell_command" and isinstance(result, dict) and "exit_code" in result:
+                last_command = (args.get("command"), result)
+            elif name in ("job_status", "job_output", "job_kill") and isinstance(result, dict):
+                for job in result.get("jobs") or [result]:
+                    if job.get("job_id") and job.get("exit_code") is not None:
+                        # A background job that has finished counts like a foreground command
+                        command = running_jobs.pop(job["job_id"], None) or job.get("command") or job["job_id"]
+                        last_command = (command, {"exit_code": job["exit_code"], "stderr": job.get("tail", "")})
+            elif name == "run_shell_command" and isinstance(result, dict) and result.get("job_id"):
+                running_jobs[result["job_id"]] = args.get("command")
+            elif name == "run_python" and isinstance(result, dict):
+                last_command = ("run_python", {"exit_code": 1 if result.get("error") else 0, "stderr": result.get("error") or ""})
+
+        paths = mentioned_paths(task) if WRITE_VERBS.search(task) else []
+        named = {_resolve(p) for p in paths}
+        wants_run = bool(RUN_VERBS.search(task))
+        for tool, error in failed_writes.values():
+            checks.append({"type": "tool_ok", "tool": tool, "error": error})
+        for key, (path, content) in written.items():
+            checks.append({"type": "content_equals", "path": path, "expected": content, "task": key in named})
+            if path.endswith(".py"):
+                checks.append({"type": "python_parses", "path": path, "task": key in named})
+        for key, path in edited.items():
+            if path.endswith(".py") and key not in written:
+                checks.append({"type": "python_parses", "path": path, "task": key in named})
+        if last_command:
+            # Only the most recent command has to succeed; earlier failures may already be fixed
+            command, result = last_command
+            checks.append({"type": "exit_code", "command": command, "exit_code": result["exit_code"],
+                           "stderr": (result.get("stderr") or "")[-300:], "task": wants_run})
+
+        for path in paths:
+            if _resolve(path) not in written and _resolve(path) not in edited:
+                checks.append({"type": "file_exists", "path": path, "task": True})
+        content = CONTENT.search(task)
+        if content and len(paths) == 1:
+            checks.append({"type": "content_contains", "path": paths[0], "expected": content.group(2), "task": True})
+        for job_id, command in running_jobs.items():
+            checks.append({"type": "job_running", "job_id": job_id, "command": command})
+        if wants_run and not last_command and not running_jobs:
+            checks.append({"type": "command_ran", "task": True})
+        return checks
+
+    def run_check(self, check):
+        """Returns None if the check passes, else a one-line failure."""
+        kind = check["type"]
+        if kind == "tool_ok":
+            return f"{check['tool']} failed: {check['error']}"
+        if kind == "exit_code":
+            if check["exit_code"] == 0:
+                return None
+            return f"`{check['command']}` exited with {check['exit_code']}: {check['stderr'].strip()}"
+        if kind == "command_ran":
+            return "the task asks for a command to be run, but no command has been run yet"
+        if kind == "job_running":
+            return f"background job {check['job_id']} (`{check['command']}`) has not been seen to finish; wait for it with job_status"
+        path = _resolve(check["path"])
+        if not os.path.isfile(path):
+            return f"{check['path']} does not exist"
+        if kind == "file_exists":
+            return None
+        try:
+            with open(path, 'r') as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as e:
+            return f"{check['path']} cannot be read: {e}"
+        if kind == "content_equals" and text != check["expected"]:
+            return f"{check['path']} does not contain what was written (file changed or write failed)"
+        if kind == "content_contains" and check["expected"] not in text:
+            return f"{check['path']} should contain {check['expected']!r} but has {text[:80]!r}"
+        if kind == "python_parses":
+            try:
+                ast.parse(text)
+            except SyntaxError as e:
+                return f"{check['path']} has a syntax error at line {e.lineno}: {e.msg}"
+        return None
+
+    def evaluate(self, task, calls, explicit=None):
+        """{'conclusive', 'passed', 'checks', 'failures'}.
+
+        Not conclusive when no check came from the task text, nothing was
+        written or run yet, a background job has not been seen to finish, or
+        the task wants an answer rather than a side effect; the model then
+        takes another turn as usual.
+        """
+        checks = self.derive(task, calls, explicit)
+        failures = [f for f in (self.run_check(c) for c in checks) if f]
+        # Files named in the task may predate it, so something must have been written or run first
+        acted = any(name in ("write_file", "edit_file", "apply_patch", "run_shell_command", "run_python") for name, _, _ in calls)
+        from_task = any(c.get("task") for c in checks)
+        # Until a job's exit code is known, nothing that depends on it can be judged
+        running = any(c["type"] == "job_running" for c in checks)
+        conclusive = not running and (bool(explicit) or (from_task and acted and not ANSWER_VERBS.search(task)))
+        return {"conclusive": conclusive, "passed": conclusive and not failures, "checks": checks, "failures": failures}
+
+    @staticmethod
+    def describe(checks):
+        parts = []
+        for c in checks:
+            if c["type"] == "exit_code":
+                parts.append(f"`{c['command']}` exit 0")
+            elif "path" in c:
+                parts.append(f"{c['path']} {c['type'].replace('_', ' ')}")
+        return "; ".join(parts)
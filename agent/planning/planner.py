@@ -1,45 +1,61 @@
-import ollama
 import json
+from ..core import budget, llm
+from ..core.prompt import PromptTemplate, static, dynamic
+
+# Static instructions first so every decomposition shares the same prompt prefix
+DECOMPOSE_PROMPT = PromptTemplate(
+    "planner.decompose",
+    static("instructions", """Break down the complex AI engineering goal given at the end into a sequence of sub-tasks.
+Categorize each task based on its complexity:
+- 'SPECIALIST': Simple technical tasks like writing a single function, creating a file, or running a command.
+- 'ARCHITECT': Complex reasoning, multi-file integration, or high-level logic design."""),
+    static("format", """Output your response strictly as a JSON list of objects:
+[
+  {"task": "Task description", "type": "SPECIALIST"},
+  {"task": "Task description", "type": "ARCHITECT"}
+]"""),
+    dynamic("goal", "GOAL: {goal}"),
+)
 
 class Planner:
     def __init__(self, primary_model="deepseek-v3.1:671b-cloud", fallback_model="qwen2.5:0.5b"):
         self.primary_model = primary_model
         self.fallback_model = fallback_model
 
-    def decompose(self, goal):
-        prompt = f"""Break down the following complex AI engineering goal into a sequence of sub-tasks.
-        Categorize each task based on its complexity:
-        - 'SPECIALIST': Simple technical tasks like writing a single function, creating a file, or running a command.
-        - 'ARCHITECT': Complex reasoning, multi-file integration, or high-level logic design.
-        
-        GOAL: {goal}
-        
-        Output your response strictly as a JSON list of objects:
-        [
-          {{"task": "Task description", "type": "SPECIALIST"}},
-          {{"task": "Task description", "type": "ARCHITECT"}}
-        ]
-        """
+    def decompose(self, goal, on_event=None):
+        prompt = DECOMPOSE_PROMPT.render(goal=goal)
         
         print(f"[Planner] Attempting decomposition with {self.primary_model}...")
         try:
-            response = ollama.chat(
-                model=self.primary_model,
-                messages=[{'role': 'user', 'content': prompt}]
+            response = llm.chat(
+                self.primary_model,
+                [{'role': 'user', 'content': prompt}],
+                on_event=on_event,
+                options=llm.cacheable_options(),
+                stop_when=llm.stop_after_plan(),
+                echo=True
             )
             plan = self._parse_plan(response['message']['content'])
             if plan: return plan
+        except budget.BudgetExceeded:
+            raise
         except Exception as e:
             print(f"[!] Primary Planner Failed: {e}.")
         
         print(f"[*] Falling back to {self.fallback_model} for planning...")
         try:
-            response = ollama.chat(
-                model=self.fallback_model,
-                messages=[{'role': 'user', 'content': prompt}]
+            response = llm.chat(
+                self.fallback_model,
+                [{'role': 'user', 'content': prompt}],
+                on_event=on_event,
+                options=llm.cacheable_options(),
+                stop_when=llm.stop_after_plan(),
+                echo=True
             )
             plan = self._parse_plan(response['message']['content'])
             if plan: return plan
+        except budget.BudgetExceeded:
+            raise
         except Exception as fe:
             print(f"[!!] Total Planning Failure: {fe}")
         
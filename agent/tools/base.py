@@ -1,13 +1,34 @@
 import subprocess
 import os
 
+from ..core import budget, session_recorder
+from .jobs import manager as default_jobs
+from .python_kernel import PythonKernel
+from .lint import lint_paths
+from .tree import index as directory_index
+from . import filesystem, search
+
 class ToolRegistry:
-    def __init__(self, memory_manager=None):
+    """The tools and their per-session state: the run_python kernel and the background jobs.
+
+    One registry per session; pass `jobs` (a JobManager) to keep its jobs apart from other sessions'.
+    """
+
+    def __init__(self, memory_manager=None, jobs=None):
         self.memory = memory_manager
+        self.jobs = jobs or default_jobs
+        self.kernel = None  # started on the first run_python call
         self.registry = {
             'run_shell_command': self.run_shell_command,
+            'job_status': self.job_status,
+            'job_output': self.job_output,
+            'job_kill': self.job_kill,
+            'run_python': self.run_python,
+            'search_code': self.search_code,
             'read_file': self.read_file,
             'write_file': self.write_file,
+            'edit_file': self.edit_file,
+            'apply_patch': self.apply_patch,
             'list_directory': self.list_directory,
             'save_memory': self.save_memory,
             'recall_memory': self.recall_memory,
@@ -22,14 +43,93 @@ class ToolRegistry:
                 'type': 'function',
                 'function': {
                     'name': 'run_shell_command',
-                    'description': 'Execute a bash command',
+                    'description': 'Execute a bash command. Set background for builds, installs or test suites: it returns a job_id at once',
                     'parameters': {
                         'type': 'object',
-                        'properties': {'command': {'type': 'string'}},
+                        'properties': {
+                            'command': {'type': 'string'},
+                            'background': {'type': 'boolean'}
+                        },
                         'required': ['command']
                     }
                 }
             },
+            {
+                'type': 'function',
+                'function': {
+                    'name': 'job_status',
+                    'description': 'Status and output tail of a background job (or of all jobs); waits up to `wait` seconds for it to finish',
+                    'parameters': {
+                        'type': 'object',
+                        'properties': {
+                            'job_id': {'type': 'string'},
+                            'wait': {'type': 'number'}
+                        }
+                    }
+                }
+            },
+            {
+                'type': 'function',
+                'function': {
+                    'name': 'job_output',
+                    'description': 'Output of a background job from `offset`; pass the returned next_offset to get only new output',
+                    'parameters': {
+                        'type': 'object',
+                        'properties': {
+                            'job_id': {'type': 'string'},
+                            'offset': {'type': 'integer'}
+                        },
+                        'required': ['job_id']
+                    }
+                }
+            },
+            {
+                'type': 'function',
+                'function': {
+                    'name': 'job_kill',
+                    'description': 'Stop a background job',
+                    'parameters': {
+                        'type': 'object',
+                        'properties': {'job_id': {'type': 'string'}},
+                        'required': ['job_id']
+                    }
+                }
+            },
+            {
+                'type': 'function',
+                'function': {
+                    'name': 'run_python',
+                    'description': 'Run Python code in a persistent interpreter: imports and variables are kept between calls. Returns stdout, stderr and the value of the last expression',
+                    'parameters': {
+                        'type': 'object',
+                        'properties': {
+                            'code': {'type': 'string'},
+                            'timeout': {'type': 'number'}
+                        },
+                        'required': ['code']
+                    }
+                }
+            },
+            {
+                'type': 'function',
+                'function': {
+                    'name': 'search_code',
+                    'description': 'Search file contents under a directory (indexed, fast). Literal by default; set regex for patterns. Returns path:line: text matches',
+                    'parameters': {
+                        'type': 'object',
+                        'properties': {
+                            'query': {'type': 'string'},
+                            'path': {'type': 'string'},
+                            'regex': {'type': 'boolean'},
+                            'ignore_case': {'type': 'boolean'},
+                            'glob': {'type': 'string', 'description': 'Only files matching this pattern, e.g. *.py'},
+                            'context': {'type': 'integer', 'description': 'Lines of context around each match'},
+                            'limit': {'type': 'integer'}
+                        },
+                        'required': ['query']
+                    }
+                }
+            },
             {
                 'type': 'function',
                 'function': {
@@ -46,7 +146,7 @@ class ToolRegistry:
                 'type': 'function',
                 'function': {
                     'name': 'write_file',
-                    'description': 'Write content to file',
+                    'description': 'Write content to file. For changes to an existing file use edit_file or apply_patch instead',
                     'parameters': {
                         'type': 'object',
                         'properties': {
@@ -57,14 +157,51 @@ class ToolRegistry:
                     }
                 }
             },
+            {
+                'type': 'function',
+                'function': {
+                    'name': 'edit_file',
+                    'description': 'Replace `old` with `new` in a file (old must match once; include a few surrounding lines). For several changes pass `edits`. Small whitespace and indentation differences are tolerated',
+                    'parameters': {
+                        'type': 'object',
+                        'properties': {
+                            'path': {'type': 'string'},
+                            'old': {'type': 'string'},
+                            'new': {'type': 'string'},
+                            'edits': {'type': 'array', 'items': {'type': 'object', 'properties': {'old': {'type': 'string'}, 'new': {'type': 'string'}}}},
+                            'replace_all': {'type': 'boolean'}
+                        },
+                        'required': ['path']
+                    }
+                }
+            },
+            {
+                'type': 'function',
+                'function': {
+                    'name': 'apply_patch',
+                    'description': 'Apply a unified diff (---/+++ headers and @@ hunks, one or more files). Line numbers may be approximate; either every hunk applies or nothing is written',
+                    'parameters': {
+                        'type': 'object',
+                        'properties': {
+                            'patch': {'type': 'string'},
+                            'path': {'type': 'string', 'description': 'Target file when the diff has no ---/+++ headers'}
+                        },
+                        'required': ['patch']
+                    }
+                }
+            },
             {
                 'type': 'function',
                 'function': {
                     'name': 'list_directory',
-                    'description': 'List directory contents',
+                    'description': 'Tree of a directory with sizes, `depth` levels deep (default 1). Skips .gitignored files and node_modules; page with `offset`',
                     'parameters': {
                         'type': 'object',
-                        'properties': {'path': {'type': 'string'}},
+                        'properties': {
+                            'path': {'type': 'string'},
+                            'depth': {'type': 'integer'},
+                            'offset': {'type': 'integer'}
+                        },
                         'required': ['path']
                     }
                 }
@@ -73,11 +210,15 @@ class ToolRegistry:
                 'type': 'function',
                 'function': {
                     'name': 'save_memory',
-                    'description': 'Save a fact to long-term memory',
+                    'description': 'Save to long-term memory: free-text content, or a subject/relation/target fact',
                     'parameters': {
                         'type': 'object',
-                        'properties': {'content': {'type': 'string'}},
-                        'required': ['content']
+                        'properties': {
+                            'content': {'type': 'string'},
+                            'subject': {'type': 'string'},
+                            'relation': {'type': 'string'},
+                            'target': {'type': 'string'}
+                        }
                     }
                 }
             },
@@ -85,10 +226,13 @@ class ToolRegistry:
                 'type': 'function',
                 'function': {
                     'name': 'recall_memory',
-                    'description': 'Search long-term memory',
+                    'description': 'Search long-term memory (facts and past notes), ranked',
                     'parameters': {
                         'type': 'object',
-                        'properties': {'query': {'type': 'string'}},
+                        'properties': {
+                            'query': {'type': 'string'},
+                            'depth': {'type': 'integer'}
+                        },
                         'required': ['query']
                     }
                 }
@@ -109,17 +253,23 @@ class ToolRegistry:
                 'type': 'function',
                 'function': {
                     'name': 'python_linter',
-                    'description': 'Check Python code for syntax errors',
+                    'description': 'Check Python for errors: inline `code`, or files/directories/globs in `paths` (a whole project in one call)',
                     'parameters': {
                         'type': 'object',
-                        'properties': {'code': {'type': 'string'}},
-                        'required': ['code']
+                        'properties': {
+                            'code': {'type': 'string'},
+                            'paths': {'type': 'array', 'items': {'type': 'string'}}
+                        }
                     }
                 }
             }
         ]
 
-    def python_linter(self, code):
+    def python_linter(self, code=None, paths=None):
+        if paths:
+            return lint_paths(paths)
+        if code is None:
+            return {"error": "Provide 'code' or 'paths'."}
         import ast
         try:
             ast.parse(code)
@@ -138,25 +288,34 @@ class ToolRegistry:
         except Exception as e:
             return {"error": str(e)}
 
-    def save_memory(self, content):
+    def save_memory(self, content=None, subject=None, relation=None, target=None):
         if self.memory:
-            return self.memory.save(content)
+            return self.memory.save(content, subject=subject, relation=relation, target=target)
         return {"error": "Memory manager not linked"}
 
-    def recall_memory(self, query):
+    def recall_memory(self, query, depth=2):
         if self.memory:
-            return self.memory.retrieve_relevant(query)
+            return self.memory.recall(query, depth=depth)
         return {"error": "Memory manager not linked"}
 
     def execute(self, name, args):
+        budget.charge_tool(name)
+        return session_recorder.run_tool(name, args, lambda: self._execute(name, args))
+
+    def _execute(self, name, args):
         if name in self.registry:
             try:
                 return self.registry[name](**args)
             except Exception as e:
                 return {"error": str(e)}
+            finally:
+                if name in search.UNTRACKED_WRITERS:
+                    search.mark_stale()
         return {"error": "Tool not found"}
 
-    def run_shell_command(self, command):
+    def run_shell_command(self, command, background=False):
+        if background:
+            return self.jobs.start(command)
         try:
             # Expand ~ in commands
             command = os.path.expanduser(command)
@@ -165,6 +324,31 @@ class ToolRegistry:
         except Exception as e:
             return {"error": str(e)}
 
+    def job_status(self, job_id=None, wait=0):
+        return self.jobs.status(job_id, wait)
+
+    def job_output(self, job_id, offset=0):
+        return self.jobs.output(job_id, offset)
+
+    def job_kill(self, job_id):
+        return self.jobs.kill(job_id)
+
+    def run_python(self, code, timeout=30):
+        if self.kernel is None:
+            self.kernel = PythonKernel()
+        return self.kernel.run(code, timeout)
+
+    def close(self):
+        """Stops the kernel and, if the registry has its own job manager, its jobs."""
+        if self.kernel is not None:
+            self.kernel.close()
+            self.kernel = None
+        if self.jobs is not default_jobs:
+            self.jobs.shutdown()
+
+    def search_code(self, query, path=".", regex=False, ignore_case=False, glob=None, context=0, limit=50):
+        return search.search_code(query, path, regex=regex, ignore_case=ignore_case, limit=limit, context=context, glob=glob)
+
     def read_file(self, path):
         path = os.path.expanduser(path)
         if not os.path.exists(path): return {"error": f"File not found: {path}"}
@@ -177,9 +361,17 @@ class ToolRegistry:
         if parent:
             os.makedirs(parent, exist_ok=True)
         with open(path, 'w') as f: f.write(content)
+        directory_index.invalidate(path)
+        search.update_path(path)
         return {"status": "success", "path": path}
 
-    def list_directory(self, path):
+    def edit_file(self, path, old=None, new=None, edits=None, replace_all=False):
+        return filesystem.edit_file(path, old, new, edits=edits, replace_all=replace_all)
+
+    def apply_patch(self, patch, path=None):
+        return filesystem.apply_patch(patch, path)
+
+    def list_directory(self, path, depth=1, offset=0):
         path = os.path.expanduser(path)
         if not os.path.exists(path): return {"error": f"Path not found: {path}"}
-        return os.listdir(path)
+        return directory_index.tree(path, depth=depth, offset=offset)
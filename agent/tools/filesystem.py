@@ -1,5 +1,11 @@
+import contextlib
+import json
 import os
 
+from ..core.filelock import atomic_write
+from .tree import index as directory_index
+from . import patch, search
+
 def read_file(path):
     try:
         if not os.path.exists(path):
@@ -15,14 +21,95 @@ def write_file(path, content):
         os.makedirs(os.path.dirname(os.path.abspath(full_path)), exist_ok=True)
         with open(full_path, 'w') as f:
             f.write(content)
+        directory_index.invalidate(full_path)
+        search.update_path(full_path)
         return f"Successfully wrote to {path}"
     except Exception as e:
         return f"Error writing file: {str(e)}"
 
-def list_directory(path):
+def list_directory(path, depth=1, offset=0):
     try:
+        path = os.path.expanduser(path)
         if not os.path.exists(path):
             return f"Error: Directory not found at {path}"
-        return str(os.listdir(path))
+        return directory_index.tree(path, depth=depth, offset=offset)
     except Exception as e:
         return f"Error listing directory: {str(e)}"
+
+def _commit(changes):
+    """Writes every planned change atomically; if one write fails, the files already written are restored."""
+    done = []
+    try:
+        for path, text, _ in changes:
+            original = None
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    original = f.read()
+            done.append((path, original))
+            if text is None:
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                mode = os.stat(path).st_mode if original is not None else None
+                atomic_write(path, text.encode("utf-8"))
+                if mode is not None:
+                    os.chmod(path, mode)  # keep e.g. the executable bit of a script
+    except OSError:
+        for path, original in reversed(done):
+            with contextlib.suppress(OSError):
+                if original is None:
+                    os.remove(path)
+                else:
+                    atomic_write(path, original)
+        raise
+    finally:
+        for path, _ in done:
+            directory_index.invalidate(path)
+            search.update_path(path)
+
+def _report(path, summary):
+    result = {"path": path}
+    result.update((k, v) for k, v in summary.items() if v not in ([], None))
+    return result
+
+def edit_file(path, old=None, new=None, edits=None, replace_all=False):
+    """Search/replace edits on one file. `edits` is a list of {"old", "new"} or
+    text made of <<<<<<< SEARCH / ======= / >>>>>>> REPLACE blocks."""
+    try:
+        full_path = os.path.expanduser(path)
+        if isinstance(edits, str) and edits.lstrip().startswith("["):
+            edits = json.loads(edits)  # a list the model sent as a JSON string
+        if isinstance(edits, str):
+            pairs = patch.parse_blocks(edits)
+            if not pairs:
+                return {"error": "No SEARCH/REPLACE blocks found in `edits`."}
+        elif edits:
+            pairs = [(e.get("old", ""), e.get("new", "")) for e in edits]
+        elif old is not None:
+            pairs = [(old, new or "")]
+        else:
+            return {"error": "Provide `old` and `new`, or `edits`."}
+        text = patch.read_text(full_path) if os.path.exists(full_path) else ""
+        if not os.path.exists(full_path) and any(o for o, _ in pairs):
+            return {"error": f"File not found: {path}"}
+        new_text, summary = patch.apply_edits(text, pairs, replace_all=replace_all)
+        if new_text == text:
+            return {"status": "unchanged", "path": path}
+        _commit([(full_path, new_text, summary)])
+        return {"status": "success", **_report(path, summary)}
+    except patch.PatchError as e:
+        return {"error": f"{path}: {e}. Nothing was written."}
+    except Exception as e:
+        return {"error": f"Error editing file: {str(e)}"}
+
+def apply_patch(diff, path=None):
+    """Applies a unified diff (one or more files); all hunks must match or nothing is written."""
+    try:
+        changes = patch.plan_patch(diff, path=path)
+        _commit(changes)
+        files = [_report(os.path.relpath(p), summary) for p, _, summary in changes]
+        return {"status": "success", **files[0]} if len(files) == 1 else {"status": "success", "files": files}
+    except patch.PatchError as e:
+        return {"error": f"{e}. Nothing was written."}
+    except Exception as e:
+        return {"error": f"Error applying patch: {str(e)}"}
@@ -1,29 +1,121 @@
 import os
 import platform
-import subprocess
+import time
+
+from ..core.startup import lazy_import
+from .tree import index as directory_index, human_size
+
+FILESYSTEM_TTL = 30.0  # seconds; the size walk itself is incremental via the directory index
+RUNTIME_TTL = 5.0
+
+_cache = {}
+
+
+def _cached(key, ttl, compute):
+    hit = _cache.get(key)
+    if hit and time.monotonic() - hit[0] < ttl:
+        return hit[1]
+    value = compute()
+    _cache[key] = (time.monotonic(), value)
+    return value
+
+
+def _free_memory():
+    """(available, total) bytes, or None where it cannot be read cheaply."""
+    try:
+        with open("/proc/meminfo") as f:
+            info = {line.split(":")[0]: int(line.split()[1]) * 1024 for line in f if line.split()}
+        return info.get("MemAvailable", info.get("MemFree")), info.get("MemTotal")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        vm = psutil.virtual_memory()
+        return vm.available, vm.total
+    except ImportError:
+        return None
+
+
+def _loaded_models():
+    try:
+        running = lazy_import("ollama").ps()
+    except Exception as e:
+        return None, str(e)
+    models = running.models if hasattr(running, "models") else running.get("models", [])
+    loaded = []
+    for m in models:
+        get = (lambda k: m.get(k)) if isinstance(m, dict) else (lambda k: getattr(m, k, None))
+        loaded.append({"name": get("name") or get("model"), "size": get("size"), "size_vram": get("size_vram")})
+    return loaded, None
+
+
+def runtime_stats():
+    """CPU, load, memory and loaded Ollama models, for sizing concurrency."""
+    def compute():
+        try:
+            load = [round(x, 2) for x in os.getloadavg()]
+        except (AttributeError, OSError):
+            load = None
+        memory = _free_memory()
+        models, error = _loaded_models()
+        stats = {
+            "cpu_count": os.cpu_count(),
+            "load_avg": load,
+            "memory_available": memory[0] if memory else None,
+            "memory_total": memory[1] if memory else None,
+            "ollama_num_parallel": os.environ.get("OLLAMA_NUM_PARALLEL"),
+            "ollama_models": models,
+        }
+        if error:
+            stats["ollama_error"] = error
+        return stats
+    return _cached("runtime", RUNTIME_TTL, compute)
+
+
+def filesystem_stats(project_root):
+    def compute():
+        files, size, complete = directory_index.usage(project_root)
+        entries = directory_index.entries(project_root) or []
+        visible = [e for e in entries if not e[0].startswith('.')]
+        stats = {
+            "files": files,
+            "size": size,
+            "dirs": [e[0] for e in visible if e[1]],
+            "top_files": [e[0] for e in visible if not e[1]],
+        }
+        if not complete:
+            stats["partial"] = True  # files/size are lower bounds
+        return stats
+    return _cached(("fs", project_root), FILESYSTEM_TTL, compute)
+
 
 def get_system_info():
     try:
         current_os = platform.system()
         project_root = os.path.abspath(os.path.join(os.getcwd(), ".."))
-        
-        # Filesystem report (Project size)
-        du_res = subprocess.run(f"du -sh '{project_root}'", shell=True, capture_output=True, text=True)
-        size = du_res.stdout.split()[0] if du_res.stdout else "Unknown"
-        
-        # Filesystem structure (top-level only to avoid spam)
-        items = os.listdir(project_root)
-        dirs = [i for i in items if os.path.isdir(os.path.join(project_root, i)) and not i.startswith('.')]
-        files = [i for i in items if os.path.isfile(os.path.join(project_root, i)) and not i.startswith('.')]
-        
+        fs = filesystem_stats(project_root)
+        rt = runtime_stats()
+
+        memory = "Unknown"
+        if rt["memory_available"] is not None:
+            memory = f"{human_size(rt['memory_available'])} free of {human_size(rt['memory_total'] or 0)}"
+        if rt["ollama_models"] is None:
+            models = f"unavailable ({rt.get('ollama_error')})"
+        else:
+            models = ", ".join(f"{m['name']} ({human_size(m['size_vram'] or m['size'])})" if m['size_vram'] or m['size'] else m['name']
+                               for m in rt["ollama_models"]) or "none loaded"
+
         report = f"""
 Architect System Report:
 ------------------------
 OS: {current_os} {platform.release()}
 Project Root: {project_root}
-Project Size: {size}
-Main Directories: {', '.join(dirs[:10])}
-Main Files: {', '.join(files[:10])}
+Project Size: {'≥' if fs.get('partial') else ''}{human_size(fs['size'])} in {'≥' if fs.get('partial') else ''}{fs['files']} files (excluding .git, node_modules and virtualenvs)
+Main Directories: {', '.join(fs['dirs'][:10])}
+Main Files: {', '.join(fs['top_files'][:10])}
+CPUs: {rt['cpu_count']} | Load: {', '.join(map(str, rt['load_avg'])) if rt['load_avg'] else 'Unknown'}
+Memory: {memory}
+Ollama Models Loaded: {models} | OLLAMA_NUM_PARALLEL: {rt['ollama_num_parallel'] or 'default'}
 Status: Fully Operational (Optimized for JSON Signal)
         """.strip()
         return report
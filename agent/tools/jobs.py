@@ -0,0 +1,200 @@
+import atexit
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+import weakref
+
+
+class RingBuffer:
+    """Keeps the last `capacity` characters of a stream, addressed by absolute offsets.
+
+    Offsets count every character ever written, so a reader can poll with the
+    offset it got last time and only receive what is new.
+    """
+
+    def __init__(self, capacity=256 * 1024):
+        self.capacity = capacity
+        self._chunks = []
+        self._size = 0
+        self.start = 0   # absolute offset of the oldest character still held
+        self.end = 0     # absolute offset just past the newest character
+        self._lock = threading.Lock()
+
+    def write(self, text):
+        with self._lock:
+            self._chunks.append(text)
+            self._size += len(text)
+            self.end += len(text)
+            while self._size > self.capacity:
+                excess = self._size - self.capacity
+                head = self._chunks[0]
+                if len(head) <= excess:
+                    self._chunks.pop(0)
+                    self._size -= len(head)
+                    self.start += len(head)
+                else:
+                    self._chunks[0] = head[excess:]
+                    self._size -= excess
+                    self.start += excess
+
+    def read(self, offset=0, limit=None):
+        """Returns (text, next_offset, dropped); dropped counts characters already evicted past `offset`."""
+        with self._lock:
+            offset = max(0, min(offset, self.end))
+            dropped = max(0, self.start - offset)
+            data = "".join(self._chunks)[max(offset, self.start) - self.start:]
+        if limit is not None:
+            data = data[:limit]
+        return data, max(offset, self.start) + len(data), dropped
+
+    def tail(self, chars):
+        with self._lock:
+            return "".join(self._chunks)[-chars:] if chars else ""
+
+
+class Job:
+    def __init__(self, job_id, command, cwd=None, buffer_size=256 * 1024):
+        self.id = job_id
+        self.command = command
+        self.cwd = cwd
+        self.output = RingBuffer(buffer_size)
+        self.started = time.time()
+        self.ended = None
+        # Own process group so job_kill also stops whatever the shell spawned (npm, pytest workers, ...)
+        kwargs = {"start_new_session": True} if os.name == "posix" else {}
+        self.proc = subprocess.Popen(command, shell=True, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                     stdin=subprocess.DEVNULL, text=True, errors="replace", bufsize=1, **kwargs)
+        self.done = threading.Event()
+        self._reader = threading.Thread(target=self._pump, name=f"job-{job_id}", daemon=True)
+        self._reader.start()
+
+    def _pump(self):
+        for line in self.proc.stdout:
+            self.output.write(line)
+        self.proc.stdout.close()
+        self.proc.wait()
+        self.ended = time.time()
+        self.done.set()
+
+    @property
+    def running(self):
+        return not self.done.is_set()
+
+    def status(self, tail=500):
+        return {
+            "job_id": self.id,
+            "command": self.command,
+            "running": self.running,
+            "exit_code": None if self.running else self.proc.returncode,
+            "seconds": round((self.ended or time.time()) - self.started, 1),
+            "output_chars": self.output.end,
+            "tail": self.output.tail(tail),
+        }
+
+    def kill(self, grace=3.0):
+        if not self.running:
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(self.proc.pid, signal.SIGTERM)
+            else:
+                self.proc.terminate()
+            if not self.done.wait(grace):
+                if os.name == "posix":
+                    os.killpg(self.proc.pid, signal.SIGKILL)
+                else:
+                    self.proc.kill()
+                self.done.wait(grace)
+        except ProcessLookupError:
+            pass
+
+
+_managers = weakref.WeakSet()
+
+
+class JobManager:
+    """Runs shell commands in the background so the agent loop is not blocked by builds or installs.
+
+    Output (stdout and stderr interleaved) goes to a per-job ring buffer that
+    the model polls with job_output(offset). Jobs still running at exit are
+    killed.
+    """
+
+    def __init__(self, max_jobs=16, buffer_size=256 * 1024):
+        self.max_jobs = max_jobs
+        self.buffer_size = buffer_size
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        _managers.add(self)
+        atexit.register(self.shutdown)
+
+    def start(self, command, cwd=None):
+        with self._lock:
+            running = [j for j in self.jobs.values() if j.running]
+            if len(running) >= self.max_jobs:
+                return {"error": f"Too many background jobs running ({len(running)}); wait for one or job_kill it."}
+            # Forget the oldest finished jobs so the table does not grow forever
+            finished = [j for j in self.jobs.values() if not j.running]
+            for job in finished[:max(0, len(self.jobs) - self.max_jobs * 4)]:
+                del self.jobs[job.id]
+            job_id = f"job-{next(self._ids)}"
+            try:
+                job = Job(job_id, os.path.expanduser(command), cwd, self.buffer_size)
+            except OSError as e:
+                return {"error": str(e)}
+            self.jobs[job_id] = job
+        return {"status": "started", "job_id": job_id, "pid": job.proc.pid}
+
+    def active_since(self, when):
+        """True if a job is running or has finished since `when` (a time.time() value)."""
+        return any(j.running or (j.ended or 0) >= when for j in list(self.jobs.values()))
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def status(self, job_id=None, wait=0):
+        """Status of one job (waiting up to `wait` seconds for it to finish), or of all jobs."""
+        if job_id is None:
+            return {"jobs": [j.status(tail=0) for j in self.jobs.values()]}
+        job = self.get(job_id)
+        if job is None:
+            return {"error": f"Unknown job: {job_id}"}
+        if wait:
+            job.done.wait(min(float(wait), 60))
+        return job.status()
+
+    def output(self, job_id, offset=0, limit=20000):
+        job = self.get(job_id)
+        if job is None:
+            return {"error": f"Unknown job: {job_id}"}
+        text, next_offset, dropped = job.output.read(int(offset or 0), limit)
+        result = {"job_id": job_id, "output": text, "next_offset": next_offset,
+                  "running": job.running, "exit_code": None if job.running else job.proc.returncode}
+        if dropped:
+            result["dropped_chars"] = dropped
+        return result
+
+    def kill(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return {"error": f"Unknown job: {job_id}"}
+        was_running = job.running
+        job.kill()
+        return {"status": "killed" if was_running else "already finished", "job_id": job_id,
+                "exit_code": job.proc.returncode}
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            job.kill(grace=1.0)
+
+
+def active_since(when):
+    """True if a job of any manager (daemon sessions each have one) is running or finished since `when`."""
+    return any(m.active_since(when) for m in list(_managers))
+
+
+manager = JobManager()
@@ -0,0 +1,181 @@
+import atexit
+import concurrent.futures
+import glob
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import threading
+import time
+
+from ..core.filelock import atomic_write_json
+
+CACHE_FILE = "data/state/lint_cache.json"
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", "env", ".mypy_cache", ".pytest_cache", "build", "dist"}
+# pyflakes is optional; without it only syntax/compile errors are reported
+HAS_PYFLAKES = importlib.util.find_spec("pyflakes") is not None
+LINTER_VERSION = f"1-{'pyflakes' if HAS_PYFLAKES else 'compile'}"
+MAX_DIAGNOSTICS = 50
+PARALLEL_THRESHOLD = 8  # fewer changed files than this are checked inline
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def lint_source(source, filename="<code>"):
+    """Returns a list of {'line', 'col', 'severity', 'message'} for one file's text."""
+    try:
+        compile(source, filename, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return [{"line": e.lineno, "col": e.offset, "severity": "error", "message": e.msg}]
+    except ValueError as e:  # e.g. null bytes
+        return [{"line": None, "col": None, "severity": "error", "message": str(e)}]
+    if not HAS_PYFLAKES:
+        return []
+    from pyflakes import api, reporter
+    out = io.StringIO()
+    api.check(source, filename, reporter.Reporter(out, out))
+    diagnostics = []
+    for line in out.getvalue().splitlines():
+        # "<filename>:<line>:<col>: <message>"
+        parts = line[len(filename) + 1:].split(":", 2) if line.startswith(filename + ":") else []
+        if len(parts) == 3 and parts[0].isdigit():
+            col = parts[1].strip()
+            diagnostics.append({"line": int(parts[0]), "col": int(col) if col.isdigit() else None,
+                                "severity": "warning", "message": parts[2].strip()})
+    return diagnostics
+
+
+def _lint_file(path, source):
+    try:
+        text = source.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return [{"line": None, "col": None, "severity": "error", "message": f"not UTF-8: {e}"}]
+    return lint_source(text, path)
+
+
+def expand(paths):
+    """Files for a path, directory (recursive, skipping vendored/VCS dirs) or glob pattern, or a list of them."""
+    if isinstance(paths, str):
+        paths = [paths]
+    files = []
+    for pattern in paths:
+        pattern = os.path.expanduser(pattern)
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                for root, dirs, names in os.walk(match):
+                    dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith(".")]
+                    files.extend(os.path.join(root, n) for n in names if n.endswith(".py"))
+            elif os.path.isfile(match):
+                files.append(match)
+    return list(dict.fromkeys(os.path.normpath(f) for f in files))
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count() or 2)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+class LintCache:
+    """Diagnostics keyed by content hash, so unchanged files are never re-checked."""
+
+    def __init__(self, path=CACHE_FILE, max_entries=20000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                if data.get("version") == LINTER_VERSION:
+                    self.entries = data.get("entries", {})
+            except (OSError, json.JSONDecodeError, AttributeError):
+                pass
+
+    @staticmethod
+    def key(source):
+        return hashlib.sha1(source).hexdigest()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, diagnostics):
+        self.entries.pop(key, None)
+        self.entries[key] = diagnostics
+        self._dirty = True
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        # Oldest insertions go first once the cache is full
+        while len(self.entries) > self.max_entries:
+            self.entries.pop(next(iter(self.entries)))
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        atomic_write_json(self.path, {"version": LINTER_VERSION, "entries": self.entries})
+        self._dirty = False
+
+
+def lint_paths(paths, cache=None):
+    """Checks every .py file under `paths` and returns a compact summary."""
+    started = time.perf_counter()
+    cache = cache or LintCache()
+    files = expand(paths)
+    if not files:
+        return {"error": f"No Python files match {paths}"}
+
+    results, todo = {}, []
+    for path in files:
+        try:
+            with open(path, 'rb') as f:
+                source = f.read()
+        except OSError as e:
+            results[path] = [{"line": None, "col": None, "severity": "error", "message": str(e)}]
+            continue
+        key = cache.key(source)
+        cached = cache.get(key)
+        if cached is not None:
+            results[path] = cached
+        else:
+            todo.append((path, key, source))
+
+    if len(todo) >= PARALLEL_THRESHOLD:
+        pool = _executor()
+        futures = {pool.submit(_lint_file, path, source): (path, key) for path, key, source in todo}
+        for future in concurrent.futures.as_completed(futures):
+            path, key = futures[future]
+            results[path] = future.result()
+            cache.put(key, results[path])
+    else:
+        for path, key, source in todo:
+            results[path] = _lint_file(path, source)
+            cache.put(key, results[path])
+    cache.save()
+
+    lines, errors, warnings = [], 0, 0
+    for path in files:
+        for d in results[path]:
+            errors += d["severity"] == "error"
+            warnings += d["severity"] == "warning"
+            if len(lines) < MAX_DIAGNOSTICS:
+                lines.append(f"{path}:{d['line'] or '?'}:{d['col'] or '?'}: {d['severity']}: {d['message']}")
+    summary = {
+        "status": "error" if errors else "success",
+        "files": len(files),
+        "checked": len(todo),
+        "cached": len(files) - len(todo),
+        "errors": errors,
+        "warnings": warnings,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    if lines:
+        summary["diagnostics"] = lines
+    if errors + warnings > len(lines):
+        summary["truncated"] = errors + warnings - len(lines)
+    return summary
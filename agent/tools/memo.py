@@ -0,0 +1,120 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+# Tools whose result depends only on their arguments and the files they touch.
+# The value lists the arguments that name paths; their stat fingerprint is part of the key.
+# list_directory and python_linter are left out: a directory's mtime misses changes
+# below its direct children, and lint_paths keeps its own per-file cache.
+IDEMPOTENT_TOOLS = {
+    'read_file': ('path',),
+    'web_search': (),
+}
+# Tools that are expected to be called repeatedly with the same arguments
+POLLING_TOOLS = {'job_status', 'job_output'}
+# Some tools (web_search) report failures as text rather than an {"error"} dict
+FAILURE_PREFIXES = ("Error", "No results found")
+
+
+def _fingerprint(path):
+    try:
+        st = os.stat(os.path.expanduser(path))
+        return [st.st_mtime_ns, st.st_size, st.st_ino]
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def failed(result):
+    """True for a tool result that reports an error; those are worth retrying, not caching."""
+    if isinstance(result, dict):
+        return 'error' in result
+    return isinstance(result, str) and result.startswith(FAILURE_PREFIXES)
+
+
+def call_signature(name, args, path_args=()):
+    """Canonical key for a tool call: name, sorted args and the state of any files it reads."""
+    args = dict(args or {})
+    for arg in path_args:
+        if isinstance(args.get(arg), str):
+            args[arg] = os.path.abspath(os.path.expanduser(args[arg]))
+    state = [_fingerprint(args[a]) for a in path_args if a in args]
+    return json.dumps([name, args, state], sort_keys=True, default=str)
+
+
+class ToolMemo:
+    """Per-session memoization of idempotent tool calls.
+
+    Entries are keyed by (tool, canonical args, file fingerprints) so a cached
+    read_file is invalidated as soon as the file's mtime/size changes.
+    """
+
+    def __init__(self, tools=None, max_entries=128):
+        self.tools = IDEMPOTENT_TOOLS if tools is None else tools
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def key(self, name, args):
+        return call_signature(name, args, self.tools.get(name, ()))
+
+    def call(self, name, args, fn):
+        """Returns (result, cached). fn() runs only on a cache miss."""
+        if name not in self.tools:
+            return fn(), False
+        key = self.key(name, args)
+        if key in self._cache:
+            result, elapsed = self._cache[key]
+            self._cache.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += elapsed
+            return result, True
+
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        self.misses += 1
+        if not failed(result):
+            self._cache[key] = (result, elapsed)
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result, False
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "saved_seconds": round(self.saved_seconds, 3)}
+
+
+class LoopDetector:
+    """Spots a model cycling through the same tool calls (A,A / A,B,A,B / A,B,C,A,B,C ...)."""
+
+    def __init__(self, max_period=3, repeats=2):
+        self.max_period = max_period
+        self.repeats = repeats
+        self.calls = []
+
+    def record(self, name, args):
+        if name in POLLING_TOOLS:
+            return
+        self.calls.append((name, call_signature(name, args, IDEMPOTENT_TOOLS.get(name, ()))))
+
+    def check(self):
+        """Returns the repeating tool names if the tail of the history is a cycle, else None."""
+        for period in range(1, self.max_period + 1):
+            window = period * self.repeats
+            if len(self.calls) < window:
+                break
+            tail = self.calls[-window:]
+            cycle = tail[-period:]
+            if all(tail[i] == cycle[i % period] for i in range(window)):
+                return [name for name, _ in cycle]
+        return None
+
+    def reset(self):
+        self.calls = []
+
+
+def loop_warning(names):
+    return (f"You are repeating the same tool calls ({', '.join(names)}) and getting the same results. "
+            "Do not call them again. Use the results you already have, try a different approach, or give your final answer.")
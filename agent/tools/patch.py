@@ -0,0 +1,317 @@
+"""Applying model-written edits: unified diffs and search/replace blocks.
+
+Matching is forgiving in the ways small models get edits wrong: line numbers
+in hunk headers that are off (or missing), trailing-whitespace and
+indentation drift, and a context line or two at the edge of a hunk that no
+longer matches. Every hunk and block is located before anything is written,
+so an edit either applies completely or leaves every file untouched.
+
+The functions here only compute new file contents; filesystem.py writes them.
+"""
+import difflib
+import os
+import re
+
+FUZZ = 2          # context lines a hunk may lose at each end and still apply
+SIMILARITY = 0.9  # difflib ratio for the last-resort search/replace match
+HUNK_HEADER = re.compile(r"^@@\s*(?:-(\d+)(?:,\d+)?\s+\+(\d+)(?:,\d+)?)?\s*@@")
+BLOCK = re.compile(r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[^\n]*$", re.DOTALL | re.MULTILINE)
+NORMALIZERS = [
+    ("exact", lambda line: line),
+    ("ignoring trailing whitespace", str.rstrip),
+    ("ignoring indentation", str.strip),
+]
+
+
+class PatchError(Exception):
+    pass
+
+
+class Document:
+    """A file's text as lines, remembering its newline style and final newline."""
+
+    def __init__(self, text):
+        self.newline = "\r\n" if "\r\n" in text else "\n"
+        self.lines = text.split(self.newline)
+        self.trailing = self.lines[-1] == ""
+        if self.trailing:
+            self.lines.pop()
+
+    def text(self):
+        if not self.lines:
+            return ""
+        return self.newline.join(self.lines) + (self.newline if self.trailing else "")
+
+
+def _block_lines(text):
+    text = text.replace("\r\n", "\n")
+    return text[:-1].split("\n") if text.endswith("\n") else text.split("\n")
+
+
+def _indent(line):
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _reindent(lines, patch_line, file_line):
+    """Shifts added lines by the indentation difference between the patch and the file."""
+    old, new = _indent(patch_line), _indent(file_line)
+    if old == new:
+        return lines
+    return [new + line[len(old):] if line.startswith(old) else line for line in lines]
+
+
+def _positions(lines, block, norm):
+    target = [norm(line) for line in block]
+    normed = [norm(line) for line in lines]
+    size = len(target)
+    return [i for i in range(len(lines) - size + 1)
+            if normed[i] == target[0] and normed[i:i + size] == target]
+
+
+def _closest(lines, block):
+    """A hint for a block that could not be found: the file line most like its first line."""
+    first = next((line for line in block if line.strip()), None)
+    if first is None:
+        return ""
+    best, best_ratio = None, 0.6
+    for number, line in enumerate(lines, 1):
+        matcher = difflib.SequenceMatcher(None, first.strip(), line.strip())
+        if matcher.real_quick_ratio() > best_ratio and matcher.quick_ratio() > best_ratio and matcher.ratio() > best_ratio:
+            best, best_ratio = (number, line), matcher.ratio()
+    if best is None:
+        return f" No line resembles {first.strip()[:80]!r}; re-read the file"
+    return f" Closest line is {best[0]}: {best[1].strip()[:120]!r}"
+
+
+def _counts(old, new):
+    added = removed = 0
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag != "equal":
+            removed += i2 - i1
+            added += j2 - j1
+    return added, removed
+
+
+# --- unified diffs ---------------------------------------------------------
+
+def _header_path(line):
+    path = line[4:].split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    if path[:2] in ("a/", "b/"):
+        path = path[2:]
+    return path
+
+
+def parse_unified(patch):
+    """[{'old', 'new', 'hunks': [{'start', 'lines': [(tag, text)]}]}]; paths are None for /dev/null."""
+    files, current, hunk = [], None, None
+    lines = patch.replace("\r\n", "\n").split("\n")
+    for i, line in enumerate(lines):
+        if line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            current = {"old": _header_path(line), "new": _header_path(lines[i + 1]), "hunks": []}
+            files.append(current)
+            hunk = None
+        elif line.startswith("+++ ") and current is not None and hunk is None:
+            continue
+        elif HUNK_HEADER.match(line):
+            if current is None:
+                current = {"old": "", "new": "", "hunks": []}  # headerless: the caller supplies the path
+                files.append(current)
+            start = HUNK_HEADER.match(line).group(1)
+            hunk = {"start": int(start) if start else None, "lines": []}
+            current["hunks"].append(hunk)
+        elif hunk is not None:
+            if line.startswith(("+", "-", " ")):
+                hunk["lines"].append((line[0], line[1:]))
+            elif line == "":
+                hunk["lines"].append((" ", ""))  # blank context lines often lose their leading space
+            elif line.startswith("\\"):
+                continue  # "\ No newline at end of file"
+            else:
+                hunk = None  # "diff --git", "index ..." and other noise between files
+    for f in files:
+        # A trailing blank line is usually the patch's own final newline, not context
+        for h in f["hunks"]:
+            while h["lines"] and h["lines"][-1] == (" ", ""):
+                h["lines"].pop()
+    return [f for f in files if f["hunks"] or f["new"] is None]
+
+
+def _locate(lines, old, hint):
+    """(position, mode) of the block nearest to `hint`, trying exact then looser matching."""
+    for mode, norm in NORMALIZERS:
+        found = _positions(lines, old, norm)
+        if found:
+            if hint is None and len(found) > 1:
+                raise PatchError(f"hunk matches {len(found)} places (lines {', '.join(str(p + 1) for p in found[:5])}); "
+                                 "give the @@ line numbers or more context")
+            return min(found, key=lambda p: abs(p - (hint or 0))), mode
+    return None, None
+
+
+def _apply_hunk(lines, hunk, offset, number):
+    body = hunk["lines"]
+    lead = next((i for i, (tag, _) in enumerate(body) if tag != " "), len(body))
+    trail = next((i for i, (tag, _) in enumerate(reversed(body)) if tag != " "), len(body))
+    for fuzz in range(FUZZ + 1):
+        a, b = min(fuzz, lead), min(fuzz, trail)
+        if fuzz and (a, b) == (min(fuzz - 1, lead), min(fuzz - 1, trail)):
+            continue  # nothing more to trim
+        trimmed = body[a:len(body) - b]
+        old = [text for tag, text in trimmed if tag != "+"]
+        hint = hunk["start"] - 1 + offset + a if hunk["start"] is not None else None
+        if not old:
+            # A pure insertion goes after the header's line ("-5,0" inserts after line 5)
+            pos, mode = (len(lines) if hint is None else min(max(hint + 1, 0), len(lines))), "exact"
+        else:
+            pos, mode = _locate(lines, old, hint)
+            if pos is None:
+                continue
+        new, j = [], pos
+        anchor = next(((text, lines[pos + k]) for k, text in enumerate(old)), None)
+        for tag, text in trimmed:
+            if tag == " ":
+                new.append(lines[j])  # keep the file's own version of context lines
+                j += 1
+            elif tag == "-":
+                j += 1
+            else:
+                new.append(_reindent([text], *anchor)[0] if anchor and mode == "ignoring indentation" else text)
+        notes = []
+        if mode != "exact":
+            notes.append(f"hunk {number} matched {mode}")
+        if a or b:
+            notes.append(f"hunk {number} applied with {a + b} context line(s) ignored")
+        if old and hint is not None and pos != hint:
+            notes.append(f"hunk {number} applied at line {pos + 1 - a} (header said {hint + 1 - a})")
+        lines[pos:pos + len(old)] = new
+        if hint is not None:
+            # Later headers count lines of the original file; carry this hunk's drift and growth forward
+            offset = pos - (hunk["start"] - 1 + a) + len(new) - len(old)
+        return offset, pos + 1, notes
+    old = [text for tag, text in body if tag != "+"]
+    raise PatchError(f"hunk {number} does not match the file.{_closest(lines, old)}")
+
+
+def apply_hunks(text, hunks):
+    """New text and a summary for one file's hunks; raises PatchError if any hunk fails."""
+    doc = Document(text)
+    before = list(doc.lines)
+    offset, at, notes = 0, [], []
+    for number, hunk in enumerate(hunks, 1):
+        offset, line, hunk_notes = _apply_hunk(doc.lines, hunk, offset, number)
+        at.append(line)
+        notes += hunk_notes
+    added, removed = _counts(before, doc.lines)
+    return doc.text(), {"hunks": len(hunks), "added": added, "removed": removed, "at": at, "notes": notes}
+
+
+# --- search/replace blocks -------------------------------------------------
+
+def parse_blocks(text):
+    """[(search, replace)] from <<<<<<< SEARCH / ======= / >>>>>>> REPLACE blocks."""
+    return [(m.group(1), m.group(2)) for m in BLOCK.finditer(text.replace("\r\n", "\n"))]
+
+
+def _replace_fuzzy(doc, old, new, number):
+    old_lines, new_lines = _block_lines(old), _block_lines(new)
+    for mode, norm in NORMALIZERS[1:]:
+        found = _positions(doc.lines, old_lines, norm)
+        if len(found) > 1:
+            raise PatchError(f"edit {number} matches {len(found)} places ({mode}); include more surrounding lines")
+        if found:
+            pos = found[0]
+            if mode == "ignoring indentation":
+                new_lines = _reindent(new_lines, old_lines[0], doc.lines[pos])
+            doc.lines[pos:pos + len(old_lines)] = new_lines
+            return pos + 1, f"edit {number} matched {mode}"
+    # Last resort: one clearly best window of the same length
+    target = "\n".join(line.strip() for line in old_lines)
+    scored = []
+    for pos in range(len(doc.lines) - len(old_lines) + 1):
+        window = "\n".join(line.strip() for line in doc.lines[pos:pos + len(old_lines)])
+        matcher = difflib.SequenceMatcher(None, target, window, autojunk=False)
+        if matcher.real_quick_ratio() >= SIMILARITY and matcher.quick_ratio() >= SIMILARITY:
+            ratio = matcher.ratio()
+            if ratio >= SIMILARITY:
+                scored.append((ratio, pos))
+    scored.sort(reverse=True)
+    if scored and (len(scored) == 1 or scored[0][0] - scored[1][0] > 0.02) and scored[0][1] + len(old_lines) <= len(doc.lines):
+        ratio, pos = scored[0]
+        new_lines = _reindent(new_lines, old_lines[0], doc.lines[pos])
+        doc.lines[pos:pos + len(old_lines)] = new_lines
+        return pos + 1, f"edit {number} matched approximately ({ratio:.0%} similar); check the result"
+    raise PatchError(f"edit {number}: search text not found.{_closest(doc.lines, old_lines)}")
+
+
+def apply_edits(text, edits, replace_all=False):
+    """Applies [(old, new)] in order; new text and a summary, or PatchError."""
+    doc = Document(text)
+    before = doc.lines
+    at, notes = [], []
+    for number, (old, new) in enumerate(edits, 1):
+        if doc.newline == "\r\n":
+            old, new = (s.replace("\r\n", "\n").replace("\n", "\r\n") for s in (old, new))
+        if not old:
+            if text.strip():
+                raise PatchError(f"edit {number} has empty search text; only an empty file can be filled that way")
+            text = new
+            at.append(1)
+            continue
+        count = text.count(old)
+        if count > 1 and not replace_all:
+            lines = []
+            start = text.find(old)
+            while start != -1 and len(lines) < 5:
+                lines.append(str(text.count("\n", 0, start) + 1))
+                start = text.find(old, start + 1)
+            raise PatchError(f"edit {number} matches {count} places (lines {', '.join(lines)}); "
+                             "include more surrounding lines or set replace_all")
+        if count:
+            at.append(text.count("\n", 0, text.find(old)) + 1)
+            text = text.replace(old, new) if replace_all else text.replace(old, new, 1)
+            if count > 1:
+                notes.append(f"edit {number} replaced {count} occurrences")
+            continue
+        doc = Document(text)
+        line, note = _replace_fuzzy(doc, old, new, number)
+        text = doc.text()
+        at.append(line)
+        notes.append(note)
+    added, removed = _counts(before, Document(text).lines)
+    return text, {"edits": len(edits), "added": added, "removed": removed, "at": at, "notes": notes}
+
+
+def read_text(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8")
+    except FileNotFoundError:
+        raise PatchError(f"File not found: {path}")
+    except UnicodeDecodeError:
+        raise PatchError(f"{path} is not UTF-8 text")
+
+
+def plan_patch(patch, path=None, root="."):
+    """[(path, new text or None to delete, summary)] for a unified diff, without writing anything."""
+    files = parse_unified(patch)
+    if not files:
+        raise PatchError("no hunks found; expected a unified diff with @@ headers")
+    changes = []
+    for f in files:
+        target = f["new"] if f["new"] is not None else f["old"]
+        target = path if (path and (len(files) == 1 or not target)) else target
+        if not target:
+            raise PatchError("patch has no file headers; pass `path`")
+        full = os.path.join(root, os.path.expanduser(target))
+        if f["new"] is None:
+            changes.append((full, None, {"deleted": True}))
+            continue
+        text = "" if f["old"] is None and not os.path.exists(full) else read_text(full)
+        try:
+            new_text, summary = apply_hunks(text, f["hunks"])
+        except PatchError as e:
+            raise PatchError(f"{target}: {e}")
+        changes.append((full, new_text, summary))
+    return changes
@@ -0,0 +1,338 @@
+"""Long-lived Python interpreter behind the run_python tool.
+
+The kernel is a child process (this file run with --child) that executes code
+in one persistent namespace, so imports and variables survive between calls.
+Requests and responses are JSON lines over the child's stdin and a private
+copy of its stdout. Anything written straight to file descriptor 1 or 2 (e.g.
+by a subprocess) is drained from the child's stderr and returned with the
+call that produced it.
+
+The supervisor side interrupts a call that exceeds its timeout and restarts
+the kernel if it does not respond to the interrupt or has died.
+
+Limits (POSIX): an address-space cap for the process, a cap on the size of any
+file it writes, and a CPU-time budget per call; a call over its budget gets a
+CPUTimeExceeded exception and the namespace is kept. Writes from Python code
+(open() for writing, remove, rename, mkdir, ...) are refused outside the
+kernel's working directory and the `writable` directories. This guards against
+runaway or careless code, not a hostile one: reads are not restricted, and
+subprocesses started from the kernel are only bound by the resource limits.
+"""
+import ast
+import contextlib
+import io
+import itertools
+import json
+import linecache
+import os
+import queue
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+MAX_OUTPUT = 20000
+CHILD = os.path.abspath(__file__)
+
+
+def _clip(text, limit=MAX_OUTPUT):
+    if len(text) <= limit:
+        return text
+    return f"... [{len(text) - limit} characters truncated] ...\n" + text[-limit:]
+
+
+def _execute(code, namespace, filename):
+    """exec()s the code; like the REPL, returns repr() of a trailing expression."""
+    tree = ast.parse(code, filename, "exec")
+    last = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last = ast.Expression(tree.body.pop().value)
+    exec(compile(tree, filename, "exec"), namespace)
+    if last is not None:
+        value = eval(compile(last, filename, "eval"), namespace)
+        if value is not None:
+            return repr(value)
+    return None
+
+
+class CPUTimeExceeded(BaseException):
+    """Raised into a call that used up its CPU-time budget (SIGXCPU)."""
+
+
+# Audit events that change the filesystem, and which of their arguments are paths
+WRITE_EVENTS = {
+    "os.remove": (0,), "os.rename": (0, 1), "os.rmdir": (0,), "os.mkdir": (0,),
+    "os.truncate": (0,), "os.chmod": (0,), "os.chown": (0,), "os.utime": (0,),
+    "os.symlink": (1,), "os.link": (0, 1), "shutil.rmtree": (0,), "shutil.copyfile": (1,),
+}
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+
+
+def _inside(path, roots):
+    path = os.path.realpath(os.fsdecode(path))
+    return any(path == root or path.startswith(root + os.sep) for root in roots)
+
+
+def _confine(roots):
+    """Installs an audit hook that refuses writes outside `roots`. Audit hooks cannot be removed."""
+    roots = [os.path.realpath(r) for r in roots]
+
+    def hook(event, args):
+        if event == "open":
+            path, mode, flags = args
+            writing = any(c in mode for c in "wax+") if isinstance(mode, str) else bool(flags & WRITE_FLAGS)
+            paths = [path] if writing else []
+        else:
+            paths = [args[i] for i in WRITE_EVENTS.get(event, ())]
+        for path in paths:
+            if isinstance(path, (str, bytes, os.PathLike)) and not _inside(path, roots):
+                raise PermissionError(f"run_python may only write under {', '.join(roots)}: {os.fsdecode(path)}")
+    sys.addaudithook(hook)
+
+
+class _CPUBudget:
+    """Gives each call `seconds` of CPU time by moving the soft RLIMIT_CPU past what the process has used."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.running = False
+        try:
+            import resource
+            self._resource = resource
+            signal.signal(signal.SIGXCPU, self._exceeded)
+        except (ImportError, AttributeError, ValueError):
+            self._resource = None
+
+    def _exceeded(self, signum, frame):
+        if self.running:
+            self.running = False  # SIGXCPU repeats every second; raise once
+            raise CPUTimeExceeded(f"CPU time limit exceeded ({self.seconds}s per call)")
+
+    def _set_soft(self, soft):
+        limits = self._resource
+        hard = limits.getrlimit(limits.RLIMIT_CPU)[1]
+        if hard != limits.RLIM_INFINITY and (soft == limits.RLIM_INFINITY or soft > hard):
+            soft = hard
+        try:
+            limits.setrlimit(limits.RLIMIT_CPU, (soft, hard))
+        except (ValueError, OSError):
+            pass
+
+    def __enter__(self):
+        if self._resource is not None and self.seconds:
+            usage = self._resource.getrusage(self._resource.RUSAGE_SELF)
+            self._set_soft(int(usage.ru_utime + usage.ru_stime + self.seconds) + 1)
+            self.running = True
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        if self._resource is not None and self.seconds:
+            self._set_soft(self._resource.RLIM_INFINITY)
+
+
+def _child(config):
+    if hasattr(signal, "SIGXFSZ"):
+        # Writing past the file-size limit then fails with OSError (EFBIG) instead of killing the kernel
+        signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    cpu = _CPUBudget(config.get("cpu_seconds"))
+    _confine([os.getcwd(), *config.get("writable", [])])
+    # Private copies of the pipes: user code may close sys.stdin (exit() does) or write to fd 1
+    requests = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    sys.stdin = open(os.devnull, "r")
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    while True:
+        try:
+            line = requests.readline()
+            if not line:
+                break
+            request = json.loads(line)
+            filename = f"<run_python:{request['id']}>"
+            linecache.cache[filename] = (len(request["code"]), None, request["code"].splitlines(True), filename)
+            out, err = io.StringIO(), io.StringIO()
+            response = {"id": request["id"], "result": None, "error": None}
+            started = time.perf_counter()
+            try:
+                with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err), cpu:
+                    response["result"] = _execute(request["code"], namespace, filename)
+            except KeyboardInterrupt:
+                response["error"] = "KeyboardInterrupt: execution interrupted (timeout)"
+            except CPUTimeExceeded as e:
+                response["error"] = f"{e}; execution stopped, variables kept"
+            except BaseException:
+                # SystemExit too: exit() inside the code should not kill the kernel
+                etype, value, tb = sys.exc_info()
+                while tb is not None and tb.tb_frame.f_code.co_filename == __file__:
+                    tb = tb.tb_next  # hide the kernel's own frames
+                response["error"] = "".join(traceback.format_exception(etype, value, tb))
+            response.update(stdout=_clip(out.getvalue()), stderr=_clip(err.getvalue()),
+                            seconds=round(time.perf_counter() - started, 3))
+            protocol.write(json.dumps(response, default=str) + "\n")
+            protocol.flush()
+        except (KeyboardInterrupt, CPUTimeExceeded):
+            continue  # an interrupt that arrived between calls
+
+
+def _limit_resources(memory_mb, file_mb):
+    def apply():
+        try:
+            import resource
+        except ImportError:
+            return
+        for which, mb in ((resource.RLIMIT_AS, memory_mb), (resource.RLIMIT_FSIZE, file_mb)):
+            if mb:
+                try:
+                    resource.setrlimit(which, (mb * 1024 * 1024, mb * 1024 * 1024))
+                except (ValueError, OSError):
+                    pass
+    return apply
+
+
+class PythonKernel:
+    """Supervises one kernel process. run() is serialised; one kernel per agent session.
+
+    cwd: where the kernel runs and may write (default: the current directory);
+    writable: further directories it may write to (default: the temp dir).
+    cpu_seconds is per call; memory_mb and file_mb bound the whole process. 0 disables a limit.
+    """
+
+    def __init__(self, cwd=None, timeout=30, memory_mb=2048, cpu_seconds=300, file_mb=1024,
+                 writable=None, python=None):
+        self.cwd = cwd
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.file_mb = file_mb
+        self.writable = [tempfile.gettempdir()] if writable is None else list(writable)
+        self.python = python or sys.executable
+        self.restarts = 0
+        self.proc = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._responses = None
+        self._stray = None
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def _start(self):
+        kwargs = {}
+        if os.name == "posix":
+            kwargs = {"start_new_session": True, "preexec_fn": _limit_resources(self.memory_mb, self.file_mb)}
+        config = json.dumps({"cpu_seconds": self.cpu_seconds, "writable": self.writable})
+        self.proc = subprocess.Popen([self.python, "-u", CHILD, "--child", config], cwd=self.cwd,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     text=True, encoding="utf-8", errors="replace", bufsize=1, **kwargs)
+        self._responses = queue.Queue()
+        self._stray = []
+        threading.Thread(target=self._read, args=(self.proc.stdout, self._responses.put), daemon=True).start()
+        threading.Thread(target=self._read, args=(self.proc.stderr, self._stray.append), daemon=True).start()
+
+    @staticmethod
+    def _read(stream, sink):
+        for line in stream:
+            sink(line)
+
+    def _kill(self):
+        if self.proc is None:
+            return
+        try:
+            if os.name == "posix":
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            else:
+                self.proc.kill()
+            self.proc.wait(5)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            pass
+        self.proc = None
+
+    def restart(self):
+        self._kill()
+        self._start()
+        self.restarts += 1
+
+    def _wait(self, request_id, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                line = self._responses.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                if not self.alive:
+                    return None
+                continue
+            try:
+                response = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if response.get("id") == request_id:
+                return response
+            # Late answer to a call that already timed out; drop it
+
+    def run(self, code, timeout=None):
+        timeout = timeout or self.timeout
+        with self._lock:
+            notes = []
+            if not self.alive:
+                if self.proc is not None:
+                    notes.append(f"kernel had exited (code {self.proc.returncode}); restarted with empty state")
+                    self.restart()
+                else:
+                    self._start()
+            request_id = next(self._ids)
+            del self._stray[:]
+            try:
+                self.proc.stdin.write(json.dumps({"id": request_id, "code": code}) + "\n")
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError):
+                self.restart()
+                return {"error": "kernel was not accepting input; restarted with empty state, run the code again"}
+
+            response = self._wait(request_id, timeout)
+            interrupted = False
+            if response is None and self.alive and os.name == "posix":
+                # Ask nicely first: KeyboardInterrupt keeps the namespace
+                os.kill(self.proc.pid, signal.SIGINT)
+                response = self._wait(request_id, 2)
+                interrupted = response is not None
+            if response is None:
+                died = not self.alive
+                stray = "".join(self._stray)
+                self.restart()
+                reason = "kernel crashed" if died else f"timed out after {timeout}s and did not respond to an interrupt"
+                result = {"error": f"{reason}; kernel restarted with empty state"}
+                if stray:
+                    result["stderr"] = _clip(stray)
+                return result
+
+            result = {k: v for k, v in response.items() if k != "id" and v not in (None, "")}
+            if interrupted:
+                result["error"] = f"timed out after {timeout}s; execution interrupted, variables kept"
+            stray = "".join(self._stray)
+            if stray:
+                result["stderr"] = result.get("stderr", "") + _clip(stray)
+            if notes:
+                result["note"] = "; ".join(notes)
+            return result
+
+    def close(self):
+        with self._lock:
+            if self.alive:
+                try:
+                    self.proc.stdin.close()
+                    self.proc.wait(2)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+
+
+if __name__ == "__main__" and "--child" in sys.argv:
+    _child(json.loads(sys.argv[sys.argv.index("--child") + 1]))
@@ -0,0 +1,332 @@
+"""search_code: regex/literal search over a workspace, narrowed by a persistent trigram index.
+
+Every indexed file is stored with its mtime, size and the set of (lowercased)
+byte trigrams it contains. A query is reduced to trigrams that any match must
+contain, so only files holding all of them are opened and scanned. The index
+lives in SQLite under ~/.cache/architect/search/ (outside the workspace it
+indexes; $XDG_CACHE_HOME is honoured). The agent's own data/state directory is
+never indexed. The index is refreshed by an mtime scan
+and by write_file calling update_path(). The scan runs at most every
+`rescan_interval` seconds, except right after a tool that can change files
+behind the index's back (mark_stale) or while background jobs are active.
+"""
+import fnmatch
+import hashlib
+import os
+import re
+import threading
+import time
+
+from ..core.sqlite_store import connect
+from . import jobs
+from .tree import index as directory_index
+
+INDEX_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "architect", "search")
+STATE_DIR = "data/state"  # caches, plans and stats of the agent itself, not part of the project
+MAX_FILE_BYTES = 1024 * 1024
+# Tools that can change files without calling update_path()
+UNTRACKED_WRITERS = {"run_shell_command", "run_python"}
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    trigrams BLOB NOT NULL
+);
+"""
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def trigrams(data):
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def _regex_literals(pattern):
+    """Literal runs that every match of `pattern` must contain (conservative; [] when unsure)."""
+    if "|" in pattern:
+        return []
+    runs, current, i = [], [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            if nxt.isalnum():  # \w, \d, \b, backreferences...
+                runs.append("".join(current))
+                current = []
+            else:
+                current.append(nxt)
+            i += 2
+            continue
+        quantifier = re.match(r"\{(\d*)(,?)\d*\}", pattern[i:]) if char == "{" else None
+        if char in "*?" or (quantifier and quantifier.group(1) in ("", "0")):
+            if current:
+                current.pop()  # the previous character is optional
+            runs.append("".join(current))
+            current = []
+            if quantifier:
+                i += quantifier.end() - 1
+        elif quantifier:
+            runs.append("".join(current))
+            current = []
+            i += quantifier.end() - 1
+        elif char in "(":
+            # Skip the group: it may be optional or repeated
+            runs.append("".join(current))
+            current = []
+            depth = 0
+            while i < len(pattern):
+                if pattern[i] == "\\":
+                    i += 2
+                    continue
+                depth += pattern[i] == "("
+                depth -= pattern[i] == ")"
+                if depth == 0:
+                    break
+                i += 1
+        elif char == "[":
+            runs.append("".join(current))
+            current = []
+            end = pattern.find("]", i + 2)
+            i = end if end != -1 else len(pattern)
+        elif char in ".^$+)]":
+            runs.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+        i += 1
+    runs.append("".join(current))
+    return [r for r in runs if len(r) >= 3]
+
+
+class TrigramIndex:
+    def __init__(self, root, index_dir=INDEX_DIR, rescan_interval=2.0):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.rescan_interval = rescan_interval
+        self.state_dir = os.path.abspath(STATE_DIR)
+        os.makedirs(index_dir, exist_ok=True)
+        name = hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:16]
+        self.conn = connect(os.path.join(index_dir, f"{name}.db"))
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        self.files = {}     # path -> (file id, mtime_ns, size)
+        self.postings = {}  # trigram -> set of file ids
+        self._paths = {}    # file id -> path
+        self._ids = 0
+        self._stale = 0     # dropped ids still present in posting lists
+        self.skipped = {}   # binary or oversized files: path -> (mtime_ns, size)
+        self._scanned = 0.0
+        self._scanned_at = 0.0  # wall clock, comparable with job end times
+        self.stale = True  # scan before the first search
+        for row in self.conn.execute("SELECT path, mtime_ns, size, trigrams FROM files"):
+            blob = row["trigrams"]
+            self._add(row["path"], row["mtime_ns"], row["size"], {blob[i:i + 3] for i in range(0, len(blob), 3)})
+
+    def _add(self, path, mtime_ns, size, grams):
+        self._ids += 1
+        self.files[path] = (self._ids, mtime_ns, size)
+        self._paths[self._ids] = path
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(self._ids)
+
+    def _drop(self, path):
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        self._paths.pop(entry[0], None)
+        # Its ids stay in the posting lists (skipped at query time) until the next _rebuild()
+        self._stale += 1
+
+    def _index_file(self, path, st):
+        """Reads and indexes one file; returns False if it is binary, too big or unreadable."""
+        self._drop(path)
+        self.skipped.pop(path, None)
+        if st.st_size > MAX_FILE_BYTES:
+            self.skipped[path] = (st.st_mtime_ns, st.st_size)
+            return False
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        if b"\0" in data[:8192]:
+            self.skipped[path] = (st.st_mtime_ns, st.st_size)
+            return False
+        grams = trigrams(data)
+        self._add(path, st.st_mtime_ns, st.st_size, grams)
+        self.conn.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size, trigrams) VALUES (?, ?, ?, ?)",
+                          (path, st.st_mtime_ns, st.st_size, b"".join(sorted(grams))))
+        return True
+
+    def _ignored(self, path):
+        return path.startswith(self.state_dir + os.sep)
+
+    def update_path(self, path):
+        path = os.path.abspath(os.path.expanduser(path))
+        if self._ignored(path):
+            return
+        with self._lock:
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._drop(path)
+                self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                return
+            self._index_file(path, st)
+
+    def refresh(self, force=False):
+        """mtime scan of the workspace; returns the number of files (re)indexed or removed."""
+        with self._lock:
+            if not force and not self.stale and not jobs.active_since(self._scanned_at) \
+                    and time.monotonic() - self._scanned < self.rescan_interval:
+                return 0
+            self.stale = False
+            self._scanned_at = time.time()
+            changed = 0
+            seen = set()
+            self.conn.execute("BEGIN")
+            try:
+                for path in directory_index.files(self.root):
+                    if self._ignored(path):
+                        continue
+                    seen.add(path)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    entry = self.files.get(path)
+                    if entry and entry[1:] == (st.st_mtime_ns, st.st_size):
+                        continue
+                    if self.skipped.get(path) == (st.st_mtime_ns, st.st_size):
+                        continue
+                    self._index_file(path, st)
+                    changed += 1
+                for path in [p for p in self.files if p not in seen]:
+                    self._drop(path)
+                    self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                    changed += 1
+                for path in [p for p in self.skipped if p not in seen]:
+                    del self.skipped[path]
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            if self._stale > len(self.files) // 2:
+                self._rebuild()
+            self._scanned = time.monotonic()
+            return changed
+
+    def _rebuild(self):
+        # Drops the stale ids that _drop() left behind in posting lists
+        live = set(self._paths)
+        for gram in list(self.postings):
+            self.postings[gram] &= live
+            if not self.postings[gram]:
+                del self.postings[gram]
+        self._stale = 0
+
+    def candidates(self, literals):
+        """Paths that contain every trigram of every literal (all files if there is nothing to narrow on)."""
+        ids = None
+        for literal in literals:
+            for gram in trigrams(literal.encode("utf-8")):
+                posting = self.postings.get(gram)
+                if not posting:
+                    return []
+                ids = set(posting) if ids is None else ids & posting
+                if not ids:
+                    return []
+        if ids is None:
+            return sorted(self.files)
+        return sorted(self._paths[i] for i in ids if i in self._paths)
+
+    def search(self, query, regex=False, ignore_case=False, limit=50, context=0, glob=None, path=None):
+        started = time.perf_counter()
+        try:
+            pattern = re.compile(query if regex else re.escape(query), re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            return {"error": f"Invalid regex: {e}"}
+        self.refresh()
+        literals = _regex_literals(query) if regex else [query]
+        if ignore_case and not query.isascii():
+            literals = []  # the index only folds ASCII case
+        scope = os.path.abspath(os.path.expanduser(path)) if path else self.root
+        with self._lock:
+            paths = self.candidates(literals)
+        matches, files_matched, searched, truncated = [], 0, 0, False
+        for file_path in paths:
+            if scope != self.root and not file_path.startswith(scope + os.sep) and file_path != scope:
+                continue
+            rel = os.path.relpath(file_path, scope)
+            if glob and not (fnmatch.fnmatch(rel, glob) or fnmatch.fnmatch(os.path.basename(rel), glob)):
+                continue
+            # Reported relative to the path the caller gave, so it can go straight into read_file
+            rel = os.path.normpath(os.path.join(path, rel)) if path else rel
+            searched += 1
+            try:
+                with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            if not pattern.search(text):
+                continue
+            files_matched += 1
+            lines = text.splitlines()
+            for number, line in enumerate(lines, 1):
+                if not pattern.search(line):
+                    continue
+                if len(matches) >= limit:
+                    truncated = True
+                    break
+                block = [f"{rel}-{n}- {lines[n - 1][:300]}" for n in range(max(1, number - context), number)]
+                block.append(f"{rel}:{number}: {line[:300]}")
+                block += [f"{rel}-{n}- {lines[n - 1][:300]}" for n in range(number + 1, min(len(lines), number + context) + 1)]
+                matches.append("\n".join(block))
+            if truncated:
+                break
+        result = {"matches": matches, "count": len(matches), "files_matched": files_matched,
+                  "files_searched": searched, "files_indexed": len(self.files),
+                  "seconds": round(time.perf_counter() - started, 4)}
+        if truncated:
+            result["truncated"] = True
+        return result
+
+    def close(self):
+        self.conn.close()
+
+
+def get_index(root="."):
+    root = os.path.abspath(os.path.expanduser(root))
+    with _indexes_lock:
+        # A subdirectory of an open workspace reuses the workspace's index
+        for indexed_root, idx in _indexes.items():
+            if root == indexed_root or root.startswith(indexed_root + os.sep):
+                return idx
+        _indexes[root] = TrigramIndex(root)
+        return _indexes[root]
+
+
+def mark_stale():
+    """Makes every open index rescan before its next search (after a shell or python tool call)."""
+    for idx in list(_indexes.values()):
+        idx.stale = True
+
+
+def update_path(path):
+    """Called after a file is written so open indexes see it without waiting for a rescan."""
+    path = os.path.abspath(os.path.expanduser(path))
+    for root, idx in list(_indexes.items()):
+        if path.startswith(root + os.sep):
+            idx.update_path(path)
+
+
+def search_code(query, path=".", regex=False, ignore_case=False, limit=50, context=0, glob=None):
+    if not query:
+        return {"error": "Provide a query."}
+    path = os.path.expanduser(path or ".")
+    if not os.path.isdir(path):
+        return {"error": f"Directory not found: {path}"}
+    return get_index(path).search(query, regex=regex, ignore_case=ignore_case, limit=int(limit),
+                                  context=max(0, int(context)), glob=glob, path=path)
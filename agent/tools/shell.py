@@ -1,7 +1,11 @@
 import subprocess
 import os
 
-def run_shell_command(command):
+from .jobs import manager as jobs
+
+def run_shell_command(command, background=False):
+    if background:
+        return jobs.start(command)
     try:
         result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=60)
         output = result.stdout + result.stderr
@@ -10,3 +14,12 @@ def run_shell_command(command):
         return "Error: Command timed out."
     except Exception as e:
         return f"Error: {str(e)}"
+
+def job_status(job_id=None, wait=0):
+    return jobs.status(job_id, wait)
+
+def job_output(job_id, offset=0):
+    return jobs.output(job_id, offset)
+
+def job_kill(job_id):
+    return jobs.kill(job_id)
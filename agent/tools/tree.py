@@ -0,0 +1,282 @@
+import collections
+import os
+import re
+import threading
+import time
+
+# Never worth descending into when exploring a project
+SKIP_DIRS = {".git", "node_modules", "__pycache__", ".venv", "venv", ".mypy_cache", ".pytest_cache", ".tox", ".idea"}
+MAX_CACHED_DIRS = 4096
+# Rolled-up sizes stop here; the counts are then lower bounds ("≥")
+USAGE_MAX_DIRS = 2000
+USAGE_SECONDS = 1.0
+
+
+def human_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def _glob_to_regex(pattern):
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape("["))
+                i += 1
+            else:
+                out.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+                i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """The patterns of one .gitignore, matched against paths relative to its directory (last match wins)."""
+
+    def __init__(self, lines):
+        self.rules = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            prefix = "^" if anchored else "^(?:.*/)?"
+            self.rules.append((re.compile(prefix + _glob_to_regex(line) + "$"), negate, dir_only))
+
+    def match(self, relpath, is_dir):
+        """True (ignored), False (re-included by a ! rule) or None (no rule applies)."""
+        verdict = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(relpath):
+                verdict = not negate
+        return verdict
+
+
+class DirectoryIndex:
+    """scandir results per directory, re-read only when the directory's mtime changes.
+
+    A file rewritten in place does not change its directory's mtime, so sizes
+    can lag until invalidate() is called for that path (write_file does).
+    At most `max_dirs` listings are kept, least recently used first out.
+    """
+
+    def __init__(self, max_dirs=MAX_CACHED_DIRS):
+        self.max_dirs = max_dirs
+        self._dirs = collections.OrderedDict()  # path -> (mtime_ns, [(name, is_dir, size, mtime_ns)])
+        self._ignores = {}  # .gitignore path -> (mtime_ns, IgnoreRules)
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def entries(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._dirs.get(path)
+            if cached and cached[0] == mtime:
+                self._dirs.move_to_end(path)
+                return cached[1]
+        items = []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        st = entry.stat(follow_symlinks=False)
+                        items.append((entry.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime_ns))
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        items.sort(key=lambda e: (not e[1], e[0].lower()))
+        with self._lock:
+            self._dirs[path] = (mtime, items)
+            self._dirs.move_to_end(path)
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+            self.scans += 1
+        return items
+
+    def invalidate(self, path):
+        """Forgets the cached listing of `path`'s directory (and of `path` itself if it is one)."""
+        path = os.path.abspath(os.path.expanduser(path))
+        with self._lock:
+            self._dirs.pop(path, None)
+            self._dirs.pop(os.path.dirname(path), None)
+
+    def _rules(self, directory):
+        path = os.path.join(directory, ".gitignore")
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._ignores.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            with open(path, "r", errors="replace") as f:
+                rules = IgnoreRules(f)
+        except OSError:
+            return None
+        self._ignores[path] = (mtime, rules)
+        return rules
+
+    def _ancestor_rules(self, path):
+        """.gitignore files from the repository root down to `path`'s parent."""
+        chain = []
+        current = os.path.dirname(path)
+        while True:
+            rules = self._rules(current)
+            if rules:
+                chain.append((current, rules))
+            if os.path.isdir(os.path.join(current, ".git")) or os.path.dirname(current) == current:
+                break
+            current = os.path.dirname(current)
+        return list(reversed(chain))
+
+    @staticmethod
+    def _ignored(rule_chain, path, is_dir):
+        verdict = None
+        for base, rules in rule_chain:
+            result = rules.match(os.path.relpath(path, base).replace(os.sep, "/"), is_dir)
+            if result is not None:
+                verdict = result
+        return bool(verdict)
+
+    def _children(self, directory, rule_chain, show_hidden, respect_ignore):
+        """Non-pruned children of a directory, plus the names that were pruned."""
+        items = self.entries(directory) or []
+        if respect_ignore:
+            rules = self._rules(directory)
+            if rules:
+                rule_chain = rule_chain + [(directory, rules)]
+        kept, pruned = [], []
+        for item in items:
+            name, is_dir = item[0], item[1]
+            path = os.path.join(directory, name)
+            if (is_dir and name in SKIP_DIRS) or (not show_hidden and name.startswith(".")) \
+                    or (respect_ignore and self._ignored(rule_chain, path, is_dir)):
+                pruned.append(name + ("/" if is_dir else ""))
+            else:
+                kept.append(item)
+        return kept, pruned, rule_chain
+
+    def usage(self, path, show_hidden=True, respect_ignore=False, max_dirs=USAGE_MAX_DIRS, seconds=USAGE_SECONDS):
+        """(files, bytes, complete) under a directory; by default counts everything except SKIP_DIRS.
+
+        Stops after `max_dirs` directories or `seconds`; complete is then False
+        and the counts are lower bounds.
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        chain = self._ancestor_rules(path) if respect_ignore else []
+        return self._usage(path, show_hidden, respect_ignore, chain, {}, _usage_limit(max_dirs, seconds))
+
+    def _usage(self, path, show_hidden, respect_ignore, chain, memo, limit):
+        if path in memo:
+            return memo[path]
+        if limit["dirs"] <= 0 or time.monotonic() > limit["deadline"]:
+            return 0, 0, False
+        limit["dirs"] -= 1
+        kept, _, chain = self._children(path, chain, show_hidden, respect_ignore)
+        files, size, complete = 0, 0, True
+        for name, is_dir, nbytes, _ in kept:
+            if is_dir:
+                f, s, c = self._usage(os.path.join(path, name), show_hidden, respect_ignore, chain, memo, limit)
+                files, size, complete = files + f, size + s, complete and c
+            else:
+                files, size = files + 1, size + nbytes
+        memo[path] = (files, size, complete)
+        return memo[path]
+
+    def files(self, path, show_hidden=False, respect_ignore=True):
+        """Every non-pruned file path under a directory."""
+        root = os.path.abspath(os.path.expanduser(path))
+        stack = [(root, self._ancestor_rules(root) if respect_ignore else [])]
+        while stack:
+            directory, chain = stack.pop()
+            kept, _, chain = self._children(directory, chain, show_hidden, respect_ignore)
+            for name, is_dir, _, _ in kept:
+                if is_dir:
+                    stack.append((os.path.join(directory, name), chain))
+                else:
+                    yield os.path.join(directory, name)
+
+    def tree(self, path, depth=2, offset=0, limit=200, show_hidden=False, respect_ignore=True, sizes=True):
+        """A sorted, pruned listing of `path` down to `depth` levels, one page at a time."""
+        root = os.path.abspath(os.path.expanduser(path))
+        if not os.path.isdir(root):
+            return {"error": f"Directory not found: {path}"}
+        depth = max(1, int(depth))
+        lines, pruned, memo = [], [], {}
+        # One bound for all the rolled-up sizes of this listing
+        size_limit = _usage_limit(USAGE_MAX_DIRS, USAGE_SECONDS)
+        partial = []
+
+        def walk(directory, level, chain):
+            kept, skipped, chain = self._children(directory, chain, show_hidden, respect_ignore)
+            pruned.extend(os.path.relpath(os.path.join(directory, n), root) + ("/" if n.endswith("/") else "") for n in skipped)
+            for name, is_dir, nbytes, _ in kept:
+                indent = "  " * level
+                child = os.path.join(directory, name)
+                if is_dir:
+                    if sizes:
+                        files, total, complete = self._usage(child, show_hidden, respect_ignore, chain, memo, size_limit)
+                        at_least = "" if complete else "≥"
+                        if not complete:
+                            partial.append(name)
+                        lines.append(f"{indent}{name}/ ({at_least}{files} files, {at_least}{human_size(total)})")
+                    else:
+                        lines.append(f"{indent}{name}/")
+                    if level + 1 < depth:
+                        walk(child, level + 1, chain)
+                else:
+                    lines.append(f"{indent}{name} ({human_size(nbytes)})" if sizes else f"{indent}{name}")
+
+        walk(root, 0, self._ancestor_rules(root) if respect_ignore else [])
+        offset = max(0, int(offset))
+        page = lines[offset:offset + limit]
+        result = {"path": root, "depth": depth, "entries": page, "total": len(lines), "offset": offset}
+        if offset + limit < len(lines):
+            result["next_offset"] = offset + limit
+        if partial:
+            result["note"] = (f"Sizes marked ≥ stopped counting after {USAGE_MAX_DIRS} directories or {USAGE_SECONDS:g}s; "
+                              "list a subdirectory for exact totals.")
+        if pruned:
+            result["pruned"] = pruned[:20] + ([f"... {len(pruned) - 20} more"] if len(pruned) > 20 else [])
+        return result
+
+
+def _usage_limit(max_dirs, seconds):
+    return {"dirs": max_dirs, "deadline": time.monotonic() + seconds}
+
+
+index = DirectoryIndex()
@@ -1,7 +1,7 @@
-from ddgs import DDGS
-
 def web_search(query):
     try:
+        # Imported on first use: ddgs pulls in a large HTTP stack that one-shot runs rarely need
+        from ddgs import DDGS
         results = []
         with DDGS() as ddgs:
             # 1. Text search - use query as first positional argument for ddgs 9.10.0
@@ -0,0 +1,102 @@
+"""Compares the pretty-printed JSON memory graph with the binary snapshot format.
+
+Each load is measured in a fresh interpreter so resident memory is not skewed by earlier runs.
+
+Usage: python benchmarks/graph_snapshot.py [--nodes 20000] [--edges 100000]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.core.graph_snapshot import write_snapshot
+from memory_backends import synthetic_graph
+
+CHILD = r"""
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+from agent.core.memory_manager import MemoryManager
+from agent.core.graph_snapshot import GraphSnapshot
+
+def rss_kb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096 // 1024
+
+backend, path, label = sys.argv[2], sys.argv[3], sys.argv[4]
+base = rss_kb()
+start = time.perf_counter()
+mm = MemoryManager(path, backend=backend)
+load = time.perf_counter() - start
+start = time.perf_counter()
+mm.find_node(label)
+find = time.perf_counter() - start
+start = time.perf_counter()
+mm.traverse(label, depth=2)
+traverse = time.perf_counter() - start
+loaded_rss = rss_kb() - base
+start = time.perf_counter()
+mm.graph
+materialize = time.perf_counter() - start
+print(json.dumps({"load": load, "first find_node": find, "first traverse": traverse,
+                  "rss after reads (KiB)": loaded_rss, "materialize": materialize,
+                  "rss materialized (KiB)": rss_kb() - base}))
+"""
+
+
+def measure(root, backend, path, label):
+    out = subprocess.run([sys.executable, "-c", CHILD, root, backend, path, label],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--edges", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+    graph = synthetic_graph(args.nodes, args.edges)
+    label = random.choice(graph["nodes"])["label"]
+    with tempfile.TemporaryDirectory() as workdir:
+        json_path = os.path.join(workdir, "memory_network.json")
+        start = time.perf_counter()
+        with open(json_path, 'w') as f:
+            json.dump(graph, f, indent=2)
+        sizes = {"json": (os.path.getsize(json_path), time.perf_counter() - start)}
+        for compression in (None, "gzip", "zstd"):
+            name = f"snapshot+{compression}" if compression else "snapshot"
+            start = time.perf_counter()
+            try:
+                size = write_snapshot(os.path.join(workdir, f"{name}.snap"), graph, compression)
+            except ImportError as e:
+                print(f"[!] {name}: {e}")
+                continue
+            sizes[name] = (size, time.perf_counter() - start)
+
+        print(f"\nMemory graph ({args.nodes} nodes, {args.edges} edges)")
+        print(f"{'format':<18}{'size (KiB)':>12}{'write (ms)':>12}")
+        for name, (size, seconds) in sizes.items():
+            print(f"{name:<18}{size / 1024:>12.0f}{seconds * 1000:>12.1f}")
+
+        snap_path = os.path.join(workdir, "memory_network.snap")
+        os.replace(os.path.join(workdir, "snapshot.snap"), snap_path)
+        rows = {"json": measure(root, "json", json_path, label),
+                "snapshot (mmap)": measure(root, "snapshot", json_path, label)}
+        print(f"\n{'':<24}" + "".join(f"{name:>18}" for name in rows))
+        for key in rows["json"]:
+            unit = 1 if "KiB" in key else 1000
+            suffix = "" if "KiB" in key else " (ms)"
+            print(f"{key + suffix:<24}" + "".join(f"{rows[name][key] * unit:>18.1f}" for name in rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Compares the JSON and SQLite memory backends on a synthetic graph and episodic log.
+
+Usage: python benchmarks/memory_backends.py [--nodes 5000] [--edges 20000] [--memories 5000] [--ops 200]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.core.memory_manager import MemoryManager as GraphMemory
+from agent.memory.manager import MemoryManager as EpisodicMemory
+from agent.memory.migrate import migrate_graph, migrate_index
+
+WORDS = "rust python agent memory graph model planner tool file shell web search cache index node edge fact".split()
+
+
+def synthetic_graph(n_nodes, n_edges):
+    nodes = [{"id": f"n{i}", "type": "entity", "label": f"{random.choice(WORDS)} {i}",
+              "properties": {}, "created_at": "2026-01-01T00:00:00"} for i in range(n_nodes)]
+    edges = {}
+    while len(edges) < n_edges:
+        s, t = random.randrange(n_nodes), random.randrange(n_nodes)
+        rel = random.choice(("likes", "is_a", "has", "uses"))
+        edges[(s, t, rel)] = {"source": f"n{s}", "target": f"n{t}", "relation": rel,
+                              "weight": 1.0, "created_at": "2026-01-01T00:00:00"}
+    return {"nodes": nodes, "edges": list(edges.values())}
+
+
+def synthetic_index(n):
+    return [{"id": i + 1, "timestamp": "2026-01-01 00:00:00",
+             "content": " ".join(random.choices(WORDS, k=12)), "tags": []} for i in range(n)]
+
+
+def timed(fn, repeat=1):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) * 1000
+
+
+def bench_graph(workdir, args):
+    json_path = os.path.join(workdir, "memory_network.json")
+    graph = synthetic_graph(args.nodes, args.edges)
+    with open(json_path, 'w') as f:
+        json.dump(graph, f, indent=2)
+    seeds = [n["label"] for n in random.sample(graph["nodes"], min(args.ops, args.nodes))]
+    migrate_graph(json_path)
+
+    rows = {}
+    for backend in ("json", "sqlite"):
+        mm = None
+        def load(_):
+            nonlocal mm
+            mm = GraphMemory(json_path, backend=backend)
+        r = {"load": timed(load)}
+        r["find_node"] = timed(lambda i: mm.find_node(seeds[i % len(seeds)]), args.ops)
+        r["get_related"] = timed(lambda i: mm.get_related(f"n{i % args.nodes}"), args.ops)
+        r["add_node"] = timed(lambda i: mm.add_node(f"new{i}", "entity", f"new {i}"), args.ops)
+        def add_fact(i):
+            with mm.batch():
+                a = mm.add_node(f"s{i}", "entity", f"s {i}")
+                b = mm.add_node(f"t{i}", "entity", f"t {i}")
+                mm.add_edge(a["id"], b["id"], "likes")
+        r["update_memory (batched)"] = timed(add_fact, args.ops)
+        r["search"] = timed(lambda i: mm.search(random.choice(WORDS)), args.ops)
+        r["build adjacency"] = timed(lambda i: mm._adjacency())
+        r["traverse 3 hops (bfs)"] = timed(lambda i: mm.traverse(seeds[i % len(seeds)], depth=3), args.ops)
+        r["traverse 3 hops (ppr)"] = timed(lambda i: mm.traverse(seeds[i % len(seeds)], depth=3, method="pagerank"), args.ops)
+        rows[backend] = r
+    return rows
+
+
+def bench_index(workdir, args):
+    data_dir = os.path.join(workdir, "memories")
+    os.makedirs(data_dir)
+    with open(os.path.join(data_dir, "index.json"), 'w') as f:
+        json.dump(synthetic_index(args.memories), f, indent=2)
+    migrate_index(os.path.join(data_dir, "index.json"))
+
+    rows = {}
+    for backend in ("json", "sqlite"):
+        mm = None
+        def load(_):
+            nonlocal mm
+            mm = EpisodicMemory(data_dir, backend=backend)
+        r = {"load": timed(load)}
+        r["save"] = timed(lambda i: mm.save(f"benchmark fact {i} about {random.choice(WORDS)}"), args.ops)
+        r["retrieve_relevant"] = timed(lambda i: mm.retrieve_relevant(random.choice(WORDS)), args.ops)
+        rows[backend] = r
+    return rows
+
+
+def report(title, rows, ops):
+    print(f"\n{title}")
+    print(f"{'operation':<26}{'json (ms)':>12}{'sqlite (ms)':>14}{'speedup':>10}")
+    for op in rows["json"]:
+        j, s = rows["json"][op], rows["sqlite"][op]
+        per = "" if op in ("load", "build adjacency") else f" /{ops}"
+        print(f"{op + per:<26}{j:>12.1f}{s:>14.1f}{j / s if s else 0:>9.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--edges", type=int, default=20000)
+    parser.add_argument("--memories", type=int, default=5000)
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report(f"Memory graph ({args.nodes} nodes, {args.edges} edges)", bench_graph(workdir, args), args.ops)
+        report(f"Episodic log ({args.memories} entries)", bench_index(workdir, args), args.ops)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Render cost and prompt sizes for each prompt template entry point.
+
+Also checks that two renders with different dynamic values share the same
+byte-identical static prefix, which is what lets Ollama reuse its KV cache.
+
+Usage: python benchmarks/prompt_render.py [--iterations 20000]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, root)
+
+import run_agent
+from agent.core import architect_engine
+from agent.core.prompt import count_tokens
+from agent.planning import planner
+
+# agent/main.py is a script (the repo root has its own main.py), so load it by path
+spec = importlib.util.spec_from_file_location("lyra_main", os.path.join(root, 'agent', 'main.py'))
+lyra = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(lyra)
+
+ENTRY_POINTS = [
+    ("load_identity", lyra.SYSTEM_TEMPLATE, [{}, {}]),
+    ("run_agent system", run_agent.SYSTEM_PROMPT,
+     [{"os": "Linux", "today": "January 01, 2026", "project_root": "/home/a"},
+      {"os": "Darwin", "today": "March 14, 2026", "project_root": "/Users/b/src"}]),
+    ("Planner.decompose", planner.DECOMPOSE_PROMPT,
+     [{"goal": "Build a snake game in pygame"}, {"goal": "Write a CLI that converts CSV to JSON"}]),
+    ("engine system", architect_engine.SYSTEM_PROMPT, [{}, {}]),
+    ("engine recovery", architect_engine.RECOVERY_PROMPT,
+     [{"task": "Refactor the parser"}, {"task": "Add retries to the HTTP client"}]),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"\n{'entry point':<20}{'render (us)':>12}{'tokens':>8}{'prefix':>8}{'stable':>8}")
+    for name, template, values in ENTRY_POINTS:
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            template.render(**values[0])
+        micros = (time.perf_counter() - start) / args.iterations * 1e6
+        first, second = (template.render(**v) for v in values)
+        stable = first.startswith(template.prefix) and second.startswith(template.prefix)
+        print(f"{name:<20}{micros:>12.2f}{count_tokens(first):>8}{count_tokens(template.prefix):>8}{'yes' if stable else 'NO':>8}")
+        for row in template.stats(**values[0])["sections"]:
+            print(f"  {row['section']:<18}{'static' if row['static'] else 'dynamic':>12}{row['tokens']:>8}")
+
+
+if __name__ == "__main__":
+    main()
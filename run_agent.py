@@ -4,7 +4,6 @@ warnings.filterwarnings("ignore", category=RuntimeWarning)
 warnings.filterwarnings("ignore", category=ResourceWarning)
 warnings.filterwarnings("ignore", message=".*duckduckgo_search.*")
 
-import ollama
 import subprocess
 import os
 import sys
@@ -12,35 +11,95 @@ import json
 import datetime
 import platform
 
-# Import custom tools
-from agent.tools.shell import run_shell_command
-from agent.tools.filesystem import read_file, write_file, list_directory
-from agent.tools.web import web_search
-from agent.tools.info import get_system_info
+from agent.core.startup import profiler, lazy_import
+profiler.enable_from_argv(sys.argv)
+from agent.core import llm
+from agent.core.specialist_pool import SpecialistPool
+from agent.core.prompt import PromptTemplate, static, dynamic
+from agent.core import session_recorder
+from agent.core import budget
 
-def ask_specialist(prompt, specialist_model="mistral:7b"):
+# Static sections come first so the system prompt prefix is byte-identical
+# across sessions and days; only the environment section changes.
+SYSTEM_PROMPT = PromptTemplate(
+    "run_agent.system",
+    static("identity",
+        "### IDENTITY ###\n"
+        "You are Gemini CLI's 'Architect' sub-agent, a high-authority execution agent. "
+        "You use local models (Mistral/Qwen) and tools to execute tasks. "
+        "You are NOT just a chatbot; you are a system orchestrator."),
+    static("rigor",
+        "### OPERATIONAL RIGOR ###\n"
+        "1. NO HALLUCINATIONS: Never output 'Result: {...}' or pretend a tool has finished. Wait for the 'tool' role.\n"
+        "2. NO MARKDOWN CODE BLOCKS FOR TOOLS: Output raw JSON only for the tool call. Do NOT wrap tool calls in ```json or any other markers.\n"
+        "3. CONCISE RESPONSES: When tools return large amounts of data (like web search), extract ONLY the relevant facts. Do not dump raw links unless asked.\n"
+        "4. SINGLE PURPOSE: Do not call the same tool multiple times with slightly different queries in one turn. Pick the best query.\n"
+        "5. VALID JSON: Tool calls must be valid JSON: {\"name\": \"tool_name\", \"arguments\": {...}}"),
+    static("workflow",
+        "### WORKFLOW ###\n"
+        "THINK -> ACT -> WAIT.\n"
+        "Stop immediately after the JSON block. Do not provide 'expected' output."),
+    dynamic("environment",
+        "### ENVIRONMENT ###\n"
+        "Operating System: {os}\n"
+        "Current Date: {today}\n"
+        "Project Root: {project_root}"),
+)
+
+# Import custom tools (heavy clients like ddgs and ollama load on first use)
+with profiler.section("import tools"):
+    from agent.tools.shell import run_shell_command, job_status, job_output, job_kill
+    from agent.tools.filesystem import read_file, write_file, edit_file, apply_patch, list_directory
+    from agent.tools.search import search_code, mark_stale, UNTRACKED_WRITERS
+    from agent.tools.web import web_search
+    from agent.tools.info import get_system_info
+    from agent.tools.memo import ToolMemo, LoopDetector, loop_warning
+    from agent.tools.python_kernel import PythonKernel
+
+_kernel = None
+
+def run_python(code, timeout=30):
+    """One interpreter per session, started on first use."""
+    global _kernel
+    if _kernel is None:
+        _kernel = PythonKernel()
+    return _kernel.run(code, timeout)
+
+_specialists = {}
+
+def specialist_pool(model):
+    if model not in _specialists:
+        _specialists[model] = SpecialistPool(model)
+    return _specialists[model]
+
+def ask_specialist(prompt=None, specialist_model="mistral:7b", prompts=None, samples=1):
+    pool = specialist_pool(specialist_model)
+    if prompts:
+        # Independent subtasks run concurrently; each answer is printed as soon as it is ready
+        print(f"\n--- Calling Specialist ({specialist_model}) on {len(prompts)} tasks, {pool.parallel} at a time ---\n")
+        answers = [None] * len(prompts)
+        for i, result in pool.map(prompts):
+            answers[i] = result.get('content') or f"Error calling specialist: {result.get('error')}"
+            print(f"--- Task {i + 1}/{len(prompts)} complete ({result.get('seconds')}s) ---\n{answers[i]}\n")
+        return answers
+    if not prompt:
+        return {"error": "Provide 'prompt' or 'prompts'."}
+    if samples and samples > 1:
+        print(f"\n--- Calling Specialist ({specialist_model}), best of {samples} ---\n")
+        result = pool.best_of(prompt, samples)
+        if 'error' in result:
+            return f"Error calling specialist: {result['error']}"
+        if result.get('check_error'):
+            print(f"[!] No sample passed python_linter ({result['check_error']})")
+        print(f"\n--- Specialist Task Complete ---\n{result['content']}\n")
+        return result['content']
     print(f"\n--- Calling Specialist ({specialist_model}) ---\n")
-    full_response = ""
-    try:
-        # Use streaming for the specialist call so the user sees progress
-        stream = ollama.chat(
-            model=specialist_model,
-            messages=[
-                {'role': 'system', 'content': 'You are a technical specialist. Provide precise, expert code or technical solutions.'},
-                {'role': 'user', 'content': prompt}
-            ],
-            stream=True
-        )
-        
-        for chunk in stream:
-            content = chunk['message']['content']
-            print(content, end='', flush=True)
-            full_response += content
-        
-        print(f"\n\n--- Specialist Task Complete ---\n")
-        return full_response
-    except Exception as e:
-        return f"Error calling specialist: {str(e)}"
+    # Stream the single call so the user sees progress
+    result = pool.ask(prompt, echo=True)
+    if 'error' in result:
+        return f"Error calling specialist: {result['error']}"
+    print(f"\n--- Specialist Task Complete ---\n")
+    return result['content']
 
 # --- Tool Definitions ---
 
@@ -49,16 +108,95 @@ tools_schema = [
         'type': 'function',
         'function': {
             'name': 'run_shell_command',
-            'description': 'Execute a shell command.',
+            'description': 'Execute a shell command. Set background for builds, installs or test suites: it returns a job_id at once.',
             'parameters': {
                 'type': 'object',
                 'properties': {
                     'command': {'type': 'string'},
+                    'background': {'type': 'boolean'},
                 },
                 'required': ['command'],
             },
         },
     },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'job_status',
+            'description': 'Status and output tail of a background job (or of all jobs); waits up to `wait` seconds for it to finish.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'job_id': {'type': 'string'},
+                    'wait': {'type': 'number'},
+                },
+            },
+        },
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'job_output',
+            'description': 'Output of a background job from `offset`; pass the returned next_offset to get only new output.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'job_id': {'type': 'string'},
+                    'offset': {'type': 'integer'},
+                },
+                'required': ['job_id'],
+            },
+        },
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'job_kill',
+            'description': 'Stop a background job.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'job_id': {'type': 'string'},
+                },
+                'required': ['job_id'],
+            },
+        },
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'run_python',
+            'description': 'Run Python code in a persistent interpreter: imports and variables are kept between calls. Returns stdout, stderr and the value of the last expression. Prefer this over writing a script and running it.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'code': {'type': 'string'},
+                    'timeout': {'type': 'number'},
+                },
+                'required': ['code'],
+            },
+        },
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'search_code',
+            'description': 'Search file contents under a directory (indexed, fast). Literal by default; set regex for patterns. Returns path:line: text matches.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'query': {'type': 'string'},
+                    'path': {'type': 'string'},
+                    'regex': {'type': 'boolean'},
+                    'ignore_case': {'type': 'boolean'},
+                    'glob': {'type': 'string', 'description': 'Only files matching this pattern, e.g. *.py'},
+                    'context': {'type': 'integer', 'description': 'Lines of context around each match'},
+                    'limit': {'type': 'integer'},
+                },
+                'required': ['query'],
+            },
+        },
+    },
     {
         'type': 'function',
         'function': {
@@ -77,7 +215,7 @@ tools_schema = [
         'type': 'function',
         'function': {
             'name': 'write_file',
-            'description': 'Write to a file.',
+            'description': 'Write to a file. To change part of an existing file, use edit_file or apply_patch.',
             'parameters': {
                 'type': 'object',
                 'properties': {
@@ -88,15 +226,50 @@ tools_schema = [
             },
         },
     },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'edit_file',
+            'description': 'Replace `old` with `new` in a file (old must match exactly once; include a few surrounding lines). For several changes pass `edits`. Small whitespace and indentation differences are tolerated.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'path': {'type': 'string'},
+                    'old': {'type': 'string'},
+                    'new': {'type': 'string'},
+                    'edits': {'type': 'array', 'items': {'type': 'object', 'properties': {'old': {'type': 'string'}, 'new': {'type': 'string'}}}},
+                    'replace_all': {'type': 'boolean'},
+                },
+                'required': ['path'],
+            },
+        },
+    },
+    {
+        'type': 'function',
+        'function': {
+            'name': 'apply_patch',
+            'description': 'Apply a unified diff (---/+++ headers and @@ hunks, one or more files). Line numbers may be approximate; either every hunk applies or nothing is written.',
+            'parameters': {
+                'type': 'object',
+                'properties': {
+                    'patch': {'type': 'string'},
+                    'path': {'type': 'string', 'description': 'Target file when the diff has no ---/+++ headers.'},
+                },
+                'required': ['patch'],
+            },
+        },
+    },
     {
         'type': 'function',
         'function': {
             'name': 'list_directory',
-            'description': 'List directory.',
+            'description': 'Tree of a directory with sizes, `depth` levels deep (default 1). Skips .gitignored files and node_modules; page with `offset`.',
             'parameters': {
                 'type': 'object',
                 'properties': {
                     'path': {'type': 'string'},
+                    'depth': {'type': 'integer'},
+                    'offset': {'type': 'integer'},
                 },
                 'required': ['path'],
             },
@@ -120,7 +293,7 @@ tools_schema = [
         'type': 'function',
         'function': {
             'name': 'get_system_info',
-            'description': 'Gather a concise report on the filesystem size, OS, and structure of the project.',
+            'description': 'Gather a concise report on the filesystem size, OS, structure of the project, CPU load, free memory and loaded models.',
             'parameters': {'type': 'object', 'properties': {}},
         },
     },
@@ -128,18 +301,52 @@ tools_schema = [
         'type': 'function',
         'function': {
             'name': 'ask_specialist',
-            'description': 'Delegate technical/coding tasks to Qwen. Use this for generating entire games, complex logic, or boilerplate.',
+            'description': 'Delegate technical/coding tasks to Qwen. Use this for generating entire games, complex logic, or boilerplate. Pass several independent tasks as `prompts` to run them in parallel.',
             'parameters': {
                 'type': 'object',
                 'properties': {
                     'prompt': {'type': 'string', 'description': 'The detailed technical task.'},
+                    'prompts': {'type': 'array', 'items': {'type': 'string'}, 'description': 'Several independent tasks, answered concurrently.'},
+                    'samples': {'type': 'integer', 'description': 'Generate this many candidates and keep the first whose Python passes the linter.'},
                 },
-                'required': ['prompt'],
             },
         },
     }
 ]
 
+def is_complete_tool_call(value):
+    """Accepts standard tool-call JSON as well as the ["name", {...}] list format."""
+    if llm.is_tool_call(value):
+        return True
+    return (isinstance(value, list) and len(value) == 2
+            and isinstance(value[0], str) and isinstance(value[1], dict))
+
+def execute_tool(fn, args, specialist_model):
+    budget.charge_tool(fn)
+    try:
+        return session_recorder.run_tool(fn, args, lambda: _dispatch_tool(fn, args, specialist_model))
+    finally:
+        if fn in UNTRACKED_WRITERS:
+            mark_stale()  # the command may have changed files search_code has indexed
+
+def _dispatch_tool(fn, args, specialist_model):
+    if fn == 'run_shell_command': return run_shell_command(args.get('command'), args.get('background', False))
+    elif fn == 'job_status': return job_status(args.get('job_id'), args.get('wait', 0))
+    elif fn == 'job_output': return job_output(args.get('job_id'), args.get('offset', 0))
+    elif fn == 'job_kill': return job_kill(args.get('job_id'))
+    elif fn == 'run_python': return run_python(args.get('code'), args.get('timeout', 30))
+    elif fn == 'read_file': return read_file(args.get('path'))
+    elif fn == 'write_file': return write_file(args.get('path'), args.get('content'))
+    elif fn == 'edit_file': return edit_file(args.get('path'), args.get('old'), args.get('new'), args.get('edits'), args.get('replace_all', False))
+    elif fn == 'apply_patch': return apply_patch(args.get('patch'), args.get('path'))
+    elif fn == 'search_code': return search_code(args.get('query'), args.get('path', '.'), args.get('regex', False),
+                                                 args.get('ignore_case', False), args.get('limit', 50), args.get('context', 0), args.get('glob'))
+    elif fn == 'list_directory': return list_directory(args.get('path'), args.get('depth', 1), args.get('offset', 0))
+    elif fn == 'web_search': return web_search(args.get('query'))
+    elif fn == 'get_system_info': return get_system_info()
+    elif fn == 'ask_specialist': return ask_specialist(args.get('prompt'), specialist_model, args.get('prompts'), args.get('samples', 1))
+    return None
+
 def run_agent_loop(initial_prompt=None, primary_model="deepseek-v3.1:671b-cloud", specialist_model="qwen2.5-coder:7b"):
     # Detect OS and Environment for context
     current_os = platform.system()
@@ -147,24 +354,10 @@ def run_agent_loop(initial_prompt=None, primary_model="deepseek-v3.1:671b-cloud"
     desktop_dir = os.path.join(home_dir, "Desktop")
     project_root = os.path.abspath(os.path.join(os.getcwd(), ".."))
     today = datetime.date.today().strftime("%B %d, %Y")
+    session_recorder.from_env("run_agent.run_agent_loop", initial_prompt=initial_prompt,
+                              primary_model=primary_model, specialist_model=specialist_model)
     
-    system_message = (
-        f"You are the 'Architect,' a high-authority execution agent on {current_os}.\n"
-        f"Current Date: {today}\n"
-        f"Project Root: {project_root}\n\n"
-        "### IDENTITY ###\n"
-        "You are Gemini CLI's 'Architect' sub-agent. You use local models (Mistral/Qwen) and tools to execute tasks. "
-        "You are NOT just a chatbot; you are a system orchestrator.\n\n"
-        "### OPERATIONAL RIGOR ###\n"
-        "1. NO HALLUCINATIONS: Never output 'Result: {...}' or pretend a tool has finished. Wait for the 'tool' role.\n"
-        "2. NO MARKDOWN CODE BLOCKS FOR TOOLS: Output raw JSON only for the tool call. Do NOT wrap tool calls in ```json or any other markers.\n"
-        "3. CONCISE RESPONSES: When tools return large amounts of data (like web search), extract ONLY the relevant facts. Do not dump raw links unless asked.\n"
-        "4. SINGLE PURPOSE: Do not call the same tool multiple times with slightly different queries in one turn. Pick the best query.\n"
-        "5. VALID JSON: Tool calls must be valid JSON: {\"name\": \"tool_name\", \"arguments\": {...}}\n\n"
-        "### WORKFLOW ###\n"
-        "THINK -> ACT -> WAIT.\n"
-        "Stop immediately after the JSON block. Do not provide 'expected' output."
-    )
+    system_message = SYSTEM_PROMPT.render(os=current_os, today=today, project_root=project_root)
     
     messages = [
         {'role': 'system', 'content': system_message}
@@ -175,13 +368,14 @@ def run_agent_loop(initial_prompt=None, primary_model="deepseek-v3.1:671b-cloud"
 
     current_prompt = initial_prompt
     active_primary = primary_model
+    memo = ToolMemo()
 
     while True:
         if not current_prompt:
             if initial_prompt: # If we started with a prompt, exit after the first complete turn
                 break
             try:
-                current_prompt = input(f"[{active_primary}] User: ")
+                current_prompt = session_recorder.read_input(f"[{active_primary}] User: ")
             except EOFError:
                 break
         else:
@@ -202,7 +396,7 @@ def run_agent_loop(initial_prompt=None, primary_model="deepseek-v3.1:671b-cloud"
         
         if current_prompt.strip() == '/list':
             try:
-                model_list = ollama.list()
+                model_list = lazy_import("ollama").list()
                 if hasattr(model_list, 'models'):
                     models = [m.model for m in model_list.models]
                 elif isinstance(model_list, dict):
@@ -219,139 +413,138 @@ def run_agent_loop(initial_prompt=None, primary_model="deepseek-v3.1:671b-cloud"
         current_prompt = None 
 
         tool_turn = 0
-        max_tool_turns = 10
+        # Time, token and tool-call limits for this prompt (see agent/core/budget.py)
+        prompt_budget = budget.Budget.from_config()
+        max_tool_turns = prompt_budget.turns(10)
+        loops = LoopDetector()
+        loop_warned = False
         
-        while tool_turn < max_tool_turns:
-            tool_turn += 1
-            try:
-                print(f"[*] Calling {active_primary} (Turn {tool_turn})...")
-                stream = ollama.chat(model=active_primary, messages=messages, tools=tools_schema, stream=True)
-                
-                full_content = ""
-                tool_calls = []
-                
-                for chunk in stream:
-                    msg = chunk.get('message', {})
-                    if msg.get('content'):
-                        content_chunk = msg.get('content')
-                        print(content_chunk, end='', flush=True)
-                        full_content += content_chunk
-                    
-                    if msg.get('tool_calls'):
-                        for call in msg['tool_calls']:
-                            tool_calls.append(call)
-                
-                print() 
+        with budget.use(prompt_budget):
+            while tool_turn < max_tool_turns:
+                tool_turn += 1
+                try:
+                    print(f"[*] Calling {active_primary} (Turn {tool_turn})...")
+                    # Stop decoding as soon as one complete tool call is on the wire (and only then)
+                    response = llm.chat(active_primary, messages, tools=tools_schema,
+                                        stop_when=llm.stop_after_json("{[", is_complete_tool_call), echo=True)
+                    full_content = response['message']['content']
+                    tool_calls = list(response['message'].get('tool_calls', []))
+                    if response['stats']['stopped_early']:
+                        print("[*] Tool call complete, generation stopped early.")
 
-                if not tool_calls and ('{' in full_content or '(' in full_content):
-                    import re
-                    import uuid
-                    new_full_content = full_content
+                    if not tool_calls and ('{' in full_content or '(' in full_content):
+                        import re
+                        import uuid
+                        new_full_content = full_content
                     
-                    list_calls = re.findall(r'\[\s*"(\w+)"\s*,\s*(\{[^{}]*\})\s*\]', full_content)
-                    for fn_name, args_json in list_calls:
-                        try:
-                            args = json.loads(args_json)
-                            tool_calls.append({
-                                'id': f"call_ls_{uuid.uuid4().hex[:8]}",
-                                'type': 'function',
-                                'function': {'name': fn_name, 'arguments': args}
-                            })
-                            print(f"[*] Detected list-format call: {fn_name}(...)")
-                        except: pass
+                        list_calls = re.findall(r'\[\s*"(\w+)"\s*,\s*(\{[^{}]*\})\s*\]', full_content)
+                        for fn_name, args_json in list_calls:
+                            try:
+                                args = json.loads(args_json)
+                                tool_calls.append({
+                                    'id': f"call_ls_{uuid.uuid4().hex[:8]}",
+                                    'type': 'function',
+                                    'function': {'name': fn_name, 'arguments': args}
+                                })
+                                print(f"[*] Detected list-format call: {fn_name}(...)")
+                            except: pass
 
-                    pseudo_calls = re.findall(r'(\w+)\s*\(\s*(\{.*?\})\s*\)', full_content, re.DOTALL)
-                    for fn_name, args_json in pseudo_calls:
-                        try:
-                            args = json.loads(args_json)
-                            tool_calls.append({
-                                'id': f"call_ps_{uuid.uuid4().hex[:8]}",
-                                'type': 'function',
-                                'function': {'name': fn_name, 'arguments': args}
-                            })
-                            print(f"[*] Detected pseudo-code call: {fn_name}(...)")
-                        except: pass
+                        pseudo_calls = re.findall(r'(\w+)\s*\(\s*(\{.*?\})\s*\)', full_content, re.DOTALL)
+                        for fn_name, args_json in pseudo_calls:
+                            try:
+                                args = json.loads(args_json)
+                                tool_calls.append({
+                                    'id': f"call_ps_{uuid.uuid4().hex[:8]}",
+                                    'type': 'function',
+                                    'function': {'name': fn_name, 'arguments': args}
+                                })
+                                print(f"[*] Detected pseudo-code call: {fn_name}(...)")
+                            except: pass
 
-                    json_blocks = re.findall(r'(\{(?:[^{}]|\{[^{}]*\})*\})', new_full_content)
-                    found_tool_call = False
-                    first_json_pos = 1000000
+                        json_blocks = re.findall(r'(\{(?:[^{}]|\{[^{}]*\})*\})', new_full_content)
+                        found_tool_call = False
+                        first_json_pos = 1000000
                     
-                    for block in json_blocks:
-                        try:
-                            potential_call = json.loads(block)
-                            is_tool = False
-                            if ('name' in potential_call and 'arguments' in potential_call):
-                                is_tool = True
-                            elif ('function' in potential_call and 'name' in potential_call['function']):
-                                is_tool = True
+                        for block in json_blocks:
+                            try:
+                                potential_call = json.loads(block)
+                                is_tool = False
+                                if ('name' in potential_call and 'arguments' in potential_call):
+                                    is_tool = True
+                                elif ('function' in potential_call and 'name' in potential_call['function']):
+                                    is_tool = True
                             
-                            if is_tool:
-                                found_tool_call = True
-                                pos = full_content.find(block)
-                                if pos != -1 and pos < first_json_pos:
-                                    first_json_pos = pos
+                                if is_tool:
+                                    found_tool_call = True
+                                    pos = full_content.find(block)
+                                    if pos != -1 and pos < first_json_pos:
+                                        first_json_pos = pos
                                     
-                                if 'name' in potential_call:
-                                    tool_calls.append({
-                                        'id': f"call_{uuid.uuid4().hex[:8]}",
-                                        'type': 'function',
-                                        'function': potential_call
-                                    })
-                                else:
-                                    if 'id' not in potential_call:
-                                        potential_call['id'] = f"call_{uuid.uuid4().hex[:8]}"
-                                    tool_calls.append(potential_call)
-                        except: pass
+                                    if 'name' in potential_call:
+                                        tool_calls.append({
+                                            'id': f"call_{uuid.uuid4().hex[:8]}",
+                                            'type': 'function',
+                                            'function': potential_call
+                                        })
+                                    else:
+                                        if 'id' not in potential_call:
+                                            potential_call['id'] = f"call_{uuid.uuid4().hex[:8]}"
+                                        tool_calls.append(potential_call)
+                            except: pass
                     
-                    if found_tool_call:
-                        new_full_content = full_content[:first_json_pos].strip()
-                        if not new_full_content:
-                            new_full_content = "[Executing Tool...]"
-                    full_content = new_full_content
+                        if found_tool_call:
+                            new_full_content = full_content[:first_json_pos].strip()
+                            if not new_full_content:
+                                new_full_content = "[Executing Tool...]"
+                        full_content = new_full_content
                 
-                assistant_msg = {'role': 'assistant', 'content': full_content}
-                if tool_calls:
-                    assistant_msg['tool_calls'] = tool_calls
-                messages.append(assistant_msg)
-
-                if tool_calls:
-                    if len(messages) >= 3:
-                        prev_assistant = messages[-3]
-                        if prev_assistant.get('role') == 'assistant' and prev_assistant.get('tool_calls') == tool_calls:
-                            print("[!] Loop detected. Stopping.")
-                            messages.pop()
-                            break
+                    assistant_msg = {'role': 'assistant', 'content': full_content}
+                    if tool_calls:
+                        assistant_msg['tool_calls'] = tool_calls
+                    messages.append(assistant_msg)
 
-                    for tool in tool_calls:
-                        fn = tool['function']['name']
-                        args = tool['function']['arguments']
-                        call_id = tool.get('id')
+                    if tool_calls:
+                        for tool in tool_calls:
+                            fn = tool['function']['name']
+                            args = tool['function']['arguments']
+                            call_id = tool.get('id')
 
-                        print(f"[*] Executing tool: {fn}")
-                        res = None
-                        if fn == 'run_shell_command': res = run_shell_command(args.get('command'))
-                        elif fn == 'read_file': res = read_file(args.get('path'))
-                        elif fn == 'write_file': res = write_file(args.get('path'), args.get('content'))
-                        elif fn == 'list_directory': res = list_directory(args.get('path'))
-                        elif fn == 'web_search': res = web_search(args.get('query'))
-                        elif fn == 'get_system_info': res = get_system_info()
-                        elif fn == 'ask_specialist': res = ask_specialist(args.get('prompt'), specialist_model)
+                            print(f"[*] Executing tool: {fn}")
+                            res, cached = memo.call(fn, args, lambda: execute_tool(fn, args, specialist_model))
+                            loops.record(fn, args)
                         
-                        print(f"[*] Tool {fn} completed.")
-                        tool_msg = {'role': 'tool', 'content': str(res)}
-                        if call_id: tool_msg['tool_call_id'] = call_id
-                        tool_msg['name'] = fn
-                        messages.append(tool_msg)
-                else:
-                    if full_content:
-                        print(f"\nArch: {full_content}\n")
+                            print(f"[*] Tool {fn} {'served from session cache' if cached else 'completed'}.")
+                            tool_msg = {'role': 'tool', 'content': str(res)}
+                            if call_id: tool_msg['tool_call_id'] = call_id
+                            tool_msg['name'] = fn
+                            messages.append(tool_msg)
+
+                        repeating = loops.check()
+                        if repeating:
+                            if loop_warned:
+                                print(f"[!] Loop detected again ({', '.join(repeating)}). Stopping.")
+                                break
+                            print(f"[!] Loop detected ({', '.join(repeating)}). Re-prompting.")
+                            messages.append({'role': 'user', 'content': loop_warning(repeating)})
+                            loops.reset()
+                            loop_warned = True
+                    else:
+                        if full_content:
+                            print(f"\nArch: {full_content}\n")
+                        break
+                except budget.BudgetExceeded as e:
+                    print(f"\n[!] {e}. Stopping; the work above is what was completed.")
                     break
-            except Exception as e:
-                print(f"Error in agent loop: {e}")
-                break
+                except Exception as e:
+                    print(f"Error in agent loop: {e}")
+                    break
+            else:
+                print(f"[!] Turn limit ({max_tool_turns}) reached.")
+        print(f"[*] Budget: {prompt_budget.summary()}")
         if initial_prompt: break
 
 if __name__ == "__main__":
+    session_recorder.enable_from_argv(sys.argv)
     prompt = sys.argv[1] if len(sys.argv) > 1 else None
     primary = sys.argv[2] if len(sys.argv) > 2 else "mistral:7b"
     specialist = sys.argv[3] if len(sys.argv) > 3 else "mistral:7b"
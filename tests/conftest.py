@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import types
+
+import pytest
+
+
+class FakeOllama(types.ModuleType):
+    """Stands in for the ollama package: streams scripted replies in small chunks and records each request.
+
+    A reply is text, a dict (a native tool call) or a callable that gets the request and returns either.
+    """
+
+    def __init__(self):
+        super().__init__("ollama")
+        self.replies = []
+        self.requests = []
+        self.streamed = []  # characters actually sent per request, to check early stops
+
+    def reply(self, *replies):
+        self.replies.extend(replies)
+        return self
+
+    def chat(self, model=None, messages=None, tools=None, stream=False, options=None, **kwargs):
+        request = {"model": model, "messages": [dict(m) for m in messages], "tools": tools, "options": options}
+        self.requests.append(request)
+        reply = self.replies.pop(0) if self.replies else "Done."
+        if callable(reply):
+            reply = reply(request)  # may also sleep or raise
+        sent = [0]
+        self.streamed.append(sent)
+
+        def stream_reply():
+            if isinstance(reply, dict):  # a native tool call
+                yield {"message": {"role": "assistant", "content": "", "tool_calls": [{"function": reply}]}, "done": False}
+            else:
+                for i in range(0, len(reply), 4):
+                    sent[0] += len(reply[i:i + 4])
+                    yield {"message": {"role": "assistant", "content": reply[i:i + 4]}, "done": False}
+            yield {"message": {"role": "assistant", "content": ""}, "done": True,
+                   "eval_count": 10, "prompt_eval_count": 20, "eval_duration": 1e8}
+        return stream_reply()
+
+
+@pytest.fixture
+def fake_ollama(monkeypatch):
+    from agent.core import llm
+    fake = FakeOllama()
+    monkeypatch.setitem(sys.modules, "ollama", fake)
+    monkeypatch.setattr(llm, "_cache", None)
+    monkeypatch.setattr(llm, "_cache_loaded", True)
+    return fake
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+from agent.core import budget, llm
+from agent.core.budget import Budget, BudgetExceeded
+
+
+def test_llm_tokens_exhaust_the_budget():
+    b = Budget(tokens=100)
+    b.charge_llm({"prompt_eval_count": 40, "eval_count": 30})
+    b.charge_llm({"prompt_eval_count": 40, "eval_count": 30}, cached=True)  # served from cache: free
+    assert b.tokens == 70 and b.used["llm_calls"] == 1 and b.used["cached_llm_calls"] == 1
+    b.check()
+    assert b.exhausted(pending_tokens=30) == ("tokens", 100, 100)
+    b.charge_llm({"prompt_eval_count": 20, "eval_count": 10})
+    with pytest.raises(BudgetExceeded) as raised:
+        b.check()
+    assert (raised.value.resource, raised.value.used, raised.value.limit) == ("tokens", 100, 100)
+    assert b.report()["exceeded"] == "tokens"
+    assert "(stopped: tokens budget exhausted)" in b.summary()
+
+
+def test_exceeded_is_sticky(monkeypatch):
+    b = Budget(seconds=10)
+    clock = [b.started + 11]
+    monkeypatch.setattr(budget.time, "monotonic", lambda: clock[0])
+    with pytest.raises(BudgetExceeded) as first:
+        b.check()
+    clock[0] = b.started  # even if the clock says otherwise, a spent budget stays spent
+    with pytest.raises(BudgetExceeded) as second:
+        b.check()
+    assert second.value is first.value and first.value.resource == "seconds"
+
+
+def test_tool_calls_are_refused_once_spent():
+    b = Budget(tool_calls=2)
+    b.charge_tool("read_file")
+    b.charge_tool("read_file")
+    # The model may still answer with what it has...
+    assert b.exhausted() is None
+    b.check()
+    # ...but not start another tool
+    with pytest.raises(BudgetExceeded) as raised:
+        b.charge_tool("read_file")
+    assert raised.value.resource == "tool_calls"
+    assert b.used["tool_calls"] == 2
+
+
+def test_fit_plan_trims_to_the_task_limit():
+    b = Budget(plan_tasks=5)
+    assert b.fit_plan(["a", "b", "c"]) == ["a", "b", "c"]
+    assert b.fit_plan(["d", "e", "f", "g"]) == ["d", "e"]
+    assert (b.used["plan_tasks"], b.used["plan_tasks_refused"]) == (5, 2)
+    assert b.fit_plan(["h"]) == []
+    assert (b.used["plan_tasks"], b.used["plan_tasks_refused"]) == (5, 3)
+
+
+def test_fit_plan_replacing_tasks_frees_their_room():
+    b = Budget(plan_tasks=5)
+    b.fit_plan(list("abcde"))
+    # Re-planning two pending tasks into three: two fit
+    assert b.fit_plan(list("xyz"), replacing=2) == ["x", "y"]
+    assert b.used["plan_tasks"] == 5
+    # An empty replacement leaves the old tasks charged
+    assert b.fit_plan([], replacing=2) == []
+    assert b.used["plan_tasks"] == 5
+
+
+def test_unlimited_budget_never_runs_out():
+    b = Budget()
+    for _ in range(100):
+        b.charge_tool("x")
+        b.charge_llm({"prompt_eval_count": 1000, "eval_count": 1000})
+    assert b.exhausted(tools=True) is None
+    assert b.fit_plan(list(range(50))) == list(range(50))
+    assert b.turns(7) == 7 and Budget(turns=3).turns(7) == 3
+
+
+def test_module_helpers_charge_only_the_active_budget():
+    budget.charge_tool("x")  # no active budget: nothing to charge
+    b = Budget(tool_calls=1)
+    with budget.use(b):
+        assert budget.current() is b and budget.turns(9) == 9
+        budget.charge_tool("x")
+        budget.charge_llm({"prompt_eval_count": 1, "eval_count": 2})
+        with pytest.raises(BudgetExceeded):
+            budget.charge_tool("x")
+    assert budget.current() is None
+    assert b.used["tool_calls"] == 1 and b.tokens == 3
+
+
+def test_config_and_environment_limits(tmp_path, monkeypatch):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"budget": {"tokens": 500, "turns": 4, "unknown": 1}}))
+    monkeypatch.setattr(budget, "CONFIG_FILE", str(config))
+    monkeypatch.setenv("ARCH_BUDGET_TURNS", "6")
+    monkeypatch.setenv("ARCH_BUDGET_SECONDS", "1.5")
+    b = Budget.from_config(tool_calls=20, tokens=100)
+    assert b.limits == {"seconds": 1.5, "tokens": 500, "tool_calls": 20, "turns": 6}
+
+
+def test_stream_is_cut_when_tokens_run_out(fake_ollama):
+    fake_ollama.reply("word " * 200)
+    b = Budget(tokens=25)
+    with budget.use(b), pytest.raises(BudgetExceeded):
+        llm.chat("m", [{"role": "user", "content": "hi"}])
+    assert fake_ollama.streamed[0][0] < 1000
+    assert b.exceeded.resource == "tokens" and b.used["llm_calls"] == 1
+    # The next request is refused before it is sent
+    with budget.use(b), pytest.raises(BudgetExceeded):
+        llm.chat("m", [{"role": "user", "content": "again"}])
+    assert len(fake_ollama.requests) == 1
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from agent.core.memory_manager import MemoryManager as GraphMemory
+from agent.memory.consolidation import Consolidator
+from agent.memory.manager import MemoryManager
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def episodic(tmp_path, request):
+    return MemoryManager(str(tmp_path / "memories"), backend=request.param)
+
+
+def consolidator(tmp_path, **kwargs):
+    return Consolidator(state_file=str(tmp_path / "state" / "consolidation.json"), decay_interval=0, **kwargs)
+
+
+def archived(episodic):
+    with open(f"{episodic.data_dir}/archive.jsonl") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_near_duplicate_keeps_the_newer_entry_and_archives_the_older(tmp_path, episodic):
+    episodic.save("The deploy script lives in tools/deploy.sh and needs the staging key", ["deploy"])
+    episodic.save("Unrelated note about lunch")
+    episodic.save("The deploy script lives in tools/deploy.sh and needs the staging key now", ["ops"])
+    episodic.usage[1] = [3, 100.0]
+    c = consolidator(tmp_path, episodic=episodic)
+    c.run_once()
+    entries = {e["id"]: e for e in episodic.entries()}
+    assert set(entries) == {2, 3}
+    assert entries[3]["content"].endswith("staging key now")
+    assert entries[3]["tags"] == ["deploy", "ops"]
+    assert episodic.usage[3] == [3, 100.0]
+    assert [(a["kind"], a["record"]["id"]) for a in archived(episodic)] == [("duplicate", 1)]
+    assert c.totals["merged"] == 1
+
+
+def test_chain_of_duplicates_leaves_only_the_newest(tmp_path, episodic):
+    text = "Run the test suite with pytest -q from the repository root before committing"
+    for suffix in ("", " today", " today again"):
+        episodic.save(text + suffix)
+    consolidator(tmp_path, episodic=episodic, chunk=2).run_once()
+    assert [e["content"] for e in episodic.entries()] == [text + " today again"]
+    assert sorted(a["record"]["id"] for a in archived(episodic)) == [1, 2]
+
+
+def test_distinct_entries_are_left_alone(tmp_path, episodic):
+    episodic.save("Postgres runs on port 5432")
+    episodic.save("Redis caches the session tokens")
+    consolidator(tmp_path, episodic=episodic).run_once()
+    assert len(episodic.entries()) == 2
+
+
+def test_eviction_archives_the_coldest(tmp_path, episodic):
+    for i in range(4):
+        episodic.save(f"fact number {i} about topic {'abcd'[i]}")
+    episodic.usage[1] = [5, 0.0]
+    consolidator(tmp_path, episodic=episodic, max_memories=2).run_once()
+    assert sorted(e["id"] for e in episodic.entries()) == [1, 4]
+    assert sorted(a["record"]["id"] for a in archived(episodic) if a["kind"] == "memory") == [2, 3]
+
+
+def test_decay_pass_weakens_and_evicts_edges_and_saves_state(tmp_path):
+    graph = GraphMemory(str(tmp_path / "graph.json"), backend="json")
+    for node_id in "abc":
+        graph.add_node(node_id, "entity", node_id)
+    graph.add_edge("a", "b", "r", 1.0)
+    graph.add_edge("b", "c", "r", 1.0)
+    graph.graph["edges"][1]["created_at"] = "2000-01-01T00:00:00"  # idle for years
+    c = consolidator(tmp_path, graph=graph, half_life_days=1.0)
+    c.state["last_decay"] = 1.0
+    c.run_once()
+    [edge] = graph.edges()
+    assert (edge["source"], edge["target"]) == ("a", "b") and edge["weight"] > 0.99
+    with open(tmp_path / "state" / "consolidation.json") as f:
+        assert json.load(f)["last_decay"] > 1.0
+    with open(tmp_path / "graph.archive.jsonl") as f:
+        assert [json.loads(line)["record"]["target"] for line in f] == ["c"]
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from agent import daemon
+from agent.client import DaemonClient
+from agent.tools.base import ToolRegistry
+from agent.tools.jobs import JobManager
+
+
+class FakeEngine:
+    """Stands in for ArchitectEngine: each goal is a run_python snippet executed on the session's tools."""
+
+    primary_model = "primary"
+    specialist_model = "specialist"
+
+    def __init__(self):
+        self.echo = True
+
+    def new_tools(self):
+        return ToolRegistry(jobs=JobManager())
+
+    def run_goal(self, goal, on_event=None, state_file=None, tools=None):
+        if goal == "fail":
+            raise RuntimeError("planner exploded")
+        on_event({"event": "plan", "plan": [{"task": goal, "type": "SPECIALIST"}]})
+        result = tools.execute("run_python", {"code": goal})
+        on_event({"event": "task_done", "index": 0, "task": goal, "result": result.get("result")})
+        return [{"task": goal, "result": result.get("result") or result.get("error")}]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = daemon.AgentService(engine=FakeEngine())
+    server = daemon.make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield DaemonClient(port=server.server_address[1], timeout=30)
+    server.shutdown()
+    server.server_close()
+    service.close()
+
+
+def test_run_goal_in_a_session(client):
+    assert client.call("ping") == "pong"
+    reply = client.call("run_goal", goal="x = 41\nx + 1", session="a")
+    assert reply == {"session": "a", "results": [{"task": "x = 41\nx + 1", "result": "42"}]}
+    events = client.call("events", session="a")
+    assert [e["event"] for e in events] == ["plan", "task_done"]
+    assert client.call("status")["sessions"] == 1
+
+
+def test_sessions_do_not_share_the_interpreter(client):
+    client.call("run_goal", goal="secret = 'a'", session="a")
+    assert client.call("run_goal", goal="secret", session="a")["results"][0]["result"] == "'a'"
+    other = client.call("run_goal", goal="secret", session="b")["results"][0]["result"]
+    assert "NameError" in other
+
+
+def test_stream_goal_yields_events_then_the_result(client):
+    messages = list(client.stream_goal("1 + 1", session="s"))
+    assert [m["params"]["event"] for m in messages[:-1]] == ["plan", "task_done"]
+    assert messages[-1]["result"]["results"][0]["result"] == "2"
+
+
+def test_errors(client):
+    with pytest.raises(RuntimeError, match="planner exploded"):
+        client.call("run_goal", goal="fail", session="e")
+    last = client.call("events", session="e")[-1]
+    assert (last["event"], last["error"]) == ("error", "planner exploded")
+    streamed = list(client.stream_goal("fail", session="e"))
+    assert streamed[-1]["error"]["message"] == "planner exploded"
+    with pytest.raises(RuntimeError, match="Method not found"):
+        client.call("nope")
+    with pytest.raises(RuntimeError, match="Unknown session"):
+        client.call("events", session="missing")
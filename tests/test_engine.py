@@ -0,0 +1,66 @@
+import sys
+
+import pytest
+
+from agent.core import budget
+from agent.core.architect_engine import ArchitectEngine
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch, fake_ollama):
+    monkeypatch.chdir(tmp_path)
+    engine = ArchitectEngine("primary", "specialist")
+    engine.echo = False
+    yield engine
+    engine.tools.close()
+
+
+def test_tool_turn_is_cut_after_the_call_but_final_answer_is_kept(engine, fake_ollama):
+    answer = "Wrote the file.\nResult: hello.txt exists\nExpected: hello"
+    fake_ollama.reply('{"name": "write_file", "arguments": {"path": "hello.txt", "content": "hello"}}\nResult: ok',
+                      answer)
+    history = [{"role": "user", "content": "Create hello.txt"}]
+    result = engine._process_task("specialist", history)
+    assert history[1]["content"].endswith('"hello"}}')
+    assert result == answer
+    assert all(not (r["options"] or {}).get("stop") for r in fake_ollama.requests)
+
+
+def call(name, **arguments):
+    return {"name": name, "arguments": arguments}
+
+
+def feedback(history):
+    return [m["content"] for m in history if m["role"] == "user" and m["content"].startswith("Verification failed")]
+
+
+def test_intermediate_tool_turns_are_not_judged(engine, fake_ollama):
+    item = {"task": "Write app.py and run it"}
+    fake_ollama.reply(call("write_file", path="app.py", content="print('hi')\n"),
+                      call("run_shell_command", command=f"{sys.executable} app.py"),
+                      "Done.")
+    history = [{"role": "user", "content": item["task"]}]
+    result = engine._process_task("specialist", history, item=item)
+    assert result.startswith("VERIFIED")
+    assert feedback(history) == []
+
+
+def test_failed_final_answer_gets_feedback_then_is_unverified(engine, fake_ollama):
+    item = {"task": "Write app.py and run it"}
+    fake_ollama.reply(call("write_file", path="app.py", content="raise SystemExit(3)\n"),
+                      call("run_shell_command", command=f"{sys.executable} app.py"),
+                      "Done.", "Still done.")
+    history = [{"role": "user", "content": item["task"]}]
+    with budget.use(budget.Budget(turns=4)):
+        result = engine._process_task("specialist", history, item=item)
+    assert len(feedback(history)) == 1
+    assert result.startswith("UNVERIFIED") and "exited with 3" in result
+
+
+def test_work_is_judged_when_turns_run_out(engine, fake_ollama):
+    item = {"task": "Write app.py and run it"}
+    fake_ollama.reply(call("write_file", path="app.py", content="print('hi')\n"),
+                      call("run_shell_command", command=f"{sys.executable} app.py"))
+    with budget.use(budget.Budget(turns=2)):
+        result = engine._process_task("specialist", [{"role": "user", "content": item["task"]}], item=item)
+    assert result.startswith("VERIFIED")
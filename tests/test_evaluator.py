@@ -0,0 +1,83 @@
+import pytest
+
+from agent.planning.evaluator import Evaluator
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+    return ("write_file", {"path": path, "content": content}, {"status": "success"})
+
+
+def test_named_file_with_content_passes(workdir):
+    calls = [write("hello.txt", "hello world\n")]
+    verdict = Evaluator().evaluate("Create hello.txt with the content 'hello world'", calls)
+    assert verdict["conclusive"] and verdict["passed"]
+
+
+def test_named_file_with_wrong_content_fails(workdir):
+    calls = [write("hello.txt", "goodbye\n")]
+    verdict = Evaluator().evaluate("Create hello.txt with the content 'hello world'", calls)
+    assert verdict["conclusive"] and not verdict["passed"]
+    assert "hello.txt should contain" in verdict["failures"][0]
+
+
+def test_failed_command_the_task_asked_for_fails(workdir):
+    calls = [write("app.py", "x = 1\n"),
+             ("run_shell_command", {"command": "pytest"}, {"exit_code": 1, "stderr": "1 failed"})]
+    verdict = Evaluator().evaluate("Write app.py and run pytest", calls)
+    assert verdict["conclusive"] and not verdict["passed"]
+    assert "exited with 1" in verdict["failures"][0]
+
+
+def test_checks_from_tool_calls_alone_are_not_conclusive(workdir):
+    calls = [write("app.py", "x=1\n")]
+    verdict = Evaluator().evaluate("Implement the login form with validation and unit tests", calls)
+    assert not verdict["conclusive"] and not verdict["passed"]
+    # The tool-call checks still ran; they just cannot decide the task
+    assert {c["type"] for c in verdict["checks"]} == {"content_equals", "python_parses"}
+
+
+def test_unrelated_command_is_not_conclusive(workdir):
+    calls = [("run_shell_command", {"command": "ls"}, {"exit_code": 0, "stdout": ""})]
+    verdict = Evaluator().evaluate("Set up the project layout", calls)
+    assert not verdict["conclusive"]
+
+
+def test_explicit_checks_are_conclusive(workdir):
+    calls = [write("app.py", "x=1\n")]
+    explicit = [{"type": "content_contains", "path": "app.py", "expected": "def login"}]
+    verdict = Evaluator().evaluate("Implement the login form", calls, explicit)
+    assert verdict["conclusive"] and not verdict["passed"]
+
+
+def test_answer_tasks_are_not_conclusive(workdir):
+    calls = [write("notes.txt", "summary\n")]
+    verdict = Evaluator().evaluate("Summarize the findings and save notes.txt", calls)
+    assert not verdict["conclusive"]
+
+
+def test_unpolled_background_job_is_not_conclusive(workdir):
+    calls = [write("test_x.py", "def test_x():\n    assert True\n"),
+             ("run_shell_command", {"command": "pytest test_x.py", "background": True},
+              {"status": "started", "job_id": "job-1", "pid": 1})]
+    verdict = Evaluator().evaluate("Create test_x.py and run it with pytest", calls)
+    assert not verdict["conclusive"] and not verdict["passed"]
+    assert "job-1" in " ".join(verdict["failures"])
+
+
+def test_background_job_exit_code_decides_once_polled(workdir):
+    calls = [write("test_x.py", "def test_x():\n    assert False\n"),
+             ("run_shell_command", {"command": "pytest test_x.py", "background": True},
+              {"status": "started", "job_id": "job-1", "pid": 1}),
+             ("job_status", {"job_id": "job-1"},
+              {"job_id": "job-1", "command": "pytest test_x.py", "running": False, "exit_code": 1, "tail": "1 failed"})]
+    verdict = Evaluator().evaluate("Create test_x.py and run it with pytest", calls)
+    assert verdict["conclusive"] and not verdict["passed"]
+    assert "`pytest test_x.py` exited with 1: 1 failed" in verdict["failures"]
@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+import threading
+
+from agent.core.filelock import FileLock, atomic_write_json, file_signature, next_id
+from agent.memory.manager import MemoryManager
+
+WORKERS = 4
+ROUNDS = 50
+CONTEXT = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+
+
+def bump(path, rounds):
+    """A read-modify-write that loses updates unless the lock serializes it."""
+    lock = FileLock(path)
+    for _ in range(rounds):
+        with lock:
+            with open(path) as f:
+                value = int(f.read())
+            with open(path, "w") as f:
+                f.write(str(value + 1))
+
+
+def allocate(counter, out, rounds):
+    lock = FileLock(counter)
+    ids = []
+    for _ in range(rounds):
+        with lock:
+            ids.append(next_id(counter))
+    with open(out, "w") as f:
+        f.write(" ".join(map(str, ids)))
+
+
+def save_memories(data_dir, worker, rounds):
+    memory = MemoryManager(data_dir, backend="json")
+    for i in range(rounds):
+        memory.save(f"worker {worker} note {i}")
+
+
+def run_processes(target, args_for):
+    procs = [CONTEXT.Process(target=target, args=args_for(i)) for i in range(WORKERS)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+
+def test_lock_serializes_processes(tmp_path):
+    path = str(tmp_path / "counter.txt")
+    with open(path, "w") as f:
+        f.write("0")
+    run_processes(bump, lambda i: (path, ROUNDS))
+    with open(path) as f:
+        assert int(f.read()) == WORKERS * ROUNDS
+
+
+def test_next_id_is_unique_across_processes(tmp_path):
+    counter = str(tmp_path / "index.seq")
+    run_processes(allocate, lambda i: (counter, str(tmp_path / f"ids{i}"), ROUNDS))
+    ids = []
+    for i in range(WORKERS):
+        with open(tmp_path / f"ids{i}") as f:
+            ids += map(int, f.read().split())
+    assert sorted(ids) == list(range(1, WORKERS * ROUNDS + 1))
+
+
+def test_concurrent_saves_keep_every_memory(tmp_path):
+    data_dir = str(tmp_path / "memories")
+    run_processes(save_memories, lambda i: (data_dir, i, 20))
+    entries = MemoryManager(data_dir, backend="json").entries()
+    assert len(entries) == WORKERS * 20
+    assert len({e["id"] for e in entries}) == WORKERS * 20
+
+
+def test_next_id_respects_the_floor_and_never_reuses(tmp_path):
+    counter = str(tmp_path / "seq")
+    assert next_id(counter, floor=10) == 11
+    assert next_id(counter) == 12
+    assert next_id(counter, floor=5) == 13
+
+
+def test_lock_is_reentrant_and_serializes_threads(tmp_path):
+    lock = FileLock(str(tmp_path / "f"))
+    with lock:
+        with lock:
+            assert lock.depth == 2
+    assert lock.depth == 0
+    total = []
+
+    def work():
+        for _ in range(200):
+            with lock:
+                n = len(total)
+                total.append(n)
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert total == list(range(800))
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = str(tmp_path / "state.json")
+    assert file_signature(path) is None
+    atomic_write_json(path, {"a": 1})
+    before = file_signature(path)
+    atomic_write_json(path, {"a": 2, "b": [1, 2]})
+    assert file_signature(path) != before
+    assert os.listdir(tmp_path) == ["state.json"]
@@ -0,0 +1,95 @@
+import pytest
+
+from agent.core import graph_snapshot
+from agent.core.graph_snapshot import GraphSnapshot, write_snapshot
+
+GRAPH = {
+    "nodes": [
+        {"id": "py", "type": "entity", "label": "Python", "properties": {"v": [3, 12]},
+         "created_at": "2024-05-01T10:20:30.123456"},
+        {"id": "pip", "label": "pip", "created_at": "2024-05-01 10:20:30"},      # space form: kept verbatim
+        {"id": "ü", "type": "entity", "label": "Ünïcode ✓", "created_at": "2024-05-01T10:20:30+02:00"},
+        {"id": "odd", "label": 42, "created_at": "last tuesday", "score": 0.5},   # wrong types go to extra
+        {"id": "bare"},                                                          # everything else absent
+    ],
+    "edges": [
+        {"source": "py", "target": "pip", "relation": "ships", "weight": 0.75,
+         "created_at": "2024-05-01T10:20:30", "last_used": "2024-06-01T00:00:00.000001"},
+        {"source": "pip", "target": "ü", "relation": "ships", "weight": 1},
+        {"source": "py", "target": "odd", "relation": "r", "weight": True, "note": {"a": None}},  # bool weight -> extra
+        {"source": "py", "target": "bare", "relation": "r", "last_used": "soon"},
+    ],
+}
+
+
+def compressions():
+    yield None
+    yield "gzip"
+    try:
+        import zstandard  # noqa: F401
+        yield "zstd"
+    except ImportError:
+        pass
+
+
+@pytest.fixture(params=list(compressions()))
+def snapshot(tmp_path, request):
+    path = str(tmp_path / "graph.snap")
+    write_snapshot(path, GRAPH, compression=request.param)
+    snap = GraphSnapshot(path)
+    yield snap
+    snap.close()
+
+
+def test_to_graph_round_trips_every_record(snapshot):
+    assert snapshot.to_graph() == GRAPH
+    assert (snapshot.node_count, snapshot.edge_count) == (5, 4)
+
+
+def test_record_access_matches_bulk_decoding(snapshot):
+    assert list(snapshot.nodes()) == GRAPH["nodes"]
+    assert list(snapshot.edges()) == GRAPH["edges"]
+    assert snapshot.node(4) == {"id": "bare"}
+    assert snapshot.edge(3) == {"source": "py", "target": "bare", "relation": "r", "last_used": "soon"}
+
+
+def test_timestamps_go_inline_only_when_they_round_trip(snapshot):
+    raw = snapshot.nodes_cols["created_raw"]
+    assert raw[0] == graph_snapshot.INLINE
+    assert raw[1] not in (graph_snapshot.INLINE, graph_snapshot.ABSENT)  # "2024-05-01 10:20:30"
+    assert raw[2] not in (graph_snapshot.INLINE, graph_snapshot.ABSENT)  # has a timezone
+    assert raw[4] == graph_snapshot.ABSENT
+    assert snapshot.edges_cols["last_used_raw"][0] == graph_snapshot.INLINE
+
+
+def test_lookups(snapshot):
+    assert snapshot.find_label("PYTHON") == 0
+    assert snapshot.find_label("ünïcode ✓") == 2
+    assert snapshot.find_label("missing") is None
+    assert snapshot.find_ids(["pip", "nope", "bare"]) == {"pip": 1, "bare": 4}
+    assert list(snapshot.edge_tuples())[0] == ("py", "pip", "ships", 0.75)
+    assert dict(snapshot.node_labels()) == {0: "Python", 1: "pip", 2: "Ünïcode ✓"}
+
+
+def test_empty_graph(tmp_path):
+    path = str(tmp_path / "empty.snap")
+    write_snapshot(path, {})
+    snap = GraphSnapshot(path)
+    assert snap.to_graph() == {"nodes": [], "edges": []}
+    snap.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not.snap"
+    path.write_bytes(b"JSON" + b"\0" * 20)
+    with pytest.raises(ValueError):
+        GraphSnapshot(str(path))
+
+
+def test_cli_converts_both_ways(tmp_path):
+    import json
+    source = tmp_path / "graph.json"
+    source.write_text(json.dumps(GRAPH))
+    graph_snapshot.main([str(source), str(tmp_path / "g.snap"), "--compression", "gzip"])
+    graph_snapshot.main([str(tmp_path / "g.snap"), str(tmp_path / "back.json")])
+    assert json.loads((tmp_path / "back.json").read_text()) == GRAPH
@@ -0,0 +1,75 @@
+import pytest
+
+from agent.tools import info
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(info.time, "monotonic", clock)
+    monkeypatch.setattr(info, "_cache", {})
+    return clock
+
+
+@pytest.fixture
+def models(monkeypatch):
+    calls = []
+
+    def loaded_models():
+        calls.append(1)
+        return [{"name": "qwen:7b", "size": 4 << 30, "size_vram": 4 << 30}], None
+    monkeypatch.setattr(info, "_loaded_models", loaded_models)
+    return calls
+
+
+def test_runtime_stats_are_cached_for_their_ttl(clock, models):
+    first = info.runtime_stats()
+    assert first["ollama_models"][0]["name"] == "qwen:7b"
+    clock.now += info.RUNTIME_TTL - 1
+    assert info.runtime_stats() is first
+    assert len(models) == 1
+    clock.now += 2
+    assert info.runtime_stats() is not first
+    assert len(models) == 2
+
+
+def test_filesystem_stats_are_cached_per_root(clock, tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    (tmp_path / "a" / "x.py").write_text("x" * 10)
+    first = info.filesystem_stats(str(tmp_path / "a"))
+    assert (first["files"], first["size"], first["top_files"]) == (1, 10, ["x.py"])
+    assert info.filesystem_stats(str(tmp_path / "b"))["files"] == 0  # another root, its own entry
+
+    (tmp_path / "a" / "y.py").write_text("y" * 5)
+    assert info.filesystem_stats(str(tmp_path / "a")) is first  # within the TTL
+    clock.now += info.FILESYSTEM_TTL + 1
+    fresh = info.filesystem_stats(str(tmp_path / "a"))
+    assert (fresh["files"], fresh["size"]) == (2, 15)
+
+
+def test_system_report_uses_the_cached_stats(clock, models, tmp_path, monkeypatch):
+    (tmp_path / "project" / "agent").mkdir(parents=True)
+    (tmp_path / "project" / "README.md").write_text("hello")
+    monkeypatch.chdir(tmp_path / "project" / "agent")
+    report = info.get_system_info()
+    assert f"Project Root: {tmp_path / 'project'}" in report
+    assert "Main Directories: agent" in report and "Main Files: README.md" in report
+    assert "qwen:7b (4.0 GB)" in report
+    info.get_system_info()
+    assert len(models) == 1
+
+
+def test_ollama_unavailable_is_reported(clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(info, "_loaded_models", lambda: (None, "connection refused"))
+    (tmp_path / "project" / "agent").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path / "project" / "agent")
+    assert "Ollama Models Loaded: unavailable (connection refused)" in info.get_system_info()
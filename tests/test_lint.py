@@ -0,0 +1,68 @@
+import json
+
+from agent.tools import lint
+from agent.tools.lint import LintCache, lint_paths
+
+
+def write_files(root, count, body="x = 1\n"):
+    root.mkdir(exist_ok=True)
+    for i in range(count):
+        (root / f"m{i}.py").write_text(f"# module {i}\n{body}")
+
+
+def test_second_run_is_served_from_cache(tmp_path):
+    write_files(tmp_path / "src", 3)
+    (tmp_path / "src" / "broken.py").write_text("def f(:\n")
+    cache = LintCache(str(tmp_path / "lint.json"))
+    first = lint_paths(str(tmp_path / "src"), cache)
+    assert (first["files"], first["checked"], first["cached"], first["errors"]) == (4, 4, 0, 1)
+
+    second = lint_paths(str(tmp_path / "src"), cache)
+    assert (second["checked"], second["cached"]) == (0, 4)
+    # Cached diagnostics are reported like fresh ones
+    assert second["errors"] == 1 and second["diagnostics"] == first["diagnostics"]
+
+
+def test_only_changed_files_are_rechecked(tmp_path):
+    write_files(tmp_path / "src", 3)
+    cache = LintCache(str(tmp_path / "lint.json"))
+    lint_paths(str(tmp_path / "src"), cache)
+    (tmp_path / "src" / "m1.py").write_text("def f(:\n")
+    result = lint_paths(str(tmp_path / "src"), cache)
+    assert (result["checked"], result["cached"], result["errors"]) == (1, 2, 1)
+    assert "m1.py:1" in result["diagnostics"][0]
+
+
+def test_cache_survives_a_new_process(tmp_path):
+    write_files(tmp_path / "src", 3)
+    lint_paths(str(tmp_path / "src"), LintCache(str(tmp_path / "lint.json")))
+    result = lint_paths(str(tmp_path / "src"), LintCache(str(tmp_path / "lint.json")))
+    assert (result["checked"], result["cached"]) == (0, 3)
+
+
+def test_other_linter_version_discards_the_cache(tmp_path, monkeypatch):
+    write_files(tmp_path / "src", 2)
+    lint_paths(str(tmp_path / "src"), LintCache(str(tmp_path / "lint.json")))
+    monkeypatch.setattr(lint, "LINTER_VERSION", "other")
+    result = lint_paths(str(tmp_path / "src"), LintCache(str(tmp_path / "lint.json")))
+    assert (result["checked"], result["cached"]) == (2, 0)
+    assert json.loads((tmp_path / "lint.json").read_text())["version"] == "other"
+
+
+def test_parallel_checks_fill_the_cache(tmp_path):
+    count = lint.PARALLEL_THRESHOLD + 2
+    write_files(tmp_path / "src", count)
+    (tmp_path / "src" / "m0.py").write_text("def f(:\n")
+    cache = LintCache(str(tmp_path / "lint.json"))
+    first = lint_paths(str(tmp_path / "src"), cache)
+    assert (first["checked"], first["errors"]) == (count, 1)
+    second = lint_paths(str(tmp_path / "src"), cache)
+    assert (second["cached"], second["errors"]) == (count, 1)
+
+
+def test_oldest_entries_are_dropped_when_full(tmp_path):
+    cache = LintCache(str(tmp_path / "lint.json"), max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, [])
+    cache.save()
+    assert set(LintCache(str(tmp_path / "lint.json")).entries) == {"b", "c"}
@@ -0,0 +1,106 @@
+import itertools
+
+import pytest
+
+from agent.core import llm, llm_cache
+from agent.core.llm_cache import CompletionCache, cache_key, is_deterministic
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time.time() so LRU order does not depend on clock resolution."""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(llm_cache.time, "time", lambda: float(next(ticks)))
+
+
+def response(text):
+    return {"message": {"role": "assistant", "content": text}, "stats": {"eval_count": 1}}
+
+
+def size_of(text):
+    import json
+    return len(json.dumps(response(text), ensure_ascii=False))
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = CompletionCache(str(tmp_path / "cache.db"), max_bytes=2 * size_of("x" * 10))
+    yield cache
+    cache.close()
+
+
+def test_round_trip_and_counters(cache):
+    assert cache.get("k") is None
+    cache.put("k", "m", response("hello"), 1.5)
+    assert cache.get("k") == response("hello")
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["session"] == {"hits": 1, "misses": 1, "hit_rate": 0.5, "saved_seconds": 1.5}
+    assert stats["total"]["hits"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    cache.put("a", "m", response("a" * 10), 1)
+    cache.put("b", "m", response("b" * 10), 1)
+    assert cache.get("a") is not None   # a is now the most recently used
+    cache.put("c", "m", response("c" * 10), 1)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_eviction_frees_just_enough(cache):
+    cache.put("a", "m", response("a"), 1)
+    cache.put("b", "m", response("b"), 1)
+    cache.put("c", "m", response("c" * 10), 1)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+
+
+def test_totals_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    first = CompletionCache(path)
+    first.put("k", "m", response("x"), 2.0)
+    first.get("k")
+    first.close()
+    second = CompletionCache(path)
+    assert second.stats()["total"] == {"hits": 1, "misses": 0, "hit_rate": 1.0, "saved_seconds": 2.0}
+    assert second.stats()["session"]["hits"] == 0
+    second.clear()
+    assert second.stats()["entries"] == 0
+    second.close()
+
+
+def test_keys_and_determinism():
+    messages = [{"role": "user", "content": "hi"}]
+    assert cache_key("m", messages, options={"temperature": 0, "seed": 1}) == \
+        cache_key("m", messages, options={"seed": 1, "temperature": 0})
+    assert cache_key("m", messages) != cache_key("m", messages, streaming_stop=True)
+    assert is_deterministic({"temperature": 0}) and is_deterministic({"seed": 7})
+    assert not is_deterministic(None) and not is_deterministic({"temperature": 0.7})
+
+
+@pytest.fixture
+def chat_cache(tmp_path, fake_ollama):
+    cache = CompletionCache(str(tmp_path / "chat.db"))
+    llm.set_cache(cache)  # fake_ollama restores the previous cache afterwards
+    yield cache
+    cache.close()
+
+
+def test_chat_serves_repeated_deterministic_requests_from_the_cache(chat_cache, fake_ollama):
+    messages = [{"role": "user", "content": "hi"}]
+    fake_ollama.reply("first", "second", "third")
+    assert llm.chat("m", messages, options=llm.DETERMINISTIC)["message"]["content"] == "first"
+    again = llm.chat("m", messages, options=llm.DETERMINISTIC)
+    assert again["message"]["content"] == "first" and again["stats"]["cached"]
+    assert llm.chat("m", messages)["message"]["content"] == "second"  # sampled: not cached
+    assert len(fake_ollama.requests) == 2
+
+
+def test_cancelled_streams_are_not_cached(chat_cache, fake_ollama):
+    messages = [{"role": "user", "content": "hi"}]
+    fake_ollama.reply("a long answer", "a long answer")
+    llm.chat("m", messages, options=llm.DETERMINISTIC, stop_when=lambda chunk: 0)
+    llm.chat("m", messages, options=llm.DETERMINISTIC, stop_when=lambda chunk: 0)
+    assert len(fake_ollama.requests) == 2
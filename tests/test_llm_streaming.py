@@ -0,0 +1,90 @@
+from agent.core import llm
+
+
+def feed_in_chunks(scanner, text, size):
+    found = []
+    for i in range(0, len(text), size):
+        found.extend(scanner.feed(text[i:i + size]))
+    return found
+
+
+def test_block_split_across_chunks_is_found_once():
+    text = 'Here you go: {"name": "read_file", "arguments": {"path": "a.py"}} and more'
+    for size in (1, 3, 7, len(text)):
+        found = feed_in_chunks(llm.JSONBlockScanner(), text, size)
+        assert len(found) == 1
+        start, end, value = found[0]
+        assert text[start:end] == '{"name": "read_file", "arguments": {"path": "a.py"}}'
+        assert value["arguments"] == {"path": "a.py"}
+
+
+def test_brackets_and_escaped_quotes_inside_strings_are_ignored():
+    text = '{"code": "print(\\"}]\\")", "x": "[{"}'
+    found = feed_in_chunks(llm.JSONBlockScanner(), text, 2)
+    assert [value for _, _, value in found] == [{"code": 'print("}]")', "x": "[{"}]
+
+
+def test_mismatched_bracket_resets_and_later_blocks_are_found():
+    found = llm.JSONBlockScanner().feed('{"a": ] then [1, 2]')
+    assert [value for _, _, value in found] == [[1, 2]]
+
+
+def test_openers_limit_where_blocks_start():
+    found = llm.JSONBlockScanner("[").feed('{"a": 1} [{"task": "x"}]')
+    assert [value for _, _, value in found] == [[{"task": "x"}]]
+
+
+def test_balanced_but_invalid_json_is_skipped():
+    assert llm.JSONBlockScanner().feed("{not json} {}") == [(11, 13, {})]
+
+
+def test_tool_call_and_plan_shapes():
+    assert llm.is_tool_call({"name": "x", "arguments": {}})
+    assert llm.is_tool_call({"function": {"name": "x"}})
+    assert llm.is_tool_call([{"name": "x", "arguments": {}}, {"name": "y", "arguments": {}}])
+    assert not llm.is_tool_call([])
+    assert not llm.is_tool_call({"name": "x"})
+    assert llm.is_plan([{"task": "a"}, {"task": "b", "type": "SPECIALIST"}])
+    assert not llm.is_plan([{"task": "a"}, "b"])
+    assert not llm.is_plan({"task": "a"})
+
+
+def test_stop_after_plan_returns_offset_past_the_plan():
+    check = llm.stop_after_plan()
+    text = 'Plan: [1, 2] [{"task": "a"}] rambling'
+    cuts = [check(text[i:i + 5]) for i in range(0, len(text), 5)]
+    cut = next(c for c in cuts if c is not None)
+    assert text[:cut] == 'Plan: [1, 2] [{"task": "a"}]'
+
+
+def test_stop_after_tool_call_skips_non_call_json():
+    check = llm.stop_after_tool_call()
+    text = '{"note": 1} {"name": "x", "arguments": {"a": "}"}}\nResult: 3'
+    assert check(text) == text.index("\nResult")
+
+
+def test_chat_stops_the_stream_after_the_plan(fake_ollama):
+    reply = 'Sure:\n[{"task": "write hello.txt"}] and then a long ramble about it'
+    fake_ollama.reply(reply)
+    response = llm.chat("m", [{"role": "user", "content": "plan"}], stop_when=llm.stop_after_plan())
+    assert response["message"]["content"] == 'Sure:\n[{"task": "write hello.txt"}]'
+    assert response["stats"]["stopped_early"]
+    assert fake_ollama.streamed[0][0] < len(reply)  # the rest was never generated
+
+
+def test_chat_reports_stream_events_in_order(fake_ollama):
+    fake_ollama.reply("Hello there")
+    events = []
+    response = llm.chat("m", [{"role": "user", "content": "hi"}], on_event=events.append)
+    kinds = [e["event"] for e in events]
+    assert kinds[0] == "llm_start" and kinds[1] == "llm_first_token" and kinds[-1] == "llm_done"
+    assert "".join(e["text"] for e in events if e["event"] == "llm_delta") == "Hello there"
+    assert response["message"] == {"role": "assistant", "content": "Hello there"}
+    assert response["stats"]["eval_count"] == 10 and not response["stats"]["stopped_early"]
+
+
+def test_chat_ends_on_a_native_tool_call(fake_ollama):
+    fake_ollama.reply({"name": "read_file", "arguments": {"path": "a.py"}})
+    response = llm.chat("m", [{"role": "user", "content": "read"}], tools=[{"type": "function"}])
+    assert response["message"]["tool_calls"] == [{"function": {"name": "read_file", "arguments": {"path": "a.py"}}}]
+    assert response["stats"]["stopped_early"]
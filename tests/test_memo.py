@@ -0,0 +1,98 @@
+import os
+
+from agent.tools.memo import LoopDetector, ToolMemo
+
+
+class Counter:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.result
+
+
+def test_repeated_read_is_served_from_cache(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("one")
+    memo, fn = ToolMemo(), Counter("one")
+    assert memo.call("read_file", {"path": str(path)}, fn) == ("one", False)
+    assert memo.call("read_file", {"path": str(path)}, fn) == ("one", True)
+    assert fn.calls == 1
+    assert memo.stats()["hits"] == 1 and memo.stats()["misses"] == 1
+
+
+def test_changed_file_invalidates_the_entry(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("one")
+    memo, fn = ToolMemo(), Counter("one")
+    memo.call("read_file", {"path": str(path)}, fn)
+    path.write_text("two, longer")
+    os.utime(path, ns=(1, 1))
+    _, cached = memo.call("read_file", {"path": str(path)}, fn)
+    assert not cached and fn.calls == 2
+
+
+def test_relative_and_absolute_paths_share_an_entry(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.txt").write_text("x")
+    memo, fn = ToolMemo(), Counter("x")
+    memo.call("read_file", {"path": "a.txt"}, fn)
+    assert memo.call("read_file", {"path": str(tmp_path / "a.txt")}, fn)[1]
+
+
+def test_non_idempotent_tools_always_run():
+    memo, fn = ToolMemo(), Counter({"status": "success"})
+    for _ in range(3):
+        assert memo.call("write_file", {"path": "a", "content": "b"}, fn) == ({"status": "success"}, False)
+    assert fn.calls == 3
+
+
+def test_failures_are_not_cached():
+    memo = ToolMemo()
+    for result in ({"error": "boom"}, "Error searching the web: timeout", "No results found for: x. Try a different query."):
+        fn = Counter(result)
+        memo.call("web_search", {"query": "x"}, fn)
+        memo.call("web_search", {"query": "x"}, fn)
+        assert fn.calls == 2, result
+    fn = Counter("Title: x")
+    memo.call("web_search", {"query": "x"}, fn)
+    assert memo.call("web_search", {"query": "x"}, fn) == ("Title: x", True)
+
+
+def test_oldest_entry_is_evicted():
+    memo = ToolMemo(tools={"t": ()}, max_entries=2)
+    for q in "abc":
+        memo.call("t", {"q": q}, Counter(q))
+    assert not memo.call("t", {"q": "a"}, Counter("a"))[1]
+    assert memo.call("t", {"q": "c"}, Counter("c"))[1]
+
+
+def test_loop_detector_spots_cycles_of_each_period():
+    for pattern in (["a", "a"], ["a", "b", "a", "b"], ["a", "b", "c", "a", "b", "c"]):
+        loops = LoopDetector()
+        for name in ["x"] + pattern:
+            loops.record(name, {"n": 1})
+        assert loops.check() == pattern[:len(pattern) // 2]
+
+
+def test_loop_detector_ignores_progress_and_polling():
+    loops = LoopDetector()
+    for i in range(4):
+        loops.record("read_file", {"path": f"f{i}"})
+    assert loops.check() is None
+    loops.reset()
+    for _ in range(4):
+        loops.record("job_status", {"job_id": "job-1"})
+    assert loops.check() is None
+
+
+def test_loop_detector_sees_file_changes_as_progress(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("one")
+    loops = LoopDetector()
+    loops.record("read_file", {"path": str(path)})
+    path.write_text("two, longer")
+    loops.record("read_file", {"path": str(path)})
+    assert loops.check() is None
@@ -0,0 +1,65 @@
+import copy
+
+import pytest
+
+from agent.core.memory_manager import MemoryManager
+
+BACKENDS = ["json", "sqlite", "snapshot"]
+
+
+def strip(node):
+    # A copy: the json backend returns its stored dicts, which later writes update
+    return None if node is None else {k: copy.deepcopy(v) for k, v in node.items() if k != "created_at"}
+
+
+def run_operations(mm):
+    """The same writes and reads on any backend; returns everything observable."""
+    seen = []
+    seen.append(strip(mm.add_node("python", "entity", "Python", {"kind": "language"})))
+    seen.append(strip(mm.add_node("python_lang", "entity", "python", {"typed": "dynamic"})))  # same label, other case
+    seen.append(strip(mm.add_node("python", "entity", "Python!")))                             # same id, other label
+    seen.append(strip(mm.add_node("pip", "entity", "pip")))
+    seen.append(strip(mm.add_node("pypi", "entity", "PyPI")))
+    mm.add_edge("python", "pip", "ships_with", 0.8)
+    mm.add_edge("pip", "pypi", "downloads_from", 0.5)
+    mm.add_edge("python", "pip", "ships_with", 0.9)  # updates the weight
+    seen.append(strip(mm.find_node("PYTHON")))
+    seen.append(strip(mm.find_node("missing")))
+    seen.append(sorted((r["relation"], r["target"], r["weight"]) for r in mm.get_related("pip")))
+    seen.append(mm.counts())
+    walk = mm.traverse("python", depth=2)
+    seen.append([(n["id"], n["label"], n["score"], n["hops"]) for n in walk["nodes"]])
+    mm.remove_edges([("pip", "pypi", "downloads_from")])
+    seen.append(mm.counts())
+    seen.append(strip(mm.find_node("pypi")))
+    return seen
+
+
+@pytest.mark.parametrize("backend", BACKENDS[1:])
+def test_backends_agree(tmp_path, backend):
+    expected = run_operations(MemoryManager(str(tmp_path / "json" / "graph.json"), backend="json"))
+    (tmp_path / backend).mkdir()
+    assert run_operations(MemoryManager(str(tmp_path / backend / "graph.json"), backend=backend)) == expected
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_label_then_id_names_the_node(tmp_path, backend):
+    mm = MemoryManager(str(tmp_path / "graph.json"), backend=backend)
+    first = mm.add_node("new_york", "entity", "New York")
+    assert mm.add_node("ny", "entity", "new york", {"a": 1})["id"] == "new_york"
+    assert mm.add_node("new_york", "entity", "New_York")["label"] == "New York"
+    assert mm.counts()["nodes"] == 1
+    assert mm.find_node("New York")["properties"] == {"a": 1}
+    assert first["id"] == "new_york"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_writes_survive_reopening(tmp_path, backend):
+    path = str(tmp_path / "graph.json")
+    mm = MemoryManager(path, backend=backend)
+    mm.add_node("a", "entity", "A")
+    mm.add_node("b", "entity", "B")
+    mm.add_edge("a", "b", "likes")
+    reopened = MemoryManager(path, backend=backend)
+    assert reopened.counts() == {"nodes": 2, "edges": 1}
+    assert reopened.get_related("a") == [{"relation": "likes", "target": "b", "weight": 1.0}]
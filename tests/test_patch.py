@@ -0,0 +1,161 @@
+import pytest
+
+from agent.tools import filesystem
+from agent.tools.patch import PatchError, apply_edits, apply_hunks, parse_unified
+
+SOURCE = """def greet(name):
+    message = "Hello, " + name
+    print(message)
+    return message
+
+
+def farewell(name):
+    print("Bye, " + name)
+"""
+
+
+def hunks(diff):
+    return parse_unified(diff)[0]["hunks"]
+
+
+def test_unified_exact():
+    diff = """--- a/greet.py
++++ b/greet.py
+@@ -2,3 +2,3 @@
+     message = "Hello, " + name
+-    print(message)
++    print(message.upper())
+     return message
+"""
+    text, summary = apply_hunks(SOURCE, hunks(diff))
+    assert '    print(message.upper())\n' in text
+    assert summary["added"] == 1 and summary["removed"] == 1 and summary["notes"] == []
+
+
+def test_unified_ignores_trailing_whitespace():
+    # Trailing spaces the file does not have
+    diff = ("@@ -7,2 +7,2 @@\n"
+            " def farewell(name):   \n"
+            "-    print(\"Bye, \" + name)  \n"
+            "+    print(\"Goodbye, \" + name)\n")
+    text, summary = apply_hunks(SOURCE, hunks(diff))
+    assert 'print("Goodbye, " + name)' in text
+    assert "hunk 1 matched ignoring trailing whitespace" in summary["notes"]
+
+
+def test_unified_reindents_added_lines():
+    diff = """@@ -3,2 +3,3 @@
+ print(message)
++log(message)
+ return message
+"""
+    text, summary = apply_hunks(SOURCE, hunks(diff))
+    assert "    print(message)\n    log(message)\n    return message\n" in text
+    assert "hunk 1 matched ignoring indentation" in summary["notes"]
+
+
+def test_unified_wrong_line_numbers():
+    diff = """@@ -40,2 +40,2 @@
+ def farewell(name):
+-    print("Bye, " + name)
++    print("See you, " + name)
+"""
+    text, summary = apply_hunks(SOURCE, hunks(diff))
+    assert 'print("See you, " + name)' in text
+    assert any("applied at line 7" in note for note in summary["notes"])
+
+
+def test_unified_ambiguous_without_line_numbers():
+    text = "x = 1\ny = 2\nx = 1\n"
+    diff = """@@ @@
+-x = 1
++x = 3
+"""
+    with pytest.raises(PatchError, match="matches 2 places"):
+        apply_hunks(text, hunks(diff))
+
+
+def test_unified_mismatch_points_at_closest_line():
+    diff = """@@ -1,1 +1,1 @@
+-def greeting(name):
++def hello(name):
+"""
+    with pytest.raises(PatchError, match="Closest line is 1"):
+        apply_hunks(SOURCE, hunks(diff))
+
+
+def test_unified_keeps_crlf():
+    text = "a\r\nb\r\nc\r\n"
+    diff = "@@ -1,3 +1,3 @@\n a\n-b\n+B\n c\n"
+    new_text, _ = apply_hunks(text, hunks(diff))
+    assert new_text == "a\r\nB\r\nc\r\n"
+
+
+def test_edits_exact_and_ambiguous():
+    text, summary = apply_edits(SOURCE, [('print("Bye, "', 'print("Farewell, "')])
+    assert 'print("Farewell, " + name)' in text and summary["at"] == [8]
+    with pytest.raises(PatchError, match=r"matches 4 places \(lines 1, 2, 7, 8\)"):
+        apply_edits(SOURCE, [("name", "who")])
+    text, summary = apply_edits(SOURCE, [("name", "who")], replace_all=True)
+    assert "name" not in text
+
+
+def test_edits_match_ignoring_indentation():
+    text, summary = apply_edits("def f():\n        print(message)\n        return 1\n",
+                                [("print(message)\nreturn 1\n", "print(message)\nreturn 2\n")])
+    assert text == "def f():\n        print(message)\n        return 2\n"
+    assert summary["notes"] == ["edit 1 matched ignoring indentation"]
+
+
+def test_edits_on_crlf_file():
+    text, _ = apply_edits("one\r\ntwo\r\nthree\r\n", [("two\nthree\n", "2\n3\n")])
+    assert text == "one\r\n2\r\n3\r\n"
+
+
+MULTI = """--- a/a.txt
++++ b/a.txt
+@@ -1,1 +1,1 @@
+-alpha
++ALPHA
+--- a/b.txt
++++ b/b.txt
+@@ -1,1 +1,1 @@
+-{b_line}
++BETA
+"""
+
+
+@pytest.fixture
+def two_files(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.txt").write_text("alpha\n")
+    (tmp_path / "b.txt").write_text("beta\n")
+    return tmp_path
+
+
+def test_multi_file_patch_applies_all(two_files):
+    result = filesystem.apply_patch(MULTI.format(b_line="beta"))
+    assert result["status"] == "success" and len(result["files"]) == 2
+    assert (two_files / "a.txt").read_text() == "ALPHA\n"
+    assert (two_files / "b.txt").read_text() == "BETA\n"
+
+
+def test_multi_file_patch_with_a_bad_hunk_writes_nothing(two_files):
+    result = filesystem.apply_patch(MULTI.format(b_line="gamma"))
+    assert "b.txt" in result["error"] and result["error"].endswith("Nothing was written.")
+    assert (two_files / "a.txt").read_text() == "alpha\n"
+    assert (two_files / "b.txt").read_text() == "beta\n"
+
+
+def test_failed_write_rolls_back_earlier_files(two_files, monkeypatch):
+    real_write = filesystem.atomic_write
+
+    def failing_write(path, data):
+        if path.endswith("b.txt") and data == b"BETA\n":
+            raise OSError("disk full")
+        real_write(path, data)
+    monkeypatch.setattr(filesystem, "atomic_write", failing_write)
+    result = filesystem.apply_patch(MULTI.format(b_line="beta"))
+    assert "disk full" in result["error"]
+    assert (two_files / "a.txt").read_text() == "alpha\n"
+    assert (two_files / "b.txt").read_text() == "beta\n"
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from agent.core import prompt
+from agent.core.architect_engine import CONTEXT_PROMPT, RECOVERY_PROMPT, SYSTEM_PROMPT, TASK_PROMPT
+from agent.core.prompt import PromptTemplate, dynamic, static
+from agent.planning.planner import DECOMPOSE_PROMPT
+
+TEMPLATE = PromptTemplate("t", static("role", "You are a helper."), static("rules", "Answer in JSON, e.g. {\"a\": 1}."),
+                          dynamic("task", "TASK: {task}\nCONTEXT: {{not a field}} {context}"))
+
+
+def test_render_joins_sections():
+    text = TEMPLATE.render(task="add", context="none")
+    assert text == 'You are a helper.\n\nAnswer in JSON, e.g. {"a": 1}.\n\nTASK: add\nCONTEXT: {not a field} none'
+    assert TEMPLATE.fields == ["task", "context"]
+
+
+def test_renders_share_a_byte_identical_prefix():
+    one, two = TEMPLATE.render(task="a", context="b"), TEMPLATE.render(task="something else", context="")
+    assert one.startswith(TEMPLATE.prefix) and two.startswith(TEMPLATE.prefix)
+    assert TEMPLATE.prefix.endswith("\n\n")
+
+
+def test_static_text_is_stored_once():
+    other = PromptTemplate("u", static("again", "You are a helper."), dynamic("x", "{x}"))
+    assert other.sections[0].text is TEMPLATE.sections[0].text
+
+
+def test_sections_after_a_dynamic_one_are_not_in_the_prefix():
+    t = PromptTemplate("v", static("a", "A"), dynamic("b", "{b}"), static("c", "C"), separator="|")
+    assert t.prefix == "A|"
+    assert t.render(b="x") == "A|x|C"
+
+
+def test_all_static_template_renders_its_prefix():
+    t = PromptTemplate("w", static("a", "A"), static("b", "B"), separator="\n")
+    assert t.render() == "A\nB" and t.render() is t.prefix
+
+
+def test_missing_value_raises():
+    with pytest.raises(KeyError):
+        TEMPLATE.render(task="only task")
+
+
+def test_stats_count_each_section():
+    stats = TEMPLATE.stats(task="one two three", context="x")
+    assert [r["static"] for r in stats["sections"]] == [True, True, False]
+    assert stats["total_tokens"] == sum(r["tokens"] for r in stats["sections"])
+    assert stats["prefix_tokens"] == prompt.count_tokens(TEMPLATE.prefix)
+
+
+def test_repo_templates_render_with_their_fields():
+    for template in (SYSTEM_PROMPT, CONTEXT_PROMPT, TASK_PROMPT, RECOVERY_PROMPT, DECOMPOSE_PROMPT):
+        text = template.render(**{f: f"<{f}>" for f in template.fields})
+        assert all(f"<{f}>" in text for f in template.fields), template.name
+
+
+def test_load_json_caches_until_the_file_changes(tmp_path):
+    path = str(tmp_path / "config.json")
+    assert prompt.load_json(path, default={}) == {}
+    with open(path, "w") as f:
+        f.write('{"a": 1}')
+    first = prompt.load_json(path)
+    assert first == {"a": 1} and prompt.load_json(path) is first
+    with open(path, "w") as f:
+        f.write('{"a": 22}')
+    os.utime(path, ns=(1, 1))
+    assert prompt.load_json(path) == {"a": 22}
+    with open(path, "w") as f:
+        f.write("not json")
+    os.utime(path, ns=(2, 2))
+    assert prompt.load_json(path, default="fallback") == "fallback"
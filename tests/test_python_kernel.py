@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from agent.tools.python_kernel import PythonKernel
+
+posix = pytest.mark.skipif(os.name != "posix", reason="resource limits and interrupts are POSIX only")
+
+
+@pytest.fixture
+def kernel_factory(tmp_path):
+    work = tmp_path / "work"
+    work.mkdir()
+    kernels = []
+
+    def make(**kwargs):
+        kwargs.setdefault("writable", [])
+        kernel = PythonKernel(cwd=str(work), **kwargs)
+        kernels.append(kernel)
+        return kernel
+    yield make
+    for kernel in kernels:
+        kernel.close()
+
+
+def test_state_persists_between_calls(kernel_factory):
+    kernel = kernel_factory()
+    assert kernel.run("x = 20\nprint('set')")["stdout"] == "set\n"
+    assert kernel.run("x * 2 + 2")["result"] == "42"
+
+
+def test_exit_does_not_kill_the_kernel(kernel_factory):
+    kernel = kernel_factory()
+    kernel.run("x = 1")
+    assert "SystemExit" in kernel.run("exit()")["error"]
+    assert kernel.run("x")["result"] == "1"
+    assert kernel.restarts == 0
+
+
+@posix
+def test_timeout_interrupts_and_keeps_variables(kernel_factory):
+    kernel = kernel_factory()
+    kernel.run("x = 1")
+    result = kernel.run("import time\nwhile True: time.sleep(0.05)", timeout=1)
+    assert "interrupted, variables kept" in result["error"]
+    assert kernel.run("x")["result"] == "1"
+
+
+@posix
+def test_cpu_limit_stops_a_busy_loop_and_keeps_variables(kernel_factory):
+    kernel = kernel_factory(cpu_seconds=1)
+    kernel.run("x = 1")
+    result = kernel.run("while True: pass", timeout=20)
+    assert "CPU time limit exceeded" in result["error"]
+    assert kernel.run("x")["result"] == "1"
+    # The next call gets a fresh budget
+    assert kernel.run("sum(range(1000))")["result"] == "499500"
+    assert kernel.restarts == 0
+
+
+@posix
+def test_file_size_limit_fails_the_write_not_the_kernel(kernel_factory, tmp_path):
+    kernel = kernel_factory(file_mb=1)
+    result = kernel.run("open('big.bin', 'wb').write(b'0' * (2 << 20))")
+    assert "File too large" in result["error"]
+    assert (tmp_path / "work" / "big.bin").stat().st_size <= 1 << 20
+    assert kernel.run("open('small.bin', 'wb').write(b'0' * 1000)")["result"] == "1000"
+
+
+def test_writes_are_confined_to_the_working_directory(kernel_factory, tmp_path):
+    outside = tmp_path / "outside.txt"
+    outside.write_text("keep")
+    kernel = kernel_factory()
+    assert kernel.run("import os\nos.makedirs('sub')\nopen('sub/a.txt', 'w').write('ok')")["result"] == "2"
+    assert (tmp_path / "work" / "sub" / "a.txt").read_text() == "ok"
+    for code in ("open('../new.txt', 'w')",
+                 f"open({str(outside)!r}, 'a')",
+                 f"os.remove({str(outside)!r})",
+                 "os.rename('sub/a.txt', '../moved.txt')",
+                 "os.symlink('..', 'up')\nopen('up/new.txt', 'w')"):
+        assert "PermissionError" in kernel.run(code)["error"], code
+    assert outside.read_text() == "keep"
+    assert not (tmp_path / "new.txt").exists() and not (tmp_path / "moved.txt").exists()
+    # Reading outside is allowed
+    assert kernel.run(f"open({str(outside)!r}).read()")["result"] == "'keep'"
+
+
+def test_writable_directories_are_allowed(kernel_factory, tmp_path):
+    extra = tmp_path / "scratch"
+    extra.mkdir()
+    kernel = kernel_factory(writable=[str(extra)])
+    assert kernel.run(f"open({str(extra / 'a.txt')!r}, 'w').write('ok')")["result"] == "2"
@@ -0,0 +1,89 @@
+import json
+import multiprocessing
+import os
+
+from agent.core.router import ModelRouter
+
+CONTEXT = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+
+
+def router(tmp_path=None, **kwargs):
+    kwargs.setdefault("explore", 0.0)
+    return ModelRouter(["small", "big"], stats_file=str(tmp_path / "stats.json") if tmp_path else None, **kwargs)
+
+
+def teach(r, model, successes, seconds=None, tokens_per_sec=None, runs=3):
+    for i in range(runs):
+        r.record("CODE", model, i < successes, seconds=seconds, tokens_per_sec=tokens_per_sec)
+
+
+def test_cheap_model_is_learned_once_it_succeeds():
+    r = router()
+    assert r.route("CODE", "big") == ("big", "default")
+    teach(r, "small", 3)
+    assert r.route("CODE", "big") == ("small", "learned")
+    assert r.route("DOCS", "big") == ("big", "default")
+
+
+def test_failures_and_parse_failures_lower_the_score():
+    r = router()
+    teach(r, "small", 2)
+    assert r.route("CODE", "big") == ("big", "default")
+    r = router()
+    teach(r, "small", 3)
+    r.record("CODE", "small", None, tool_calls=1, parse_failures=1)
+    assert r.score("CODE", "small") == 0.5
+    assert r.route("CODE", "big") == ("big", "default")
+
+
+def test_much_slower_cheap_model_is_not_worth_it():
+    r = router(max_slowdown=3.0)
+    teach(r, "small", 3, seconds=20.0)
+    teach(r, "big", 3, seconds=10.0)
+    assert r.speed_factor("CODE", "small", "big") == 1.0
+    assert r.route("CODE", "big") == ("small", "learned")
+    teach(r, "small", 3, seconds=200.0)  # now ~ 9x slower than big
+    assert r.speed_factor("CODE", "small", "big") < 0.5
+    assert r.route("CODE", "big") == ("big", "default")
+
+
+def test_tokens_per_sec_is_used_when_latency_is_missing():
+    r = router(max_slowdown=2.0)
+    teach(r, "small", 3, tokens_per_sec=5.0)
+    teach(r, "big", 3, tokens_per_sec=50.0)
+    assert r.speed_factor("CODE", "small", "big") == 0.2
+    assert r.route("CODE", "big") == ("big", "default")
+    assert router().speed_factor("CODE", "small", "big") == 1.0  # nothing measured
+
+
+def test_latency_is_a_moving_average():
+    r = router(alpha=0.5)
+    r.record("CODE", "small", None, seconds=10.0)
+    r.record("CODE", "small", None, seconds=20.0)
+    assert r.latency("small") == 15.0
+    assert r.stats["CODE"]["small"]["unchecked"] == 2
+
+
+def test_stats_persist(tmp_path):
+    r = router(tmp_path)
+    teach(r, "small", 3)
+    assert router(tmp_path).route("CODE", "big") == ("small", "learned")
+
+
+def record_many(path, model, n):
+    r = ModelRouter(["small", "big"], stats_file=path)
+    for _ in range(n):
+        r.record("CODE", model, True, seconds=1.0)
+
+
+def test_processes_do_not_lose_each_others_records(tmp_path):
+    path = str(tmp_path / "stats.json")
+    procs = [CONTEXT.Process(target=record_many, args=(path, model, 25)) for model in ("small", "big", "small", "big")]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+    with open(path) as f:
+        stats = json.load(f)["CODE"]
+    assert stats["small"]["runs"] == 50 and stats["big"]["runs"] == 50
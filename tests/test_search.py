@@ -0,0 +1,79 @@
+import os
+import re
+
+import pytest
+
+from agent.tools import search
+from agent.tools.search import TrigramIndex, _regex_literals
+
+
+@pytest.mark.parametrize("pattern, literals", [
+    (r"def search_code", ["def search_code"]),
+    (r"def \w+\(self", ["def ", "(self"]),
+    (r"import (os|sys)", []),
+    (r"foo|barbaz", []),
+    (r"colou?r_name", ["colo", "r_name"]),
+    (r"abc*def", ["def"]),
+    (r"ab{0,2}cdef", ["cdef"]),
+    (r"x{2}yzw", ["yzw"]),
+    (r"[A-Z]+Error", ["Error"]),
+    (r"log\.info", ["log.info"]),
+    (r"^class Foo$", ["class Foo"]),
+    (r"\d+ items", [" items"]),
+    (r"ab.cd", []),
+])
+def test_regex_literals(pattern, literals):
+    assert _regex_literals(pattern) == literals
+
+
+def test_every_match_contains_the_literals():
+    pattern = r"def \w+\(self, (key|value)=None\)"
+    text = "    def lookup(self, key=None):"
+    assert re.search(pattern, text)
+    assert all(literal in text for literal in _regex_literals(pattern))
+
+
+@pytest.fixture
+def index(tmp_path):
+    root = tmp_path / "workspace"
+    root.mkdir()
+    (root / "a.py").write_text("alpha = 1\n")
+    idx = TrigramIndex(str(root), index_dir=str(tmp_path / "index"), rescan_interval=3600)
+    search._indexes[idx.root] = idx
+    yield idx
+    search._indexes.pop(idx.root, None)
+    idx.close()
+
+
+def test_mark_stale_forces_a_rescan(index):
+    assert index.search("alpha")["count"] == 1
+    # Written behind the index's back, as a shell command would
+    with open(os.path.join(index.root, "b.py"), "w") as f:
+        f.write("beta = 2\n")
+    assert index.search("beta")["count"] == 0  # throttled
+    search.mark_stale()
+    assert index.search("beta")["count"] == 1
+
+
+def test_index_lives_outside_the_workspace(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert os.path.isabs(search.INDEX_DIR)
+    assert not search.INDEX_DIR.startswith(str(tmp_path))
+
+
+def test_agent_state_is_not_indexed(tmp_path, monkeypatch):
+    root = tmp_path / "workspace"
+    (root / "data" / "state").mkdir(parents=True)
+    (root / "data" / "state" / "lint_cache.json").write_text('{"alpha": 1}\n')
+    (root / "data" / "rows.csv").write_text("alpha,1\n")
+    (root / "a.py").write_text("alpha = 1\n")
+    monkeypatch.chdir(root)
+    idx = TrigramIndex(str(root), index_dir=str(tmp_path / "index"), rescan_interval=3600)
+    try:
+        result = idx.search("alpha")
+        # A project's own data/ directory is still searched
+        assert sorted(m.split(":")[0] for m in result["matches"]) == ["a.py", os.path.join("data", "rows.csv")]
+        idx.update_path(str(root / "data" / "state" / "lint_cache.json"))
+        assert str(root / "data" / "state" / "lint_cache.json") not in idx.files
+    finally:
+        idx.close()
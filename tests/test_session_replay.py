@@ -0,0 +1,89 @@
+import pytest
+
+from agent.core import llm, session_recorder
+from agent.core.session_recorder import SessionRecorder, SessionReplayer
+from agent.core.specialist_pool import SpecialistPool
+
+
+def ask(model, content, history=()):
+    messages = list(history) + [{"role": "user", "content": content}]
+    return llm.chat(model, messages)["message"]["content"]
+
+
+def agent_run(pool):
+    """A primary turn, a tool that consults the specialist model, then a turn that reads the tool result."""
+    plan = ask("primary", "goal")
+    advice = session_recorder.run_tool("ask_specialist", {"query": plan},
+                                       lambda: {"answer": pool.ask(plan)["content"]})
+    final = ask("primary", f"advice: {advice['answer']}", [{"role": "assistant", "content": plan}])
+    listing = session_recorder.run_tool("list_directory", {"path": "."}, lambda: {"entries": ["a.py"]})
+    return plan, advice, final, listing
+
+
+@pytest.fixture
+def pool():
+    pool = SpecialistPool("specialist", parallel=1)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def recording(tmp_path, monkeypatch, fake_ollama, pool):
+    path = str(tmp_path / "run.jsonl.gz")
+    recorder = SessionRecorder(path, entry="test")
+    monkeypatch.setattr(session_recorder, "_active", recorder)
+    fake_ollama.reply("make a plan", "use a dict", "all done")
+    outputs = agent_run(pool)
+    recorder.close()
+    monkeypatch.setattr(session_recorder, "_active", None)
+    fake_ollama.requests[:] = []
+    return path, outputs
+
+
+def replay(monkeypatch, path, pool, tools):
+    replayer = SessionReplayer(path, tools=tools, report=False)
+    monkeypatch.setattr(session_recorder, "_active", replayer)
+    outputs = agent_run(pool)
+    return replayer, outputs
+
+
+def test_nested_model_calls_are_recorded_under_their_tool(recording):
+    path, _ = recording
+    events = session_recorder.load(path)
+    tool = next(e for e in events if e["type"] == "tool" and e["name"] == "ask_specialist")
+    nested = [e for e in events if e["type"] == "llm" and e.get("tool") == tool["id"]]
+    assert [e["model"] for e in nested] == ["specialist"]
+    assert [e["model"] for e in events if e["type"] == "llm" and "tool" not in e] == ["primary", "primary"]
+
+
+def test_stubbed_tool_skips_its_nested_calls(recording, monkeypatch, pool, fake_ollama):
+    path, recorded = recording
+    replayer, outputs = replay(monkeypatch, path, pool, "stub")
+    assert outputs == recorded
+    report = replayer.report()
+    assert report["llm_calls"] == 2 and report["skipped_llm_responses"] == 1
+    assert report["unused_llm_responses"] == 0 and report["divergences"] == 0
+    assert fake_ollama.requests == []
+
+
+def test_executed_tool_is_served_its_nested_calls(recording, monkeypatch, pool, fake_ollama):
+    path, recorded = recording
+    replayer, outputs = replay(monkeypatch, path, pool, "execute")
+    assert outputs == recorded
+    report = replayer.report()
+    assert report["llm_calls"] == 3 and report["skipped_llm_responses"] == 0
+    assert report["unused_llm_responses"] == 0 and report["divergences"] == 0
+    assert fake_ollama.requests == []
+
+
+def test_responses_are_matched_by_request_when_calls_reorder(tmp_path, monkeypatch, fake_ollama):
+    path = str(tmp_path / "run.jsonl")
+    recorder = SessionRecorder(path)
+    monkeypatch.setattr(session_recorder, "_active", recorder)
+    fake_ollama.reply("one", "two")
+    ask("m", "first"), ask("m", "second")
+    recorder.close()
+    replayer = SessionReplayer(path, report=False)
+    monkeypatch.setattr(session_recorder, "_active", replayer)
+    assert (ask("m", "second"), ask("m", "first")) == ("two", "one")
+    assert replayer.report()["divergences"] == 0
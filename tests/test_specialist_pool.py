@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from agent.core import budget
+from agent.core.specialist_pool import SpecialistPool, lint_answer
+
+GOOD = "Here:\n```python\ndef f():\n    return 1\n```"
+BAD = "Here:\n```python\ndef f(:\n    return 1\n```"
+
+
+@pytest.fixture
+def pool():
+    pool = SpecialistPool(["small", "large"], parallel=2)
+    yield pool
+    pool.close()
+
+
+def test_lint_answer_checks_only_python_blocks():
+    assert lint_answer(GOOD) is None
+    assert lint_answer("Just prose, no code.") is None
+    assert lint_answer("```js\nfunction (\n```") is None
+    assert lint_answer(BAD).startswith("line 1:")
+
+
+def test_ask_sends_the_system_prompt(pool, fake_ollama):
+    fake_ollama.reply("an answer")
+    result = pool.ask("question")
+    assert result["content"] == "an answer" and result["model"] == "small"
+    assert [m["role"] for m in fake_ollama.requests[0]["messages"]] == ["system", "user"]
+
+
+def test_requests_per_model_are_capped(pool, fake_ollama):
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+
+    def slow(request):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        time.sleep(0.05)
+        with lock:
+            in_flight["now"] -= 1
+        return request["messages"][-1]["content"].upper()
+    fake_ollama.reply(*[slow] * 6)
+    results = dict(pool.map([f"p{i}" for i in range(6)]))
+    assert sorted(results) == list(range(6))
+    assert results[3]["content"] == "P3"
+    assert in_flight["max"] == 2
+
+
+def test_best_of_returns_an_answer_that_passes_the_check(pool, fake_ollama):
+    fake_ollama.reply(*[lambda r: GOOD if r["options"]["seed"] == 2 else BAD] * 3)
+    result = pool.best_of("write f", samples=3)
+    assert result["content"] == GOOD and result["attempts"] == 3
+    # Later samples may be cancelled before they start; those that ran used distinct seeds
+    seeds = [r["options"]["seed"] for r in fake_ollama.requests]
+    assert 2 in seeds and len(set(seeds)) == len(seeds)
+    assert {r["model"] for r in fake_ollama.requests if r["options"]["seed"] == 2} == {"large"}
+
+
+def test_best_of_reports_the_check_error_when_nothing_passes(pool, fake_ollama):
+    fake_ollama.reply(BAD, BAD)
+    result = pool.best_of("write f", samples=2)
+    assert result["content"] == BAD and result["check_error"].startswith("line 1:")
+
+
+def test_model_errors_are_returned_not_raised(pool, fake_ollama):
+    def boom(request):
+        raise ConnectionError("ollama is down")
+    fake_ollama.reply(boom)
+    assert pool.ask("q")["error"] == "ollama is down"
+
+
+def test_workers_charge_the_callers_budget(pool, fake_ollama):
+    fake_ollama.reply("a", "b")
+    goal = budget.Budget()
+    with budget.use(goal):
+        list(pool.map(["one", "two"]))
+    assert goal.used["llm_calls"] == 2 and goal.tokens == 60
@@ -0,0 +1,45 @@
+import atexit
+import io
+import os
+import subprocess
+import sys
+
+from agent.core.startup import PROFILE_FLAG, StartupProfiler, lazy_import
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_entry_points_do_not_import_heavy_clients():
+    code = ("import sys, agent.core.architect_engine, agent.tools.base, agent.tools.web\n"
+            "print(sorted(m for m in ('ollama', 'ddgs', 'duckduckgo_search') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def test_lazy_import_returns_the_loaded_module():
+    assert lazy_import("json") is sys.modules["json"]
+    sys.modules.pop("colorsys", None)
+    assert lazy_import("colorsys").__name__ == "colorsys"
+
+
+def test_profiler_is_off_unless_the_flag_is_given():
+    profiler = StartupProfiler()
+    argv = ["run_agent.py", "goal"]
+    assert not profiler.enable_from_argv(argv)
+    with profiler.section("import nothing"):
+        pass
+    assert profiler.timings == []
+
+
+def test_profiler_strips_the_flag_and_reports_sections():
+    profiler = StartupProfiler()
+    argv = ["run_agent.py", PROFILE_FLAG, "goal"]
+    assert profiler.enable_from_argv(argv)
+    atexit.unregister(profiler.report)
+    assert argv == ["run_agent.py", "goal"]
+    with profiler.section("import tools"):
+        pass
+    out = io.StringIO()
+    profiler.report(out)
+    assert [name for name, _, _ in profiler.timings] == ["import tools"]
+    assert "import tools" in out.getvalue() and "ms wall" in out.getvalue()
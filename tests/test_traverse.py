@@ -0,0 +1,63 @@
+import pytest
+
+from agent.core.memory_manager import MemoryManager
+
+
+@pytest.fixture
+def graph(tmp_path):
+    """seed -> a (1.0) -> c (0.5) -> d (1.0), seed -> b (0.2), b -> c (1.0)"""
+    mm = MemoryManager(str(tmp_path / "graph.json"), backend="json")
+    with mm.batch():
+        for node_id in ("seed", "a", "b", "c", "d"):
+            mm.add_node(node_id, "entity", node_id.upper())
+        mm.add_edge("seed", "a", "r", 1.0)
+        mm.add_edge("a", "c", "r", 0.5)
+        mm.add_edge("c", "d", "r", 1.0)
+        mm.add_edge("seed", "b", "r", 0.2)
+        mm.add_edge("b", "c", "r", 1.0)
+    return mm
+
+
+def by_id(result):
+    return {n["id"]: n for n in result["nodes"]}
+
+
+def test_bfs_scores_the_best_weighted_path(graph):
+    nodes = by_id(graph.traverse("seed", depth=3))
+    assert nodes["a"]["score"] == 0.5 and nodes["a"]["hops"] == 1
+    assert nodes["b"]["score"] == 0.1
+    # seed-a-c (1.0 * 0.5 * 0.5^2) beats seed-b-c (0.2 * 1.0 * 0.5^2)
+    assert nodes["c"]["score"] == 0.125 and nodes["c"]["hops"] == 2
+    assert nodes["d"]["score"] == 0.0625 and nodes["d"]["hops"] == 3
+    assert [n["id"] for n in graph.traverse("seed", depth=3)["nodes"]] == ["a", "c", "b", "d"]
+
+
+def test_depth_bounds_the_walk(graph):
+    assert set(by_id(graph.traverse("seed", depth=1))) == {"a", "b"}
+    assert set(by_id(graph.traverse("seed", depth=2))) == {"a", "b", "c"}
+
+
+def test_limit_keeps_the_top_nodes_and_their_edges(graph):
+    result = graph.traverse("seed", depth=3, limit=2)
+    assert [n["id"] for n in result["nodes"]] == ["a", "c"]
+    assert {(e["source"], e["target"]) for e in result["edges"]} == {("seed", "a"), ("a", "c")}
+    assert result["seed"]["id"] == "seed"
+
+
+def test_seed_is_found_by_label_and_unknown_concepts_give_none(graph):
+    assert graph.traverse("Seed")["seed"]["id"] == "seed"
+    assert graph.traverse("nowhere") is None
+
+
+def test_pagerank_favours_heavier_and_closer_nodes(graph):
+    nodes = by_id(graph.traverse("seed", depth=3, method="pagerank"))
+    assert set(nodes) == {"a", "b", "c", "d"}
+    assert nodes["a"]["score"] > nodes["b"]["score"]
+    assert nodes["a"]["score"] > nodes["d"]["score"]
+    assert nodes["d"]["hops"] == 3
+
+
+def test_traversal_marks_returned_edges_as_used(graph):
+    graph.traverse("seed", depth=1)
+    used = {(e["source"], e["target"]) for e in graph.edges() if e.get("last_used")}
+    assert used == {("seed", "a"), ("seed", "b")}
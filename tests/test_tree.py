@@ -0,0 +1,97 @@
+import os
+
+from agent.tools.tree import DirectoryIndex, IgnoreRules
+
+
+def names(result):
+    return [line.strip().split(" (")[0] for line in result["entries"]]
+
+
+def test_unchanged_directories_are_not_rescanned(tmp_path):
+    (tmp_path / "a.txt").write_text("one")
+    index = DirectoryIndex()
+    index.tree(str(tmp_path))
+    scans = index.scans
+    index.tree(str(tmp_path))
+    assert index.scans == scans
+    (tmp_path / "b.txt").write_text("two")  # changes the directory's mtime
+    assert "b.txt" in names(index.tree(str(tmp_path)))
+    assert index.scans == scans + 1
+
+
+def test_invalidate_refreshes_a_file_rewritten_in_place(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text("x")
+    index = DirectoryIndex()
+    assert "a.txt (1 B)" in index.tree(str(tmp_path))["entries"]
+    mtime = os.stat(tmp_path).st_mtime_ns
+    with open(path, "r+") as f:
+        f.write("x" * 100)
+    assert os.stat(tmp_path).st_mtime_ns == mtime
+    assert "a.txt (1 B)" in index.tree(str(tmp_path))["entries"]  # stale, as documented
+    index.invalidate(str(path))
+    assert "a.txt (100 B)" in index.tree(str(tmp_path))["entries"]
+
+
+def test_invalidate_a_directory_forgets_its_own_listing(tmp_path):
+    (tmp_path / "sub").mkdir()
+    index = DirectoryIndex()
+    index.entries(str(tmp_path / "sub"))
+    index.invalidate(str(tmp_path / "sub"))
+    assert str(tmp_path / "sub") not in index._dirs
+
+
+def test_least_recently_used_listings_are_dropped(tmp_path):
+    for name in "abc":
+        (tmp_path / name).mkdir()
+    index = DirectoryIndex(max_dirs=2)
+    for name in "abc":
+        index.entries(str(tmp_path / name))
+    assert list(index._dirs) == [str(tmp_path / "b"), str(tmp_path / "c")]
+
+
+def test_ignore_rules():
+    rules = IgnoreRules(["# comment", "*.log", "!keep.log", "build/", "/top.txt", "docs/**/*.tmp", ""])
+    assert rules.match("app.log", False) is True
+    assert rules.match("deep/app.log", False) is True
+    assert rules.match("keep.log", False) is False
+    assert rules.match("build", True) is True
+    assert rules.match("build", False) is None  # dir-only rule
+    assert rules.match("top.txt", False) is True
+    assert rules.match("sub/top.txt", False) is None  # anchored to the .gitignore's directory
+    assert rules.match("docs/a/b/x.tmp", False) is True
+    assert rules.match("src/main.py", False) is None
+
+
+def test_tree_respects_gitignore_files(tmp_path):
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".gitignore").write_text("*.log\nbuild/\n")
+    (tmp_path / "build").mkdir()
+    (tmp_path / "build" / "out.bin").write_text("x")
+    (tmp_path / "app.log").write_text("x")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / ".gitignore").write_text("generated.py\n!important.log\n")
+    for name in ("main.py", "generated.py", "debug.log", "important.log"):
+        (tmp_path / "src" / name).write_text("x")
+    index = DirectoryIndex()
+
+    result = index.tree(str(tmp_path), depth=2)
+    assert names(result) == ["src/", "important.log", "main.py"]
+    assert set(result["pruned"]) >= {"build/", "app.log", "src/generated.py", "src/debug.log"}
+    # Listing a subdirectory still applies the .gitignore files above it, up to the repository root
+    assert names(index.tree(str(tmp_path / "src"))) == ["important.log", "main.py"]
+    # .git is in SKIP_DIRS, ignore rules or not
+    assert names(index.tree(str(tmp_path), depth=1, respect_ignore=False, show_hidden=True)) == \
+        ["build/", "src/", ".gitignore", "app.log"]
+    assert sorted(os.path.basename(p) for p in index.files(str(tmp_path))) == ["important.log", "main.py"]
+
+
+def test_edited_gitignore_is_reloaded(tmp_path):
+    (tmp_path / ".git").mkdir()
+    (tmp_path / "a.log").write_text("x")
+    (tmp_path / ".gitignore").write_text("*.txt\n")
+    index = DirectoryIndex()
+    assert names(index.tree(str(tmp_path))) == ["a.log"]
+    (tmp_path / ".gitignore").write_text("*.log\n")
+    os.utime(tmp_path / ".gitignore", ns=(1, 1))  # a different mtime even on coarse filesystems
+    assert names(index.tree(str(tmp_path))) == []
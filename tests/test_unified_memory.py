@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from agent.core import memory_manager
+from agent.core.memory_manager import MemoryManager as GraphMemory
+from agent.memory.manager import MemoryManager as EpisodicMemory
+from agent.memory.unified import UnifiedMemory
+
+
+@pytest.fixture
+def stores(tmp_path):
+    graph = GraphMemory(str(tmp_path / "graph.json"), backend="json")
+    episodic = EpisodicMemory(str(tmp_path / "memories"), backend="json")
+    return graph, episodic
+
+
+class SlowEpisodic:
+    def __init__(self, inner, delay):
+        self.inner, self.delay = inner, delay
+
+    def search(self, query, limit):
+        time.sleep(self.delay)
+        return self.inner.search(query, limit)
+
+
+class BrokenGraph:
+    def get_related(self, node_id):
+        return []
+
+    def find_node(self, label):
+        raise RuntimeError("graph is corrupt")
+
+
+def test_recall_merges_both_stores(stores):
+    graph, episodic = stores
+    memory = UnifiedMemory(graph=graph, episodic=episodic)
+    memory.save(subject="Mayank", relation="likes", target="Rust")
+    memory.save("Rust builds are slow on the laptop; use the desktop for release builds")
+    result = memory.recall("Rust")
+    assert result["found"] and result["timed_out"] == []
+    sources = {r["source"] for r in result["results"]}
+    assert sources == {"graph", "episodic"}
+    assert max(r["score"] for r in result["results"]) == 1.0
+    memory.close()
+
+
+def test_slow_store_is_reported_and_the_rest_returned(stores):
+    graph, episodic = stores
+    episodic.save("Rust notes")
+    memory = UnifiedMemory(graph=graph, episodic=SlowEpisodic(episodic, 0.5), budget=0.1)
+    memory.save(subject="Mayank", relation="likes", target="Rust")
+    started = time.perf_counter()
+    result = memory.recall("Rust")
+    assert time.perf_counter() - started < 0.4
+    assert result["timed_out"] == ["episodic"]
+    assert result["results"] and all(r["source"] == "graph" for r in result["results"])
+    memory.close()
+
+
+def test_failing_store_is_reported_as_an_error(stores):
+    _, episodic = stores
+    episodic.save("Rust notes")
+    memory = UnifiedMemory(graph=BrokenGraph(), episodic=episodic)
+    result = memory.recall("Rust")
+    assert result["errors"] == {"graph": "graph is corrupt"}
+    assert [r["text"] for r in result["results"]] == ["Rust notes"]
+    memory.close()
+
+
+def test_opening_a_store_does_not_count_against_the_budget(stores, monkeypatch):
+    graph, episodic = stores
+
+    class SlowToOpen(GraphMemory):
+        def __init__(self):
+            time.sleep(0.3)
+            super().__init__(graph.file_path, backend="json")
+    monkeypatch.setattr(memory_manager, "MemoryManager", SlowToOpen)
+    memory = UnifiedMemory(episodic=episodic, budget=0.1)
+    result = memory.recall("anything")
+    assert result["timed_out"] == []
+    assert isinstance(memory.graph, SlowToOpen)
+    memory.close()
+
+
+def test_save_validates_facts(stores):
+    graph, episodic = stores
+    memory = UnifiedMemory(graph=graph, episodic=episodic)
+    assert "error" in memory.save(subject="a", relation="b")
+    assert "error" in memory.save()
+    assert memory.save("note")["store"] == "episodic"
+    memory.close()